@@ -1,9 +1,22 @@
-import cv2
+import multiprocessing
+import os
+import time
+from functools import partial
+
 import numpy as np
-import tifffile as tiff
-import torch
-from torch.utils.data import Dataset
+from torch.utils.data import DataLoader, Dataset
 
+from bbbc_datasets.utils import file_io
+from bbbc_datasets.utils.arena import preload_dataset
+from bbbc_datasets.utils.batching import ShapeBucketBatchSampler, pad_collate
+from bbbc_datasets.utils.normalization import DEFAULT_PERCENTILES
+from bbbc_datasets.utils.resize import materialize_dataset
+from bbbc_datasets.utils.sequence import SlidingWindowDataset
+from bbbc_datasets.utils.shared_cache import SharedSampleCache
+from bbbc_datasets.utils.streaming import stream_dataset
+from bbbc_datasets.utils.tensors import image_to_tensor, label_to_tensor
+from bbbc_datasets.utils.tiling import TileDataset
+from bbbc_datasets.utils.variants import VariantGrid
 from tests import DATASETS  # Import shared dataset list
 
 
@@ -13,35 +26,180 @@ class BBBCDataset(Dataset):
 
     - Supports both 2D and 3D images.
     - Optionally applies transformations (PyTorch `torchvision.transforms`).
-    - Returns (image, label) pairs where available.
+    - Returns (image, label) pairs where available, labels are paired per sample
+      through the dataset's own `get_label` logic.
+    - Keeps a compact sample table (one NumPy string array) instead of the full
+      dataset object when pickled into DataLoader workers. Each worker rebuilds
+      the dataset once (without downloading) and keeps it, so label listings and
+      single-file ground truths are loaded once per worker, not once per sample.
+    - Normalizes images in float32 with a single allocation and hands them to
+      torch without copying (see `bbbc_datasets.utils.normalization`).
+    - Optionally caches decoded images in their native dtype in one shared
+      memory arena that all DataLoader workers fill and read zero-copy
+      (see `bbbc_datasets.utils.shared_cache`).
+    - Optionally preloads all images and labels in their native dtype into one
+      contiguous in-memory arena (see `bbbc_datasets.utils.arena`); images
+      are normalized on access.
+    - Optionally reads samples from a resized packed copy of the dataset (see
+      `bbbc_datasets.utils.resize.materialize_dataset`) instead of resizing in
+      transforms.
 
     Args:
         dataset_cls: The BBBC dataset class to load.
         transform (callable, optional): Optional transform to apply to images.
         target_transform (callable, optional): Optional transform for labels.
+        dataset_kwargs (dict, optional): Arguments for `dataset_cls` (e.g. the variant).
+        normalize (str, optional): "minmax" (default), "percentile", "dataset" or
+            None to keep the native dtype.
+        percentile_range (tuple): Percentiles used by the "percentile" mode.
+        stats (dict, optional): Dataset statistics used by the "dataset" mode
+            (default: mean/std from `dataset.get_statistics()`).
+        cache (bool): Cache decoded images in shared memory across workers.
+        cache_bytes (int, optional): Global byte budget of the cache.
+        preload (bool): Load all samples into memory up front; the memory use
+            is reported in `preload_report`.
+        workers (int, optional): Number of decoding threads for preloading.
+        select (dict, optional): Query selecting a subset of the samples from
+            the sample index (e.g. `{"blur": 1, "count__lt": 20}`, see `SampleIndex.select`).
+        materialize (dict, optional): Arguments for `materialize_dataset` (e.g.
+            `{"size": 512, "interpolation": "area"}`); samples are then read
+            from the resized copy, which is built on first use.
     """
 
-    def __init__(self, dataset_cls, transform=None, target_transform=None):
-        self.dataset = dataset_cls()
-        self.image_paths = self.dataset.get_image_paths()
-        self.label_path = self.dataset.get_label_paths()
+    def __init__(
+        self,
+        dataset_cls,
+        transform=None,
+        target_transform=None,
+        dataset_kwargs=None,
+        normalize="minmax",
+        percentile_range=DEFAULT_PERCENTILES,
+        stats=None,
+        cache=False,
+        cache_bytes=None,
+        preload=False,
+        workers=None,
+        select=None,
+        materialize=None,
+    ):
+        if cache and preload:
+            raise ValueError("Use either cache or preload, not both.")
+        if materialize and (cache or preload):
+            raise ValueError("Use either materialize or cache/preload, not both.")
+
+        self.dataset_cls = dataset_cls
+        self.dataset_kwargs = dict(dataset_kwargs or {})
+        self.dataset = dataset_cls(**self.dataset_kwargs)
 
-        if not self.image_paths:
+        # Compact, picklable sample table
+        if select:
+            image_paths = self.dataset.get_sample_index().select(**select).image_paths
+        else:
+            image_paths = self.dataset.get_image_paths()
+        self.image_paths = np.array(sorted(image_paths), dtype=str)
+
+        if not len(self.image_paths):
             raise RuntimeError(f"No images found in {dataset_cls.__name__}")
 
+        self.reader = self.reader_rows = None
+        if materialize:
+            self.reader = materialize_dataset(
+                self.dataset, **dict({"workers": workers}, **materialize)
+            )
+            rows = {os.path.normpath(p): i for i, p in enumerate(self.reader.paths)}
+            self.reader_rows = np.array(
+                [rows[os.path.normpath(p)] for p in self.image_paths], dtype=np.int64
+            )
+
         self.transform = transform
         self.target_transform = target_transform
+        self.normalize = normalize
+        self.percentile_range = percentile_range
+        self.stats = stats
+
+        if normalize == "dataset" and not stats:
+            # Dataset-level mean/std from the cached statistics engine
+            self.stats = self.dataset.get_statistics(labels=False).normalization_stats()
+
+        self.cache = None
+        if cache:
+            self.cache = SharedSampleCache(
+                self.get_shapes(), self._get_dtypes(), max_bytes=cache_bytes
+            )
+
+        self.images = self.labels = self.preload_report = None
+        if preload:
+            shapes = [shape or None for shape in self.get_shapes()]
+            dtypes = [
+                np.dtype(dtype or np.uint8).newbyteorder("=")
+                for dtype in self._get_dtypes()
+            ]
+            self.images, self.labels, self.preload_report = preload_dataset(
+                self.dataset,
+                [str(path) for path in self.image_paths],
+                shapes,
+                dtypes,
+                workers=workers,
+            )
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["dataset"] = None  # Rebuilt lazily in every worker
+        return state
+
+    def get_base_dataset(self):
+        """
+        Returns the underlying dataset instance, creating it once per process.
+        """
+        if self.dataset is None:
+            kwargs = dict(self.dataset_kwargs, download_files=False)
+            self.dataset = self.dataset_cls(**kwargs)
+        return self.dataset
 
     def __len__(self):
         return len(self.image_paths)
 
-    def __getitem__(self, idx):
-        image_path = self.image_paths[idx]
-        image = self.load_image(image_path)
+    def _index_rows(self):
+        """
+        Returns the sample index row of every sample (in sample order).
+        """
+        index = self.get_base_dataset().get_sample_index()
+        rows = {os.path.normpath(path): i for i, path in enumerate(index.image_paths)}
+        return np.array([rows[os.path.normpath(p)] for p in self.image_paths])
+
+    def _get_dtypes(self):
+        rows = self._index_rows()
+        return (
+            self.get_base_dataset().get_sample_index().table["dtype"].to_numpy()[rows]
+        )
 
-        label = None
-        if self.label_path:
-            label = self.load_image(self.label_path)
+    def get_shapes(self):
+        """
+        Returns the header-probed shape of every sample (in sample order) from
+        the dataset's cached sample index, without decoding any image.
+        Materialized samples have their resized shapes.
+        """
+        if self.reader is not None:
+            return [self.reader.shape(row) for row in self.reader_rows]
+        shapes = self.get_base_dataset().get_sample_index().shapes()
+        return [shapes[row] for row in self._index_rows()]
+
+    def __getitem__(self, idx):
+        image_path = str(self.image_paths[idx])
+        if self.reader is not None:
+            row = int(self.reader_rows[idx])
+            image = self.image_to_tensor(self.reader.get_image(row))
+            label = label_to_tensor(self.reader.get_label(row))
+        elif self.images is not None:
+            image = self.image_to_tensor(self.images.get(idx))
+            label = label_to_tensor(self.labels.get(idx))
+        elif self.cache is not None:
+            img = self.cache.get_or_load(idx, lambda: self.read_image(image_path))
+            image = self.image_to_tensor(img)
+            label = self.load_label(image_path)
+        else:
+            image = self.load_image(image_path)
+            label = self.load_label(image_path)
 
         # Apply transforms if provided
         if self.transform:
@@ -51,28 +209,181 @@ class BBBCDataset(Dataset):
 
         return image, label
 
-    def load_image(self, image_path):
+    def load_label(self, image_path):
         """
-        Loads an image (2D or full 3D) and converts it to a PyTorch tensor.
+        Loads the label paired with an image and converts it to an integer tensor.
+        Returns None if the dataset has no label for the image.
         """
-        if image_path.endswith((".tif", ".tiff")):
-            img = tiff.imread(image_path)  # Load 3D TIFF or 2D image
-        else:
-            img = cv2.imread(image_path, cv2.IMREAD_UNCHANGED)  # Load 2D image
+        try:
+            label = self.get_base_dataset().get_label(image_path)
+        except FileNotFoundError:
+            return None
+
+        return label_to_tensor(label)
+
+    def read_image(self, image_path):
+        """
+        Reads an image (2D or full 3D) as an array in its native dtype.
+        """
+        img = file_io.load_image(image_path)
 
         if img is None:
             raise ValueError(f"Error: Could not read image {image_path}")
 
-        # Normalize grayscale images
-        img = (img - np.min(img)) / (np.max(img) - np.min(img) + 1e-8)
+        return img
 
-        # Convert to tensor
-        if len(img.shape) == 2:  # 2D grayscale image
-            img = torch.tensor(img, dtype=torch.float32).unsqueeze(0)  # (C, H, W)
-        elif len(img.shape) == 3:  # 3D volume (Z, H, W)
-            img = torch.tensor(img, dtype=torch.float32).unsqueeze(0)  # (C, Z, H, W)
+    def load_image(self, image_path):
+        """
+        Loads an image (2D or full 3D) and converts it to a PyTorch tensor.
+        """
+        return self.image_to_tensor(self.read_image(image_path), copy=False)
 
-        return img
+    def image_to_tensor(self, img, copy=True):
+        """
+        Normalizes an image array and wraps it as a tensor with a leading channel
+        dimension: (C, H, W) for 2D images, (C, Z, H, W) for 3D volumes.
+        Pass `copy=False` only for an image that nothing else references.
+        """
+        return image_to_tensor(
+            img, self.normalize, self.percentile_range, self.stats, copy=copy
+        )
+
+
+class MixtureDataset(Dataset):
+    """
+    Weighted mixture of several datasets that are only instantiated when first used.
+
+    - Every epoch draws, per sample, the source (by weight) and a random key
+      that selects an item of that source; only these two compact arrays are
+      kept, never a combined list of paths.
+    - A source is created on its first access (in every process), so unused
+      or rarely drawn datasets cost nothing up front. `prepare()` creates all
+      of them, e.g. to download everything before starting DataLoader workers.
+    - Per-source sample counts and loading times are shared by all DataLoader
+      workers (see `throughput()`).
+
+    Args:
+        factories (dict): Source name -> callable creating its dataset.
+        weights (dict): Source name -> sampling weight.
+        num_samples (int): Samples per epoch. It is required, since summing the
+            lengths of the sources would instantiate all of them.
+        seed (int): Seed of the sampling; combined with the epoch (see `set_epoch`).
+        return_source (bool): Return `(image, label, source_name)` triplets.
+    """
+
+    def __init__(self, factories, weights, num_samples, seed=0, return_source=False):
+        self.names = list(factories)
+        self.factories = factories
+        weights = np.array([float(weights[name]) for name in self.names])
+        if not len(weights) or (weights < 0).any() or weights.sum() <= 0:
+            raise ValueError(
+                "Mixture weights must be non-negative with a positive sum."
+            )
+        self.weights = weights / weights.sum()
+        if num_samples is None or int(num_samples) <= 0:
+            raise ValueError("Mixtures need a positive number of samples per epoch.")
+
+        self.num_samples = int(num_samples)
+        self.seed = seed
+        self.return_source = return_source
+        self.epoch = 0
+
+        self._sources = {}
+        self._draws = None
+        # Shared counters (samples, seconds) per source, inherited by workers
+        self._counters = multiprocessing.Array("d", 2 * len(self.names))
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_draws"] = None
+        return state
+
+    def get_source(self, name):
+        """
+        Returns the dataset of a source, creating it on first use.
+        """
+        source = self._sources.get(name)
+        if source is None:
+            source = self._sources[name] = self.factories[name]()
+        return source
+
+    def prepare(self):
+        """
+        Creates all sources now (e.g. to download them before starting workers).
+        """
+        for name in self.names:
+            self.get_source(name)
+        return self
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+        self._draws = None
+
+    def __len__(self):
+        return self.num_samples
+
+    def _get_draws(self):
+        if self._draws is None:
+            rng = np.random.default_rng((self.seed, self.epoch))
+            sources = rng.choice(len(self.names), size=len(self), p=self.weights)
+            keys = rng.integers(0, 2**62, size=len(self), dtype=np.int64)
+            self._draws = sources.astype(np.int16), keys
+        return self._draws
+
+    def __getitem__(self, idx):
+        sources, keys = self._get_draws()
+        source_idx = int(sources[idx])
+        name = self.names[source_idx]
+
+        start = time.perf_counter()
+        source = self.get_source(name)
+        image, label = source[int(keys[idx] % len(source))]
+        elapsed = time.perf_counter() - start
+
+        with self._counters.get_lock():
+            self._counters[2 * source_idx] += 1
+            self._counters[2 * source_idx + 1] += elapsed
+
+        if self.return_source:
+            return image, label, name
+        return image, label
+
+    def throughput(self):
+        """
+        Returns per source the number of loaded samples, the total loading time,
+        the loading rate (samples per second of loading) and the share of all samples.
+        """
+        with self._counters.get_lock():
+            counters = list(self._counters)
+
+        total = sum(counters[0::2])
+        result = {}
+        for i, name in enumerate(self.names):
+            samples, seconds = counters[2 * i], counters[2 * i + 1]
+            result[name] = {
+                "samples": int(samples),
+                "seconds": seconds,
+                "samples_per_sec": samples / seconds if seconds else 0.0,
+                "share": samples / total if total else 0.0,
+            }
+        return result
+
+    def reset_counters(self):
+        with self._counters.get_lock():
+            self._counters[:] = [0.0] * len(self._counters)
+
+
+def _get_dataset_class(name):
+    """
+    Returns the registered dataset class with the given name.
+    """
+    for dataset_cls in DATASETS:
+        if dataset_cls.__name__ == name:
+            return dataset_cls
+
+    raise ValueError(
+        f"Dataset {name} not found. Use DatasetManager.list_datasets() to see available datasets."
+    )
 
 
 class DatasetManager:
@@ -98,7 +409,18 @@ class DatasetManager:
             )
 
     @staticmethod
-    def get_dataset(name, transform=None, target_transform=None):
+    def get_dataset(
+        name,
+        transform=None,
+        target_transform=None,
+        normalize="minmax",
+        cache=False,
+        cache_bytes=None,
+        preload=False,
+        select=None,
+        materialize=None,
+        **dataset_kwargs,
+    ):
         """
         Loads a dataset by name.
 
@@ -106,16 +428,221 @@ class DatasetManager:
             name (str): The dataset class name (e.g., "BBBC003").
             transform: Optional image transformations.
             target_transform: Optional label transformations.
+            normalize: Image normalization mode (see `BBBCDataset`).
+            cache: Cache decoded images in shared memory across workers.
+            cache_bytes: Global byte budget of the cache.
+            preload: Load all samples into memory up front (see `BBBCDataset`).
+            select: Query selecting a subset of the samples (e.g. `{"blur": 1}`).
+            materialize: Read from a resized copy (e.g. `{"size": 512}`, see `BBBCDataset`).
+            **dataset_kwargs: Variant arguments for the dataset class (e.g. `snr="low"`).
 
         Returns:
             BBBCDataset instance.
         """
-        for dataset_cls in DATASETS:
-            if dataset_cls.__name__ == name:
-                return BBBCDataset(dataset_cls, transform, target_transform)
+        dataset_cls = _get_dataset_class(name)
+        return BBBCDataset(
+            dataset_cls,
+            transform,
+            target_transform,
+            dataset_kwargs,
+            normalize=normalize,
+            cache=cache,
+            cache_bytes=cache_bytes,
+            preload=preload,
+            select=select,
+            materialize=materialize,
+        )
+
+    @staticmethod
+    def get_variant_grid(name, download_dir=None, **fixed):
+        """
+        Returns a `VariantGrid` over all variants of a dataset (e.g. BBBC024).
+
+        Args:
+            name (str): The dataset class name.
+            download_dir (str, optional): Download directory of all variants.
+            **fixed: Variant arguments to fix, or lists of values to keep.
+
+        Returns:
+            VariantGrid instance.
+        """
+        dataset_cls = _get_dataset_class(name)
+        return VariantGrid(dataset_cls, download_dir=download_dir, **fixed)
+
+    @staticmethod
+    def get_mixture(weights, num_samples, seed=0, return_source=False, **kwargs):
+        """
+        Returns a weighted `MixtureDataset` over several datasets, which are
+        only instantiated when first sampled.
+
+        Args:
+            weights (dict): Dataset name -> weight, or -> `(weight, dataset_kwargs)`
+                to select a variant (e.g. `{"BBBC004": (1.0, {"overlap_probability": 0.3})}`).
+            num_samples (int): Samples per epoch.
+            seed (int): Seed of the sampling.
+            return_source (bool): Also return the source name of every sample.
+            **kwargs: Arguments for `get_dataset` shared by all sources (e.g. `normalize`).
+
+        Returns:
+            MixtureDataset instance.
+        """
+        factories, source_weights = {}, {}
+        for name, spec in weights.items():
+            _get_dataset_class(name)  # Fail early on unknown names
+            weight, dataset_kwargs = spec if isinstance(spec, tuple) else (spec, {})
+            factories[name] = partial(
+                DatasetManager.get_dataset, name, **kwargs, **dataset_kwargs
+            )
+            source_weights[name] = weight
+
+        return MixtureDataset(
+            factories,
+            source_weights,
+            num_samples=num_samples,
+            seed=seed,
+            return_source=return_source,
+        )
+
+    @staticmethod
+    def get_stream(
+        name, num_workers=1, pack_kwargs=None, stream_kwargs=None, **dataset_kwargs
+    ):
+        """
+        Returns a `PackStreamDataset` over the packed form of a dataset,
+        packing it first if no pack exists yet. New packs are split into
+        enough shards for every rank and DataLoader worker (see `stream_dataset`).
 
-        raise ValueError(
-            f"Dataset {name} not found. Use DatasetManager.list_datasets() to see available datasets."
+        Args:
+            name (str): The dataset class name (e.g., "BBBC039").
+            num_workers (int): Number of DataLoader workers per rank.
+            pack_kwargs (dict, optional): Arguments for `pack` (e.g. the output directory).
+            stream_kwargs (dict, optional): Arguments for `PackStreamDataset`
+                (e.g. `shuffle_buffer`, `seed`, `rank`, `world_size`).
+            **dataset_kwargs: Variant arguments for the dataset class.
+
+        Returns:
+            PackStreamDataset instance.
+        """
+        dataset_cls = _get_dataset_class(name)
+        return stream_dataset(
+            dataset_cls(**dataset_kwargs),
+            num_workers=num_workers,
+            pack_kwargs=pack_kwargs,
+            stream_kwargs=stream_kwargs,
+        )
+
+    @staticmethod
+    def get_tiles(
+        name,
+        tile_size=(256, 256),
+        overlap=0,
+        min_foreground=0.0,
+        transform=None,
+        target_transform=None,
+        normalize="minmax",
+        **dataset_kwargs,
+    ):
+        """
+        Returns a `TileDataset` of fixed-size tiles over the packed form of a
+        2D dataset, packing it first if no pack exists yet.
+
+        Args:
+            name (str): The dataset class name (e.g., "BBBC038").
+            tile_size (tuple): `(height, width)` of a tile.
+            overlap (int): Overlap between neighbouring tiles in pixels.
+            min_foreground (float): Minimum label foreground fraction of a tile.
+            transform: Optional image transformations.
+            target_transform: Optional label transformations.
+            normalize: Normalization mode of every tile (see `BBBCDataset`).
+            **dataset_kwargs: Variant arguments for the dataset class.
+
+        Returns:
+            TileDataset instance.
+        """
+        dataset_cls = _get_dataset_class(name)
+        reader = dataset_cls(**dataset_kwargs).pack()
+        return TileDataset(
+            reader,
+            tile_size=tile_size,
+            overlap=overlap,
+            min_foreground=min_foreground,
+            transform=transform,
+            target_transform=target_transform,
+            normalize=normalize,
+        )
+
+    @staticmethod
+    def get_sequence_windows(
+        name, window=3, stride=1, read_ahead=2, normalize="minmax", **dataset_kwargs
+    ):
+        """
+        Returns a `SlidingWindowDataset` over the time-lapse sequences of a
+        dataset (e.g. BBBC046, BBBC050).
+
+        Args:
+            name (str): The dataset class name.
+            window (int): Frames per window.
+            stride (int): Offset between consecutive windows.
+            read_ahead (int): Number of frames decoded ahead in the background.
+            normalize: Normalization mode of every window (see `BBBCDataset`).
+            **dataset_kwargs: Variant arguments for the dataset class.
+
+        Returns:
+            SlidingWindowDataset instance.
+        """
+        dataset_cls = _get_dataset_class(name)
+        dataset = dataset_cls(**dataset_kwargs)
+        return SlidingWindowDataset(
+            dataset.get_sequences(read_ahead=read_ahead),
+            window=window,
+            stride=stride,
+            get_label=dataset.get_label,
+            normalize=normalize,
+        )
+
+    @staticmethod
+    def get_dataloader(
+        name,
+        batch_size=4,
+        bucket_by="shape",
+        shuffle=True,
+        drop_last=False,
+        num_workers=0,
+        seed=0,
+        **kwargs,
+    ):
+        """
+        Loads a dataset by name and wraps it in a DataLoader whose batches only
+        combine samples of similar shape (see `ShapeBucketBatchSampler`), padded
+        to the batch maximum by `pad_collate`.
+
+        Args:
+            name (str): The dataset class name (e.g., "BBBC038").
+            batch_size (int): Maximum number of samples per batch.
+            bucket_by (str): "shape" (exact shapes) or "aspect" (aspect ratio buckets).
+            shuffle (bool): Shuffle samples and batches every epoch.
+            drop_last (bool): Drop incomplete batches.
+            num_workers (int): DataLoader worker processes.
+            seed (int): Seed of the batch shuffling.
+            **kwargs: Arguments for `get_dataset`.
+
+        Returns:
+            DataLoader yielding `(images, labels, masks)` batches.
+        """
+        dataset = DatasetManager.get_dataset(name, **kwargs)
+        sampler = ShapeBucketBatchSampler(
+            dataset.get_shapes(),
+            batch_size,
+            bucket_by=bucket_by,
+            shuffle=shuffle,
+            drop_last=drop_last,
+            seed=seed,
+        )
+        return DataLoader(
+            dataset,
+            batch_sampler=sampler,
+            collate_fn=pad_collate,
+            num_workers=num_workers,
         )
 
     @staticmethod
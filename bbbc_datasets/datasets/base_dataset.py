@@ -1,13 +1,61 @@
 import difflib
 import os
+import re
 import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 
 import numpy as np
 import pandas as pd
 import requests
 from tqdm import tqdm
 
-from bbbc_datasets.utils.file_io import load_image
+from bbbc_datasets.utils.chunked import chunk_dataset
+from bbbc_datasets.utils.file_io import load_image, probe
+from bbbc_datasets.utils.instances import to_instances
+from bbbc_datasets.utils.metadata import (
+    METADATA_EXTENSIONS,
+    join_metadata,
+    load_metadata_table,
+)
+from bbbc_datasets.utils.pack import pack_dataset
+from bbbc_datasets.utils.parallel import imap_ordered
+from bbbc_datasets.utils.rle import rle_decode_instances
+from bbbc_datasets.utils.sample_index import (
+    SAMPLE_INDEX_FILE,
+    SampleIndex,
+    directory_stamp,
+    image_key,
+    index_version,
+    parse_fields,
+)
+from bbbc_datasets.utils.sequence import LazySequence, group_sequences
+from bbbc_datasets.utils.statistics import DatasetStatistics, compute_statistics
+
+_worker_dataset = None
+
+
+def _init_instance_worker(dataset):
+    global _worker_dataset
+    _worker_dataset = dataset
+
+
+def _build_instance_label(dataset, image_path, refresh=False):
+    """
+    Converts and caches the instance label of one image.
+    Returns False if the image has no label.
+    """
+    if os.path.exists(dataset._instance_file(image_path)) and not refresh:
+        return True
+    try:
+        dataset._convert_instance_label(image_path)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def _build_instance_label_in_worker(image_path, refresh=False):
+    return _build_instance_label(_worker_dataset, image_path, refresh=refresh)
 
 
 class BaseBBBCDataset:
@@ -24,6 +72,7 @@ class BaseBBBCDataset:
     DEFAULT_PATH: str = os.path.expanduser("~/.bbbc_datasets/")
     IMAGE_SUBDIR: str = "images"
     LABEL_SUBDIR: str = "labels"
+    CACHE_SUBDIR: str = "cache"
 
     IMAGE_FILTER = [".png", ".jpg", ".jpeg", ".tif", ".tiff", ".ics"]
 
@@ -34,6 +83,22 @@ class BaseBBBCDataset:
 
     is_3d: bool = False
 
+    # How labels are converted into instance maps: None if they already are,
+    # "components" for foreground masks, "rgb" for color-coded instances
+    INSTANCE_MODE = None
+
+    # Variant arguments of the constructor and their values (see `VariantGrid`)
+    VARIANTS = {}
+
+    # Regular expression with named groups parsed from the image file names
+    # into the sample index (e.g. blur level and cell count of BBBC005)
+    FILENAME_PATTERN = None
+
+    # Explicit column dtypes and image file name columns of metadata files,
+    # by file name (e.g. {"counts.csv": {"count": "int32"}})
+    METADATA_DTYPES = {}
+    METADATA_KEY_COLUMNS = {}
+
     def __init__(self, download_dir=None, download_files=True):
         """
         Initialize the dataset with name and file paths.
@@ -45,6 +110,10 @@ class BaseBBBCDataset:
             raise ValueError("KEY not defined")
 
         self.ground_truth = None
+        self._ground_truth_data = None
+        self._label_lookup = None
+        self._sample_index = None
+        self._metadata = None
 
         if not download_dir:
             self.download_dir = self.DEFAULT_PATH
@@ -67,23 +136,56 @@ class BaseBBBCDataset:
             elif self.label_path.endswith(".tif"):
                 self.ground_truth = local_file
 
+    def get_download_tasks(self):
+        """
+        Returns the `(key, url)` pairs of all files of this variant; the key
+        selects the target folder (see `get_download_folder`).
+        """
+        tasks = []
+        for key, urls in (
+            ("image", self.image_paths),
+            ("label", self.label_path),
+            ("metadata", self.metadata_paths),
+        ):
+            if isinstance(urls, list):
+                tasks.extend((key, url) for url in urls)
+            elif urls:
+                tasks.append((key, urls))
+        return tasks
+
     def _download_files(self):
         """
         Checks for missing dataset files and downloads them if necessary.
         """
         os.makedirs(self.local_path, exist_ok=True)
 
-        if isinstance(self.image_paths, list):
-            for url in self.image_paths:
-                self._download_and_extract("image", url)
-        elif self.image_paths:
-            self._download_and_extract("image", self.image_paths)
+        for key, url in self.get_download_tasks():
+            self._download_and_extract(key, url)
+
+    def _is_downloaded(self, local_file, unzip_folder, legacy=True):
+        """
+        Checks whether a file was downloaded (and extracted) already.
+
+        Every extracted archive leaves a marker in its folder, so several
+        archives can be extracted into one folder. With `legacy`, folders
+        extracted before markers existed count as complete; shared folders
+        that also hold plain files (e.g. metadata) rely on the marker only.
+        """
+        if not local_file.endswith(".zip"):
+            return os.path.exists(local_file)
+        if not os.path.exists(unzip_folder):
+            return False
+        marker = os.path.join(unzip_folder, self._marker_name(local_file))
+        if os.path.exists(marker):
+            return True
+        return legacy and not any(
+            f.startswith(".") and f.endswith(".extracted")
+            for f in os.listdir(unzip_folder)
+        )
 
-        if isinstance(self.label_path, list):
-            for url in self.label_path:
-                self._download_and_extract("label", url)
-        elif self.label_path:
-            self._download_and_extract("label", self.label_path)
+    @staticmethod
+    def _marker_name(local_file):
+        return f".{os.path.basename(local_file)}.extracted"
 
     def _download_and_extract(self, key, url):
         """
@@ -94,8 +196,9 @@ class BaseBBBCDataset:
 
         local_file, unzip_folder = self.get_download_folder(url, key)
 
-        if not os.path.exists(unzip_folder):
+        if not self._is_downloaded(local_file, unzip_folder, legacy=key != "metadata"):
             print(f"Downloading {local_file}...")
+            os.makedirs(os.path.dirname(local_file), exist_ok=True)
             response = requests.get(url, stream=True)
             if response.status_code == 200:
                 total_size = int(response.headers.get("content-length", 0))
@@ -116,9 +219,16 @@ class BaseBBBCDataset:
             # Extract if it's a zip file
             if local_file.endswith(".zip"):
                 self._extract_zip(local_file, unzip_folder)
+                open(
+                    os.path.join(unzip_folder, self._marker_name(local_file)), "w"
+                ).close()
                 os.remove(local_file)  # Delete the zip file after extraction
 
     def get_download_folder(self, url, key):
+        if key == "metadata":
+            metadata_dir = os.path.join(self.local_path, "metadata")
+            return os.path.join(metadata_dir, os.path.basename(url)), metadata_dir
+
         local_file = os.path.join(self.local_path, os.path.basename(url))
         folder_name = self.IMAGE_SUBDIR if "image" in key else self.LABEL_SUBDIR
         unzip_folder = os.path.join(self.local_path, folder_name)
@@ -157,46 +267,60 @@ class BaseBBBCDataset:
         images = self._get_paths(self.IMAGE_SUBDIR)
         return images
 
-    def get_label(self, image_path):
+    def get_sequences(self, read_ahead=2):
+        """
+        Returns the time-lapse sequences of this variant (e.g. BBBC046, BBBC050):
+        the frame files grouped by directory and naturally sorted, each as a
+        `LazySequence` that is indexable like a (T, Z, Y, X) array.
+
+        :param read_ahead: Number of frames decoded ahead in the background.
+        :return: Dict mapping the sequence directory (relative to the dataset) to its sequence.
+        """
+        return {
+            os.path.relpath(directory, self.local_path): LazySequence(
+                frames, read_ahead=read_ahead
+            )
+            for directory, frames in group_sequences(self.get_image_paths()).items()
+        }
+
+    def get_label(self, image_path, kind=None):
         """
         Returns the label mask for a given image path.
+
+        :param image_path: The image path.
+        :param kind: None for the label as shipped, or "instance" for the
+            canonical instance map (see `get_instance_label`).
         """
+        if kind == "instance":
+            return self.get_instance_label(image_path)
+        if kind is not None:
+            raise ValueError(f"Invalid label kind: {kind}")
+
         if self.ground_truth:
             if self.ground_truth.endswith(".tif"):
-                return load_image(self.ground_truth)
+                return self._load_ground_truth()
             elif self.ground_truth.endswith(".csv"):
-                gt_all = pd.read_csv(self.ground_truth)
-                image_id = os.path.basename(image_path).split(".")[0]
-                gt_image = gt_all[gt_all["ImageId"] == image_id]
-                pixels = gt_image["EncodedPixels"]
-
-                image = load_image(image_path)
-                labels = np.zeros_like(image)
-
-                for pxls in pixels:
-                    if isinstance(pxls, str):
-                        pxls = pxls.split(" ")
-                        pxls = [int(p) for p in pxls]
-                        for i in range(0, len(pxls), 2):
-                            labels[pxls[i] : pxls[i + 1]] = 1
-                return labels
+                # One run-length encoded object per row (Kaggle format)
+                encoded = self._load_ground_truth().get(image_key(image_path), [])
+                return rle_decode_instances(encoded, probe(image_path).shape[:2])
             else:
                 raise NotImplementedError("Label type not supported.")
 
         # Find the corresponding label mask
-        label_paths = self.get_label_paths()
+        label_paths, labels_by_key = self._get_label_lookup()
 
         if not label_paths:
             return None
 
+        # Prefer a label with the same file name, otherwise
         # find the label path the most similar to the image path
-        label_path = difflib.get_close_matches(
-            image_path, label_paths, n=1, cutoff=0.25
-        )
-
-        if not label_path:
-            raise FileNotFoundError(f"Label mask not found for {image_path}")
-        else:
+        label_path = labels_by_key.get(image_key(image_path))
+        if label_path is None:
+            label_path = difflib.get_close_matches(
+                image_path, label_paths, n=1, cutoff=0.25
+            )
+            if not label_path:
+                raise FileNotFoundError(f"Label mask not found for {image_path}")
             label_path = label_path[0]
 
         if os.path.exists(label_path):
@@ -204,6 +328,97 @@ class BaseBBBCDataset:
         else:
             raise FileNotFoundError(f"Label mask not found for {image_path}")
 
+    def _instance_file(self, image_path):
+        relative = os.path.splitext(os.path.relpath(image_path, self.local_path))[0]
+        name = re.sub(r"[^\w.-]+", "_", relative)
+        return os.path.join(self.get_cache_dir("instances"), f"{name}.npy")
+
+    def _convert_instance_label(self, image_path):
+        label = self.get_label(image_path)
+        if label is None:
+            raise FileNotFoundError(f"Label mask not found for {image_path}")
+        instances = to_instances(label, self.INSTANCE_MODE)
+
+        path = self._instance_file(image_path)
+        tmp_path = f"{path}.{os.getpid()}.tmp.npy"
+        np.save(tmp_path, instances)
+        os.replace(tmp_path, path)
+        return instances
+
+    def get_instance_label(self, image_path):
+        """
+        Returns the instance label map of an image (one integer per object).
+
+        Labels that are not instance maps (see `INSTANCE_MODE`) are converted
+        once and cached as `.npy` files, so later calls are a single read.
+        """
+        if self.INSTANCE_MODE is None:
+            return self.get_label(image_path)
+
+        path = self._instance_file(image_path)
+        if os.path.exists(path):
+            return np.load(path)
+        return self._convert_instance_label(image_path)
+
+    def build_instance_labels(self, workers=None, refresh=False):
+        """
+        Converts the labels of all images into cached instance maps in a process pool.
+
+        :param workers: Number of worker processes.
+        :param refresh: Convert again even if cached maps exist.
+        :return: The number of images with an instance label.
+        """
+        if self.INSTANCE_MODE is None:
+            return 0
+
+        image_paths = self.get_image_paths()
+        if workers is not None and workers <= 1:
+            return sum(
+                _build_instance_label(self, path, refresh=refresh)
+                for path in image_paths
+            )
+
+        executor_cls = partial(
+            ProcessPoolExecutor,
+            initializer=_init_instance_worker,
+            initargs=(self,),
+        )
+        results = imap_ordered(
+            partial(_build_instance_label_in_worker, refresh=refresh),
+            image_paths,
+            workers=workers,
+            executor_cls=executor_cls,
+        )
+        return sum(results)
+
+    def _load_ground_truth(self):
+        """
+        Loads a single-file ground truth once per process and keeps it in memory.
+        CSV ground truth is kept as a mapping ImageId -> list of encoded pixels.
+        """
+        if self._ground_truth_data is None:
+            if self.ground_truth.endswith(".tif"):
+                self._ground_truth_data = load_image(self.ground_truth)
+            else:
+                gt_all = pd.read_csv(self.ground_truth, dtype={"ImageId": str})
+                self._ground_truth_data = {
+                    image_id: list(group)
+                    for image_id, group in gt_all.groupby("ImageId")["EncodedPixels"]
+                }
+        return self._ground_truth_data
+
+    def _get_label_lookup(self):
+        """
+        Lists the label paths once per process and indexes them by file name.
+        """
+        if self._label_lookup is None:
+            label_paths = self.get_label_paths()
+            labels_by_key = {}
+            for label_path in label_paths:
+                labels_by_key.setdefault(image_key(label_path), label_path)
+            self._label_lookup = (label_paths, labels_by_key)
+        return self._label_lookup
+
     def get_label_paths(self):
         """
         Returns the label mask file path (if available).
@@ -211,6 +426,180 @@ class BaseBBBCDataset:
         images = self._get_paths(self.LABEL_SUBDIR)
         return images
 
+    @property
+    def cache_key(self):
+        """
+        Returns a filesystem-safe identifier of this dataset variant.
+
+        Variants that share a download (e.g. BBBC046 AR/fluorescence levels) only
+        differ in their image subdirectory, so it is part of the key.
+        """
+        return re.sub(r"[^\w.-]+", "_", f"{self.KEY}_{self.IMAGE_SUBDIR}")
+
+    def get_cache_dir(self, *parts):
+        """
+        Returns (and creates) a cache directory for derived data of this variant.
+        """
+        dir_path = os.path.join(
+            self.local_path, self.CACHE_SUBDIR, self.cache_key, *parts
+        )
+        os.makedirs(dir_path, exist_ok=True)
+        return dir_path
+
+    def get_sample_index(self, refresh=False, workers=None):
+        """
+        Returns the cached `SampleIndex` of this variant (one row per image with
+        header-probed shape, dtype, channel and page information).
+
+        The index is built on first use by probing image headers in parallel and
+        cached on disk. A cached index is reused while its image folders are
+        unchanged (see `directory_stamp`); if they changed, the files are listed
+        and the index is rebuilt when their paths, sizes or modification times
+        differ (see `index_version`), along with the caches keyed by its version.
+        Pass `refresh=True` after rewriting files in place.
+
+        :param refresh: Rebuild the index even if a cached one is up to date.
+        :param workers: Number of probing threads.
+        """
+        if self._sample_index is not None and not refresh:
+            return self._sample_index
+
+        index_file = os.path.join(self.get_cache_dir(), SAMPLE_INDEX_FILE)
+        index = None
+        if os.path.exists(index_file) and not refresh:
+            index = SampleIndex.load(self.local_path, index_file)
+            if index.stamp != directory_stamp(index.image_paths):
+                image_paths = self.get_image_paths()
+                if index.version == index_version(self.local_path, image_paths):
+                    index.stamp = directory_stamp(image_paths)
+                    index.save(index_file)
+                else:
+                    index = None
+        if index is None:
+            image_paths = self.get_image_paths()
+            index = SampleIndex.build(self.local_path, image_paths, workers=workers)
+            if image_paths:
+                index.save(index_file)
+
+        # Parsed fields are cheap to derive, so they are added on every load
+        fields = self.get_sample_fields(index.table)
+        new_columns = [c for c in fields.columns if c not in index.table.columns]
+        if new_columns:
+            index.table = pd.concat([index.table, fields[new_columns]], axis=1)
+
+        self._sample_index = index
+        return index
+
+    def get_sample_fields(self, table):
+        """
+        Returns structured per-sample fields for the rows of a sample table:
+        the named groups of `FILENAME_PATTERN` parsed from the file names,
+        joined with `get_metadata_fields` on the image key.
+        """
+        if self.FILENAME_PATTERN is not None:
+            fields = parse_fields(table["image_path"], self.FILENAME_PATTERN)
+        else:
+            fields = pd.DataFrame(index=table.index)
+
+        metadata = self.get_metadata_fields()
+        if metadata is not None:
+            columns = [c for c in metadata.columns if c not in fields.columns]
+            metadata = metadata[columns].drop_duplicates("key")
+        if metadata is not None and len(metadata.columns) > 1:
+            joined = table[["key"]].merge(metadata, on="key", how="left")
+            # Images without metadata get "" in text columns
+            for name in joined.columns:
+                column = joined[name]
+                if isinstance(column.dtype, pd.CategoricalDtype):
+                    if "" not in column.cat.categories:
+                        column = column.cat.add_categories("")
+                    joined[name] = column.fillna("")
+                elif column.dtype == object:
+                    joined[name] = column.fillna("")
+            fields = pd.concat(
+                [fields, joined.drop(columns="key").set_index(table.index)], axis=1
+            )
+        return fields
+
+    def get_metadata_fields(self):
+        """
+        Returns per-image fields from the metadata files as a DataFrame with a
+        `key` column (see `image_key`), or None: the metadata tables that refer
+        to image files, joined on the image key.
+        """
+        return join_metadata(
+            self.get_metadata(), self.METADATA_KEY_COLUMNS, self.IMAGE_FILTER
+        )
+
+    def get_metadata(self, refresh=False):
+        """
+        Returns the typed metadata tables of this dataset by file name.
+
+        Every metadata CSV is parsed once (with the dtypes from `METADATA_DTYPES`)
+        and cached as column arrays, so later loads skip the text parsing
+        until the file changes.
+
+        :param refresh: Parse all files again.
+        """
+        if self._metadata is not None and not refresh:
+            return self._metadata
+
+        tables = {}
+        metadata_dir = os.path.join(self.local_path, "metadata")
+        for dir_path, _, files in sorted(os.walk(metadata_dir)):
+            for name in sorted(files):
+                if not name.lower().endswith(METADATA_EXTENSIONS):
+                    continue
+                tables[name] = load_metadata_table(
+                    os.path.join(dir_path, name),
+                    os.path.join(self.get_cache_dir("metadata"), f"{name}.npz"),
+                    dtypes=self.METADATA_DTYPES.get(name),
+                    refresh=refresh,
+                )
+        self._metadata = tables
+        return tables
+
+    def get_statistics(self, labels=True, workers=None, refresh=False):
+        """
+        Returns the `DatasetStatistics` of this variant (intensity moments and
+        histogram, object counts per image, shape distribution).
+
+        Statistics are computed in one parallel streaming pass and cached keyed
+        by the sample index version, so they are recomputed only when the
+        indexed files change.
+
+        :param labels: Also count the objects in every label mask.
+        :param workers: Number of decoding threads.
+        :param refresh: Recompute even if cached statistics exist.
+        """
+        version = self.get_sample_index().version
+        suffix = "" if labels else "_nolabels"
+        stats_file = os.path.join(
+            self.get_cache_dir(), f"statistics_{version}{suffix}.npz"
+        )
+        if os.path.exists(stats_file) and not refresh:
+            return DatasetStatistics.load(stats_file)
+
+        print(f"📊 Computing statistics of {self.KEY}...")
+        stats = compute_statistics(self, labels=labels, workers=workers)
+        stats.save(stats_file)
+        return stats
+
+    def pack(self, out_dir=None, **kwargs):
+        """
+        Converts this dataset into sharded array storage and returns a `PackReader`.
+        See `bbbc_datasets.utils.pack.pack_dataset` for the available options.
+        """
+        return pack_dataset(self, out_dir=out_dir, **kwargs)
+
+    def chunk(self, out_dir=None, **kwargs):
+        """
+        Converts the volumes of this dataset into chunked storage and returns a
+        `ChunkedStore`. See `bbbc_datasets.utils.chunked.chunk_dataset` for the
+        available options.
+        """
+        return chunk_dataset(self, out_dir=out_dir, **kwargs)
+
     def get_metadata_paths(self):
         """
         Returns the metadata file paths (if available).
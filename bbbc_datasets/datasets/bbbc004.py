@@ -24,6 +24,7 @@ class BBBC004(BaseBBBCDataset):
     """
 
     BASE_URL = "https://data.broadinstitute.org/bbbc/BBBC004"
+    INSTANCE_MODE = "components"
 
     OVERLAP_PROBABILITIES = {
         0.00: "000",
@@ -33,6 +34,8 @@ class BBBC004(BaseBBBCDataset):
         0.60: "060",
     }
 
+    VARIANTS = {"overlap_probability": list(OVERLAP_PROBABILITIES)}
+
     def __init__(self, overlap_probability=0.00, *args, **kwargs):
         """
         Initialize the dataset with a specific overlap probability.
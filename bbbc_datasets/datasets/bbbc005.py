@@ -1,4 +1,5 @@
 import os
+import re
 
 from bbbc_datasets.datasets.base_dataset import BaseBBBCDataset
 
@@ -29,6 +30,10 @@ class BBBC005(BaseBBBCDataset):
     """
 
     BASE_URL = "https://data.broadinstitute.org/bbbc/BBBC005"
+    INSTANCE_MODE = "components"
+    FILENAME_PATTERN = re.compile(
+        r"_(?P<well>[A-P]\d{2})_C(?P<count>\d+)_F(?P<blur>\d+)_s(?P<site>\d+)_w(?P<stain>\d)"
+    )
 
     def __init__(self, *args, **kwargs):
         self.KEY = "BBBC005"
@@ -1,6 +1,12 @@
 import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
 
 from bbbc_datasets.datasets.base_dataset import BaseBBBCDataset
+from bbbc_datasets.utils.file_io import load_image
+from bbbc_datasets.utils.sequence import LazySequence
 
 
 class BBBC006(BaseBBBCDataset):
@@ -27,6 +33,11 @@ class BBBC006(BaseBBBCDataset):
     """
 
     BASE_URL = "https://data.broadinstitute.org/bbbc/BBBC006"
+    FILENAME_PATTERN = re.compile(
+        r"_(?P<field>(?P<well>[a-p]\d{2})_s(?P<site>\d+))_w(?P<channel>\d)",
+        re.IGNORECASE,
+    )
+    PLANE_KEY = "BBBC006_Z{:02}"  # Download folder of every z-plane variant
 
     def __init__(self, z_plane=16, *args, **kwargs):
         """
@@ -38,7 +49,7 @@ class BBBC006(BaseBBBCDataset):
             raise ValueError(f"Invalid z-plane: {z_plane}. Choose between 0 and 32.")
 
         self.z_plane = z_plane
-        self.KEY = f"BBBC006_Z{z_plane:02}"
+        self.KEY = self.PLANE_KEY.format(z_plane)
         self.image_paths = [
             os.path.join(self.BASE_URL, f"BBBC006_v1_images_z_{z_plane:02}.zip")
         ]
@@ -50,3 +61,218 @@ class BBBC006(BaseBBBCDataset):
         self.is_3d = False
 
         super().__init__(*args, **kwargs)
+
+
+class BBBC006Stack(BaseBBBCDataset):
+    """
+    BBBC006 Focal Stacks: All z-planes of each field of view as one (Z, Y, X) stack.
+
+    - The z-plane archives (`BBBC006_v1_images_z_XX.zip`) are downloaded
+      concurrently into the folders of the `BBBC006` plane variants
+      (`BBBC006_ZXX/images`), so planes downloaded by either class are reused.
+      Labels and metadata are shared with the variant of the focus plane (z = 16,
+      or the first selected plane).
+    - `get_image_paths` lists the 2D plane images; the (Z, Y, X) stacks are
+      served by `get_stack` and `get_sequences`.
+    - A per-field index (well, site, channel, z) is built once from the file
+      names of all planes.
+    - Stacks are served lazily (see `LazySequence`), and all planes of a field
+      share one label mask.
+
+    - **Source:** https://bbbc.broadinstitute.org/BBBC006
+    """
+
+    BASE_URL = BBBC006.BASE_URL
+    FILENAME_PATTERN = BBBC006.FILENAME_PATTERN
+    NUM_Z_PLANES = 33
+    FOCUS_PLANE = 16
+    FIELD_PATTERN = re.compile(
+        r"_(?P<well>[a-p]\d{2})_s(?P<site>\d+)(?:_w(?P<channel>\d))?", re.IGNORECASE
+    )
+
+    def __init__(self, z_planes=None, channel=1, download_workers=8, *args, **kwargs):
+        """
+        Initialize the dataset for a set of z-planes.
+
+        :param z_planes: The z-planes to include (default: all 33).
+        :param channel: The fluorescence channel (1 = Hoechst, 2 = Phalloidin).
+        :param download_workers: Number of concurrent archive downloads.
+        """
+        z_planes = range(self.NUM_Z_PLANES) if z_planes is None else z_planes
+        self.z_planes = tuple(sorted(int(z) for z in z_planes))
+        if not self.z_planes or not all(
+            0 <= z < self.NUM_Z_PLANES for z in self.z_planes
+        ):
+            raise ValueError(
+                f"Invalid z-planes: {z_planes}. Choose between 0 and {self.NUM_Z_PLANES - 1}."
+            )
+        if channel not in (1, 2):
+            raise ValueError(f"Invalid channel: {channel}. Choose 1 or 2.")
+
+        self.channel = channel
+        self.download_workers = download_workers
+        # Labels and metadata live in (and are reused from) one plane variant
+        self.home_plane = (
+            self.FOCUS_PLANE if self.FOCUS_PLANE in self.z_planes else self.z_planes[0]
+        )
+        self.KEY = BBBC006.PLANE_KEY.format(self.home_plane)
+        self.image_paths = [
+            os.path.join(self.BASE_URL, f"BBBC006_v1_images_z_{z:02}.zip")
+            for z in self.z_planes
+        ]
+        self.label_path = os.path.join(self.BASE_URL, "BBBC006_v1_labels.zip")
+        self.metadata_paths = [
+            os.path.join(self.BASE_URL, "BBBC006_v1_counts.csv"),
+            os.path.join(self.BASE_URL, "BBBC006_results_bray.csv"),
+        ]
+        self.is_3d = False  # The image paths are 2D planes
+        self._field_index = None
+        self._field_labels = None
+
+        super().__init__(*args, **kwargs)
+
+    @property
+    def cache_key(self):
+        """
+        Stack caches are kept apart from those of the plane variant they share a folder with.
+        """
+        return f"BBBC006_STACK_w{self.channel}"
+
+    def get_plane_dir(self, z):
+        """
+        Returns the image folder of a z-plane (the one `BBBC006(z_plane=z)` uses).
+        """
+        return os.path.join(
+            self.download_dir, BBBC006.PLANE_KEY.format(z), self.IMAGE_SUBDIR
+        )
+
+    def get_download_tasks(self):
+        """
+        Every z-plane archive gets its own key, so it is extracted into its own folder.
+        """
+        tasks = [
+            (f"image_z_{z:02}", url) for z, url in zip(self.z_planes, self.image_paths)
+        ]
+        return tasks + [t for t in super().get_download_tasks() if t[0] != "image"]
+
+    def _download_files(self):
+        """
+        Downloads the z-plane archives concurrently, each into its own folder.
+        """
+        os.makedirs(self.local_path, exist_ok=True)
+
+        with ThreadPoolExecutor(max_workers=self.download_workers) as executor:
+            futures = [
+                executor.submit(self._download_and_extract, key, url)
+                for key, url in self.get_download_tasks()
+            ]
+            for future in futures:
+                future.result()
+
+    def get_download_folder(self, url, key):
+        if key.startswith("image_z_"):
+            plane_dir = self.get_plane_dir(int(key[len("image_z_") :]))
+            local_file = os.path.join(os.path.dirname(plane_dir), os.path.basename(url))
+            return local_file, plane_dir
+        return super().get_download_folder(url, key)
+
+    def get_image_paths(self):
+        """
+        Returns the image paths of the selected planes and channel.
+        """
+        table = self.get_field_index()
+        return [
+            os.path.normpath(os.path.join(self.local_path, p))
+            for p in table["image_path"]
+        ]
+
+    def get_field_index(self):
+        """
+        Returns the per-field index of the selected planes and channel: one row
+        per image with `field` (e.g. "a01_s1"), `well`, `site`, `channel`, `z`
+        and the image path relative to the dataset folder (`../BBBC006_ZXX/...`
+        for the other planes), sorted by field and z.
+        """
+        if self._field_index is not None:
+            return self._field_index
+
+        rows = []
+        for z in self.z_planes:
+            plane_dir = os.path.relpath(self.get_plane_dir(z), self.local_path)
+            for path in self._get_paths(plane_dir):
+                match = self.FIELD_PATTERN.search(os.path.basename(path))
+                if not match or int(match["channel"] or 0) != self.channel:
+                    continue
+                well, site = match["well"].lower(), int(match["site"])
+                rows.append(
+                    {
+                        "field": f"{well}_s{site}",
+                        "well": well,
+                        "site": site,
+                        "channel": self.channel,
+                        "z": z,
+                        "image_path": os.path.relpath(path, self.local_path),
+                    }
+                )
+
+        columns = ["field", "well", "site", "channel", "z", "image_path"]
+        table = pd.DataFrame(rows, columns=columns)
+        self._field_index = table.sort_values(["field", "z"], ignore_index=True)
+        return self._field_index
+
+    def get_fields(self):
+        """
+        Returns the field keys that have an image in every selected plane.
+        """
+        counts = self.get_field_index()["field"].value_counts()
+        return sorted(counts.index[counts == len(self.z_planes)])
+
+    def get_stack(self, field, read_ahead=4):
+        """
+        Returns the lazy (Z, Y, X) focal stack of a field.
+        """
+        table = self.get_field_index()
+        paths = table.loc[table["field"] == field, "image_path"]
+        if not len(paths):
+            raise KeyError(f"Unknown field: {field}")
+        return LazySequence(
+            [os.path.normpath(os.path.join(self.local_path, p)) for p in paths],
+            read_ahead=read_ahead,
+        )
+
+    def get_sequences(self, read_ahead=4):
+        """
+        Returns the focal stacks of all complete fields.
+        """
+        return {
+            field: self.get_stack(field, read_ahead=read_ahead)
+            for field in self.get_fields()
+        }
+
+    def _field_of(self, name):
+        # The leading "_" lets bare field keys ("a01_s1") match as well
+        match = self.FIELD_PATTERN.search(f"_{os.path.basename(name)}")
+        if not match:
+            return None
+        return f"{match['well'].lower()}_s{int(match['site'])}"
+
+    def get_label(self, image_path, kind=None):
+        """
+        Returns the label mask of the field of an image (or of a field key);
+        all planes of a field share it. The masks are instance maps already.
+        """
+        if kind not in (None, "instance"):
+            raise ValueError(f"Invalid label kind: {kind}")
+        if self._field_labels is None:
+            label_paths, _ = self._get_label_lookup()
+            self._field_labels = {
+                self._field_of(path): path
+                for path in sorted(label_paths)
+                if self._field_of(path)
+            }
+
+        field = self._field_of(image_path)
+        label_path = self._field_labels.get(field)
+        if label_path is None:
+            raise FileNotFoundError(f"Label mask not found for {image_path}")
+        return load_image(label_path)
@@ -1,6 +1,11 @@
 import os
+import re
+
+import numpy as np
 
 from bbbc_datasets.datasets.base_dataset import BaseBBBCDataset
+from bbbc_datasets.utils.file_io import load_image
+from bbbc_datasets.utils.parallel import imap_ordered
 
 
 class BBBC010(BaseBBBCDataset):
@@ -25,6 +30,10 @@ class BBBC010(BaseBBBCDataset):
     """
 
     BASE_URL = "https://data.broadinstitute.org/bbbc/BBBC010"
+    INSTANCE_SUBDIR = "labels_eachworm"
+    WELL_PATTERN = re.compile(r"(?:^|_)(?P<well>[A-P]\d{2})_")
+    WORM_PATTERN = re.compile(r"^(?P<well>[A-P]\d{2})_(?P<worm>\d+)")
+    FILENAME_PATTERN = re.compile(r"_(?P<well>[A-P]\d{2})_w(?P<channel>\d)")
 
     def __init__(self, *args, **kwargs):
         self.KEY = "BBBC010"
@@ -35,5 +44,128 @@ class BBBC010(BaseBBBCDataset):
         ]
         self.metadata_paths = None
         self.is_3d = False
+        self._worm_masks = None
+        self._foreground_masks = None
 
         super().__init__(*args, **kwargs)
+
+    def get_download_tasks(self):
+        """
+        Adds the per-worm masks to the images and foreground masks.
+        """
+        return super().get_download_tasks() + [
+            ("instance_label", url) for url in self.additional_label_paths
+        ]
+
+    def get_download_folder(self, url, key):
+        if key == "instance_label":
+            local_file = os.path.join(self.local_path, os.path.basename(url))
+            return local_file, os.path.join(self.local_path, self.INSTANCE_SUBDIR)
+        return super().get_download_folder(url, key)
+
+    def get_well(self, path):
+        """
+        Returns the well (e.g. "A01") of an image or mask path (or None).
+        """
+        match = self.WELL_PATTERN.search(os.path.basename(path))
+        return match["well"] if match else None
+
+    def get_worm_masks(self):
+        """
+        Returns the per-worm mask paths by well, ordered by worm number.
+        """
+        if self._worm_masks is None:
+            worms = {}
+            for path in self._get_paths(self.INSTANCE_SUBDIR):
+                match = self.WORM_PATTERN.search(os.path.basename(path))
+                if match:
+                    worms.setdefault(match["well"], []).append(
+                        (int(match["worm"]), path)
+                    )
+            self._worm_masks = {
+                well: [path for _, path in sorted(masks)]
+                for well, masks in sorted(worms.items())
+            }
+        return self._worm_masks
+
+    @staticmethod
+    def compose_instances(mask_paths):
+        """
+        Composes binary per-worm masks into one uint16 instance map; worm `k`
+        gets label `k + 1`. Where worms overlap, the later worm is kept.
+        """
+        label = None
+        for worm, path in enumerate(mask_paths, start=1):
+            mask = load_image(path)
+            if mask.ndim == 3:
+                mask = mask.max(axis=-1)
+            if label is None:
+                label = np.zeros(mask.shape, dtype=np.uint16)
+            label[mask > 0] = worm
+        return label
+
+    def _well_file(self, well):
+        return os.path.join(self.get_cache_dir("instances"), f"{well}.npy")
+
+    def _compose_and_cache(self, well):
+        label = self.compose_instances(self.get_worm_masks()[well])
+        path = self._well_file(well)
+        tmp_path = f"{path}.{os.getpid()}.tmp.npy"
+        np.save(tmp_path, label)
+        os.replace(tmp_path, path)
+        return label
+
+    def build_instance_labels(self, workers=None, refresh=False):
+        """
+        Composes the instance maps of all wells in parallel and caches them as
+        `.npy` files in the dataset cache, so that loading an instance label
+        is a single read.
+
+        :param workers: Number of composing threads.
+        :param refresh: Recompose even if cached maps exist.
+        :return: The number of composed wells.
+        """
+        wells = [
+            well
+            for well in self.get_worm_masks()
+            if refresh or not os.path.exists(self._well_file(well))
+        ]
+        for _ in imap_ordered(self._compose_and_cache, wells, workers=workers):
+            pass
+        return len(wells)
+
+    def get_instance_label(self, image_path):
+        """
+        Returns the uint16 per-worm instance map of an image's well (composed
+        and cached on first use).
+        """
+        well = self.get_well(image_path)
+        if well is None or well not in self.get_worm_masks():
+            raise FileNotFoundError(f"Worm masks not found for {image_path}")
+        path = self._well_file(well)
+        if os.path.exists(path):
+            return np.load(path)
+        return self._compose_and_cache(well)
+
+    def get_label(self, image_path, kind=None):
+        """
+        Returns the label mask of an image.
+
+        :param image_path: The image path.
+        :param kind: None (or "foreground") for the binary foreground mask, or
+            "instance" for the per-worm instance map.
+        """
+        if kind == "instance":
+            return self.get_instance_label(image_path)
+        if kind not in (None, "foreground"):
+            raise ValueError(f"Invalid label kind: {kind}")
+
+        # Foreground masks are named by well only (e.g. "A01_binary.png")
+        if self._foreground_masks is None:
+            self._foreground_masks = {
+                self.get_well(path): path for path in self.get_label_paths()
+            }
+        label_path = self._foreground_masks.get(self.get_well(image_path))
+        if label_path is not None:
+            return load_image(label_path)
+        return super().get_label(image_path)
@@ -24,11 +24,17 @@ class BBBC024(BaseBBBCDataset):
     """
 
     BASE_URL = "https://data.broadinstitute.org/bbbc/BBBC024"
+    INSTANCE_MODE = "components"
 
     CLUSTERING_PROBABILITIES = {0: "c00", 25: "c25", 50: "c50", 75: "c75"}
 
     SNR_LEVELS = {"low": "lowSNR", "high": "highSNR"}
 
+    VARIANTS = {
+        "clustering_probability": list(CLUSTERING_PROBABILITIES),
+        "snr": list(SNR_LEVELS),
+    }
+
     def __init__(self, clustering_probability=0, snr="high", *args, **kwargs):
         """
         Initialize the dataset for a specific clustering probability and SNR level.
@@ -23,9 +23,12 @@ class BBBC027(BaseBBBCDataset):
     """
 
     BASE_URL = "https://data.broadinstitute.org/bbbc/BBBC027"
+    INSTANCE_MODE = "components"
 
     SNR_LEVELS = {"low": "lowSNR", "high": "highSNR"}
 
+    VARIANTS = {"snr": list(SNR_LEVELS)}
+
     def __init__(self, snr="high", *args, **kwargs):
         """
         Initialize the dataset for a specific SNR level.
@@ -66,10 +66,12 @@ class BBBC038(BaseBBBCDataset):
 
         return images
 
-    def get_label(self, image_path):
+    def get_label(self, image_path, kind=None):
         """
-        Returns the label mask for a given image path.
+        Returns the label mask for a given image path (already an instance map).
         """
+        if kind not in (None, "instance"):
+            raise ValueError(f"Invalid label kind: {kind}")
 
         parent_folder = os.path.dirname(image_path)
         mask_folder = parent_folder.replace("images", "masks")
@@ -78,7 +80,9 @@ class BBBC038(BaseBBBCDataset):
         mask_files = os.listdir(mask_folder)
 
         image = load_image(image_path)
-        mask = np.zeros((image.shape[0], image.shape[1]), dtype=np.uint8)
+        # One id per mask file; DSB images can hold more than 255 nuclei
+        dtype = np.uint16 if len(mask_files) <= np.iinfo(np.uint16).max else np.uint32
+        mask = np.zeros((image.shape[0], image.shape[1]), dtype=dtype)
         for idx, mask_file in enumerate(mask_files):
             current_mask = load_image(os.path.join(mask_folder, mask_file))
 
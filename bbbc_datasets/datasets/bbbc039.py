@@ -1,6 +1,10 @@
 import os
+import re
+
+import pandas as pd
 
 from bbbc_datasets.datasets.base_dataset import BaseBBBCDataset
+from bbbc_datasets.utils.sample_index import image_key
 
 
 class BBBC039(BaseBBBCDataset):
@@ -30,6 +34,11 @@ class BBBC039(BaseBBBCDataset):
     """
 
     BASE_URL = "https://data.broadinstitute.org/bbbc/BBBC039"
+    INSTANCE_MODE = "rgb"
+    FILENAME_PATTERN = re.compile(
+        r"_(?P<well>[A-P]\d{2})_s(?P<site>\d+)_w(?P<channel>\d)"
+    )
+    SPLITS = ("training", "validation", "test")
 
     def __init__(self, *args, **kwargs):
         self.KEY = "BBBC039"
@@ -37,5 +46,24 @@ class BBBC039(BaseBBBCDataset):
         self.label_path = os.path.join(self.BASE_URL, "masks.zip")
         self.metadata_paths = [os.path.join(self.BASE_URL, "metadata.zip")]
         self.is_3d = False
-        # TODO what is the 3rd dimension of the masks?
+        # The masks are color-coded (RGB): touching nuclei have distinct colors,
+        # so get_label(..., kind="instance") decodes them into labeled matrices
         super().__init__(*args, **kwargs)
+
+    def get_metadata_fields(self):
+        """
+        Returns the partition (`split`: "training", "validation" or "test") of
+        every image from the file lists in the metadata package.
+        """
+        rows = []
+        for dir_path, _, files in os.walk(os.path.join(self.local_path, "metadata")):
+            for split in self.SPLITS:
+                if f"{split}.txt" not in files:
+                    continue
+                with open(os.path.join(dir_path, f"{split}.txt")) as f:
+                    rows.extend(
+                        (image_key(line.strip()), split) for line in f if line.strip()
+                    )
+        if not rows:
+            return None
+        return pd.DataFrame(rows, columns=["key", "split"])
@@ -57,6 +57,12 @@ class BBBC046(BaseBBBCDataset):
         8: "AR-8",
     }
 
+    VARIANTS = {
+        "phenotype": list(PHENOTYPES),
+        "fluorescence_level": list(FLOURESCENCE_LEVELS),
+        "anisotropy_ratio": list(ANISOTROPY_RATIOS),
+    }
+
     def __init__(
         self,
         phenotype="WT-ID550",
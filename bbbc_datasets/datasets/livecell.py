@@ -1,6 +1,7 @@
 import os
 
 from bbbc_datasets.datasets.base_dataset import BaseBBBCDataset
+from bbbc_datasets.utils.coco import load_coco_index
 
 
 class LiveCell(BaseBBBCDataset):
@@ -8,6 +9,8 @@ class LiveCell(BaseBBBCDataset):
     LiveCell Dataset: TODO
     """
 
+    SPLITS = ("train", "val", "test")
+
     def __init__(self, *args, **kwargs):
 
         # TODO https://www.kaggle.com/datasets/markunys/livecell-dataset
@@ -21,5 +24,36 @@ class LiveCell(BaseBBBCDataset):
         self.label_path = None
         self.metadata_paths = None
         self.is_3d = False
+        self._annotation_indexes = {}
 
         super().__init__(*args, **kwargs)
+
+    def get_annotation_path(self, split="train"):
+        """
+        Returns the local path of the COCO annotation file of a split.
+        """
+        if split not in self.SPLITS:
+            raise ValueError(f"Invalid split: {split}. Choose from {list(self.SPLITS)}")
+        return os.path.join(self.local_path, f"livecell_coco_{split}.json")
+
+    def get_annotation_index(self, split="train"):
+        """
+        Returns the compact `CocoIndex` of a split. The JSON file is parsed
+        once in a streaming pass; later runs load the cached index instead.
+        """
+        if split not in self._annotation_indexes:
+            json_path = self.get_annotation_path(split)
+            cache_path = os.path.join(
+                self.get_cache_dir("coco"), f"livecell_coco_{split}.index.npz"
+            )
+            self._annotation_indexes[split] = load_coco_index(
+                json_path, cache_path=cache_path
+            )
+        return self._annotation_indexes[split]
+
+    def get_instance_mask(self, file_name, split="train"):
+        """
+        Rasterizes the uint16 instance mask of an image from its polygon annotations.
+        """
+        index = self.get_annotation_index(split)
+        return index.instance_mask(index.index_of(file_name))
@@ -0,0 +1,182 @@
+import time
+import tracemalloc
+
+import numpy as np
+
+from bbbc_datasets.utils.file_io import load_images
+from bbbc_datasets.utils.pack import ALIGNMENT
+from bbbc_datasets.utils.parallel import imap_ordered
+
+
+class SampleArena:
+    """
+    Compact in-memory sample store: one contiguous byte buffer and an offset table.
+
+    Every sample keeps its native dtype (e.g. uint8/uint16 instead of float32)
+    and is returned as a read-only view into the buffer. Since the data lives in
+    a single allocation, forked DataLoader workers share its pages instead of
+    copying them when Python touches reference counts.
+
+    Args:
+        shapes (list): Shape of every sample (None for an absent sample).
+        dtypes (list): Dtype of every sample.
+    """
+
+    def __init__(self, shapes, dtypes):
+        self.shapes = [None if s is None else tuple(int(d) for d in s) for s in shapes]
+        self.dtypes = [np.dtype(dtype) for dtype in dtypes]
+        self.offsets = np.full(len(self.shapes), -1, dtype=np.int64)
+
+        end = 0
+        for i, (shape, dtype) in enumerate(zip(self.shapes, self.dtypes)):
+            if shape is None:
+                continue
+            end += -end % ALIGNMENT
+            self.offsets[i] = end
+            end += int(np.prod(shape, dtype=np.int64)) * dtype.itemsize
+        self.buffer = np.empty(end, dtype=np.uint8)
+        self.overflow = {}  # Samples that did not match their announced shape/dtype
+
+    def __len__(self):
+        return len(self.shapes)
+
+    @property
+    def nbytes(self):
+        return self.buffer.nbytes + sum(a.nbytes for a in self.overflow.values())
+
+    def _view(self, idx):
+        shape, dtype = self.shapes[idx], self.dtypes[idx]
+        offset = int(self.offsets[idx])
+        nbytes = int(np.prod(shape, dtype=np.int64)) * dtype.itemsize
+        return self.buffer[offset : offset + nbytes].view(dtype).reshape(shape)
+
+    def views(self):
+        """
+        Returns writable views of all slots (None for absent samples).
+        """
+        return [None if o < 0 else self._view(i) for i, o in enumerate(self.offsets)]
+
+    def set(self, idx, array):
+        array = np.asarray(array)
+        if self.offsets[idx] >= 0 and (
+            array.shape == self.shapes[idx] and array.dtype == self.dtypes[idx]
+        ):
+            self._view(idx)[...] = array
+        else:
+            self.overflow[idx] = array
+
+    def get(self, idx):
+        """
+        Returns a read-only view of sample `idx` (or None if absent).
+        """
+        if idx in self.overflow:
+            view = self.overflow[idx].view()
+        elif self.offsets[idx] < 0:
+            return None
+        else:
+            view = self._view(idx)
+        view.flags.writeable = False
+        return view
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """
+        Copies a list of arrays (or None) into a new arena, releasing every
+        list entry as soon as it is copied.
+        """
+        arena = cls(
+            [None if a is None else a.shape for a in arrays],
+            [np.uint8 if a is None else a.dtype for a in arrays],
+        )
+        for i in range(len(arrays)):
+            if arrays[i] is not None:
+                arena.set(i, arrays[i])
+                arrays[i] = None
+        return arena
+
+    @classmethod
+    def from_images(cls, image_paths, shapes, dtypes, workers=None):
+        """
+        Decodes images in parallel directly into a new arena laid out from
+        their (probed) shapes and dtypes.
+        """
+        arena = cls(shapes, dtypes)
+        views = arena.views()
+        slotted = [i for i, view in enumerate(views) if view is not None]
+        unknown = [i for i, view in enumerate(views) if view is None]
+
+        results = load_images(
+            [image_paths[i] for i in slotted],
+            workers=workers,
+            out=[views[i] for i in slotted],
+        )
+        for idx, img in zip(slotted, results):
+            if not np.shares_memory(img, arena.buffer):
+                arena.overflow[idx] = img
+
+        # Images whose header could not be probed are kept as separate arrays
+        if unknown:
+            results = load_images(
+                [image_paths[i] for i in unknown], workers=workers, stack=False
+            )
+            arena.overflow.update(zip(unknown, results))
+        return arena
+
+
+def preload_dataset(dataset, image_paths, shapes, dtypes, labels=True, workers=None):
+    """
+    Loads all images (and labels) of a dataset into `SampleArena`s and reports memory use.
+
+    :param dataset: A `BaseBBBCDataset` instance (for `get_label`).
+    :param image_paths: Image paths in sample order.
+    :param shapes: Probed image shapes in sample order.
+    :param dtypes: Probed image dtypes in sample order.
+    :param labels: Also preload the label of every sample.
+    :param workers: Number of decoding threads.
+    :return: `(images, labels, report)` with the two arenas (labels None if not
+        loaded) and a dict with the arena sizes, the float32 size for comparison,
+        the peak and steady (after loading) traced memory and the loading time.
+    """
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline, _ = tracemalloc.get_traced_memory()
+    start = time.perf_counter()
+
+    images = SampleArena.from_images(image_paths, shapes, dtypes, workers=workers)
+
+    label_arena = None
+    if labels:
+
+        def load_label(image_path):
+            try:
+                return dataset.get_label(image_path)
+            except FileNotFoundError:
+                return None
+
+        label_arrays = [
+            None if label is None else np.asarray(label)
+            for label in imap_ordered(load_label, image_paths, workers=workers)
+        ]
+        label_arena = SampleArena.from_arrays(label_arrays)
+        del label_arrays
+
+    elapsed = time.perf_counter() - start
+    steady, peak = tracemalloc.get_traced_memory()
+    if not tracing:
+        tracemalloc.stop()
+
+    float32_bytes = sum(
+        int(np.prod(shape, dtype=np.int64)) * 4 for shape in shapes if shape
+    )
+    report = {
+        "num_samples": len(images),
+        "image_bytes": images.nbytes,
+        "label_bytes": label_arena.nbytes if label_arena is not None else 0,
+        "float32_image_bytes": float32_bytes,
+        "peak_bytes": peak - baseline,
+        "steady_bytes": steady - baseline,
+        "seconds": elapsed,
+    }
+    return images, label_arena, report
@@ -0,0 +1,166 @@
+import math
+from collections import defaultdict
+
+import numpy as np
+import torch
+from torch.utils.data import Sampler
+
+BUCKET_MODES = ("shape", "aspect")
+
+
+MAX_CHANNELS = 4  # Trailing axes up to this size are channels (RGB/RGBA)
+
+
+def _aspect_key(shape, aspect_bins):
+    """
+    Bucket key of a shape by its (log) aspect ratio and dimensionality.
+
+    A trailing channel axis of (H, W, C) shapes is not spatial: it is kept
+    out of the aspect ratio and only separates samples by channel count.
+    """
+    channels = ()
+    if len(shape) > 2 and shape[-1] <= MAX_CHANNELS:
+        shape, channels = shape[:-1], shape[-1:]
+    height, width = shape[-2:] if len(shape) > 1 else (1, shape[0])
+    ratio = math.log2(max(height, 1) / max(width, 1))
+    return len(shape), shape[:-2], channels, int(round(ratio * aspect_bins))
+
+
+class ShapeBucketBatchSampler(Sampler):
+    """
+    Batch sampler that only combines samples of similar shape.
+
+    Samples are grouped into buckets, either by their exact probed shape
+    ("shape") or by aspect ratio ("aspect"). With "aspect", samples within a
+    bucket are ordered by size before batching, so a batch pads to a nearby
+    size instead of the largest image of the dataset. Batches are shuffled
+    across buckets every epoch.
+
+    Args:
+        shapes (list): Shape of every sample (e.g. `BBBCDataset.get_shapes()`).
+        batch_size (int): Maximum number of samples per batch.
+        bucket_by (str): "shape" or "aspect".
+        aspect_bins (int): Aspect ratio buckets per power of two ("aspect" only).
+        shuffle (bool): Shuffle samples and batches every epoch.
+        drop_last (bool): Drop the incomplete last batch of every bucket.
+        seed (int): Seed of the shuffling; combined with the epoch (see `set_epoch`).
+    """
+
+    def __init__(
+        self,
+        shapes,
+        batch_size,
+        bucket_by="shape",
+        aspect_bins=4,
+        shuffle=True,
+        drop_last=False,
+        seed=0,
+    ):
+        if bucket_by not in BUCKET_MODES:
+            raise ValueError(
+                f"Invalid bucket mode: {bucket_by}. Choose from {list(BUCKET_MODES)}"
+            )
+
+        self.shapes = [tuple(int(d) for d in shape) for shape in shapes]
+        self.batch_size = batch_size
+        self.bucket_by = bucket_by
+        self.shuffle = shuffle
+        self.drop_last = drop_last
+        self.seed = seed
+        self.epoch = 0
+
+        buckets = defaultdict(list)
+        for idx, shape in enumerate(self.shapes):
+            key = shape if bucket_by == "shape" else _aspect_key(shape, aspect_bins)
+            buckets[key].append(idx)
+        self.buckets = [np.array(b, dtype=np.int64) for b in buckets.values()]
+        self.sizes = np.array([math.prod(s) for s in self.shapes], dtype=np.int64)
+
+    def set_epoch(self, epoch):
+        """
+        Sets the epoch for a different but reproducible shuffle.
+        """
+        self.epoch = epoch
+
+    def batches(self):
+        """
+        Returns the batches (lists of sample indices) of the current epoch.
+        """
+        rng = np.random.default_rng((self.seed, self.epoch))
+        batches = []
+        for bucket in self.buckets:
+            if self.shuffle:
+                bucket = rng.permutation(bucket)
+            if self.bucket_by == "aspect":
+                # Stable, so equally sized samples keep their shuffled order
+                bucket = bucket[np.argsort(self.sizes[bucket], kind="stable")]
+            for start in range(0, len(bucket), self.batch_size):
+                batch = bucket[start : start + self.batch_size]
+                if len(batch) < self.batch_size and self.drop_last:
+                    continue
+                batches.append(batch.tolist())
+
+        if self.shuffle:
+            batches = [batches[i] for i in rng.permutation(len(batches))]
+        return batches
+
+    def padding_fraction(self):
+        """
+        Returns the fraction of padded elements over the batches of the current epoch.
+        """
+        padded = actual = 0
+        for batch in self.batches():
+            max_shape = np.max([self.shapes[i] for i in batch], axis=0)
+            padded += int(np.prod(max_shape)) * len(batch)
+            actual += int(self.sizes[batch].sum())
+        return 1.0 - actual / padded if padded else 0.0
+
+    def __iter__(self):
+        return iter(self.batches())
+
+    def __len__(self):
+        if self.drop_last:
+            return sum(len(b) // self.batch_size for b in self.buckets)
+        return sum(math.ceil(len(b) / self.batch_size) for b in self.buckets)
+
+
+def _pad_stack(tensors, pad_value):
+    """
+    Stacks tensors of equal rank into one tensor padded (at the end of every
+    dimension) to their common maximum shape.
+    """
+    max_shape = [max(sizes) for sizes in zip(*(t.shape for t in tensors))]
+    out = tensors[0].new_full((len(tensors), *max_shape), pad_value)
+    for i, tensor in enumerate(tensors):
+        out[(i, *(slice(0, d) for d in tensor.shape))] = tensor
+    return out
+
+
+def pad_collate(batch, pad_value=0, label_pad_value=0):
+    """
+    Collates `(image, label)` samples of different sizes by padding them to the
+    largest shape in the batch (not the dataset).
+
+    Returns `(images, labels, masks)`: the padded image batch, the padded label
+    batch (None if no sample has a label) and a boolean mask of shape
+    `(batch, *image.shape[1:])` that is True on real (non-padded) pixels.
+    """
+    images = [image for image, _ in batch]
+    labels = [label for _, label in batch]
+
+    padded_images = _pad_stack(images, pad_value)
+    masks = torch.zeros(
+        (len(images), *padded_images.shape[2:]),
+        dtype=torch.bool,
+    )
+    for i, image in enumerate(images):
+        masks[(i, *(slice(0, d) for d in image.shape[1:]))] = True
+
+    if all(label is None for label in labels):
+        return padded_images, None, masks
+    if any(label is None for label in labels):
+        raise ValueError(
+            "Cannot collate a batch in which only some samples have labels."
+        )
+
+    return padded_images, _pad_stack(labels, label_pad_value), masks
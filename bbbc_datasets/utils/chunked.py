@@ -0,0 +1,496 @@
+import json
+import os
+import shutil
+import zlib
+
+import numpy as np
+
+from bbbc_datasets.utils.file_io import load_image
+from bbbc_datasets.utils.parallel import imap_ordered
+
+CHUNK_FORMAT_VERSION = 1
+CHUNK_META_FILE = "chunks.json"
+CHUNK_DATA_FILE = "data.bin"
+CHUNK_OFFSETS_FILE = "offsets.npy"
+OCCUPANCY_FILE = "occupancy.npy"
+STORE_META_FILE = "store.json"
+
+DEFAULT_CHUNKS = (64, 64, 64)
+
+
+def _expand_chunks(shape, chunks):
+    """
+    Chunks apply to the trailing dimensions; leading dimensions (e.g. channels)
+    are stored as one full-extent chunk.
+    """
+    chunks = tuple(int(c) for c in chunks)
+    if len(chunks) > len(shape):
+        chunks = chunks[-len(shape) :]
+    lead = tuple(shape[: len(shape) - len(chunks)])
+    return lead + tuple(
+        min(c, s) if s else c for c, s in zip(chunks, shape[len(lead) :])
+    )
+
+
+def _grid_shape(shape, chunks):
+    return tuple(-(-s // c) for s, c in zip(shape, chunks))
+
+
+class ChunkedVolume:
+    """
+    A volume stored as fixed-size chunks (zarr-like) in a single data file.
+
+    Every chunk is padded to the full chunk shape. Uncompressed volumes are
+    memory-mapped as a (grid..., chunk...) array, so reading a region touches
+    only the chunks that intersect it. Compressed volumes keep a per-chunk
+    offset table and decompress just the intersecting chunks.
+    """
+
+    def __init__(self, path):
+        meta_file = os.path.join(path, CHUNK_META_FILE)
+        if not os.path.exists(meta_file):
+            raise FileNotFoundError(f"No chunked volume found in {path}")
+
+        with open(meta_file) as f:
+            self.meta = json.load(f)
+
+        self.path = path
+        self.shape = tuple(self.meta["shape"])
+        self.dtype = np.dtype(self.meta["dtype"])
+        self.chunks = tuple(self.meta["chunks"])
+        self.grid = _grid_shape(self.shape, self.chunks)
+        self.compression = self.meta["compression"]
+
+        self._data = None
+        self._offsets = None
+        self._occupancy = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_data"] = None
+        return state
+
+    @property
+    def ndim(self):
+        return len(self.shape)
+
+    @property
+    def occupancy(self):
+        """
+        Fraction of non-zero voxels per chunk (grid-shaped), if it was computed.
+        """
+        if self._occupancy is None:
+            occupancy_file = os.path.join(self.path, OCCUPANCY_FILE)
+            if os.path.exists(occupancy_file):
+                self._occupancy = np.load(occupancy_file)
+        return self._occupancy
+
+    def _open(self):
+        if self._data is None:
+            data_file = os.path.join(self.path, CHUNK_DATA_FILE)
+            if self.compression is None:
+                self._data = np.memmap(
+                    data_file, dtype=self.dtype, mode="r", shape=self.grid + self.chunks
+                )
+            else:
+                self._data = np.memmap(data_file, dtype=np.uint8, mode="r")
+                self._offsets = np.load(os.path.join(self.path, CHUNK_OFFSETS_FILE))
+        return self._data
+
+    def _read_chunk(self, chunk_idx):
+        data = self._open()
+        flat = np.ravel_multi_index(chunk_idx, self.grid)
+        start, stop = self._offsets[flat], self._offsets[flat + 1]
+        raw = zlib.decompress(data[start:stop])
+        return np.frombuffer(raw, dtype=self.dtype).reshape(self.chunks)
+
+    def read_region(self, start, size):
+        """
+        Reads a region of the trailing dimensions; leading dimensions are read in full.
+
+        Parts of the region outside the volume are zero-padded, so the result
+        always has the requested size.
+
+        :param start: Region origin for the trailing `len(start)` dimensions.
+        :param size: Region size for the same dimensions.
+        """
+        lead = self.ndim - len(start)
+        start = (0,) * lead + tuple(int(s) for s in start)
+        size = tuple(self.shape[:lead]) + tuple(int(s) for s in size)
+
+        out = np.zeros(size, dtype=self.dtype)
+
+        lo = [max(0, s) for s in start]
+        hi = [min(dim, s + n) for dim, s, n in zip(self.shape, start, size)]
+        if any(h <= l for l, h in zip(lo, hi)):
+            return out
+
+        first = [l // c for l, c in zip(lo, self.chunks)]
+        last = [(h - 1) // c for h, c in zip(hi, self.chunks)]
+        out_region = tuple(slice(l - s, h - s) for l, h, s in zip(lo, hi, start))
+
+        if self.compression is None:
+            data = self._open()
+            blocks = data[
+                tuple(slice(f, l + 1) for f, l in zip(first, last))
+            ]  # (grid..., chunk...), only intersecting chunks are touched
+            ndim = self.ndim
+            axes = [a for d in range(ndim) for a in (d, d + ndim)]
+            merged_shape = [blocks.shape[d] * self.chunks[d] for d in range(ndim)]
+            merged = blocks.transpose(axes).reshape(merged_shape)
+            in_region = tuple(
+                slice(l - f * c, h - f * c)
+                for l, h, f, c in zip(lo, hi, first, self.chunks)
+            )
+            out[out_region] = merged[in_region]
+            return out
+
+        for chunk_idx in np.ndindex(*[l - f + 1 for f, l in zip(first, last)]):
+            chunk_idx = tuple(f + i for f, i in zip(first, chunk_idx))
+            chunk_lo = [i * c for i, c in zip(chunk_idx, self.chunks)]
+            src_lo = [max(l, c) for l, c in zip(lo, chunk_lo)]
+            src_hi = [min(h, c + n) for h, c, n in zip(hi, chunk_lo, self.chunks)]
+            chunk = self._read_chunk(chunk_idx)
+            out[
+                tuple(slice(a - s, b - s) for a, b, s in zip(src_lo, src_hi, start))
+            ] = chunk[
+                tuple(slice(a - c, b - c) for a, b, c in zip(src_lo, src_hi, chunk_lo))
+            ]
+        return out
+
+    def to_numpy(self):
+        """
+        Reads the full volume.
+        """
+        return self.read_region((0,) * self.ndim, self.shape)
+
+
+def write_chunked(
+    path,
+    volume,
+    chunks=DEFAULT_CHUNKS,
+    compression=None,
+    level=1,
+    occupancy=False,
+    channel_axis=None,
+):
+    """
+    Writes a volume as a `ChunkedVolume`.
+
+    :param path: Target directory.
+    :param volume: The array to store.
+    :param chunks: Chunk shape of the trailing dimensions.
+    :param compression: None (memory-mappable) or "zlib".
+    :param level: zlib compression level.
+    :param occupancy: Also store the fraction of non-zero voxels per chunk
+        (used for foreground-weighted patch sampling from label volumes).
+    :param channel_axis: Channel axis of the volume (e.g. -1 for (Z, Y, X, C)).
+        Channels are moved to the front, so the volume is stored as
+        (C, Z, Y, X) and chunked over its spatial dimensions only.
+    """
+    if compression not in (None, "zlib"):
+        raise ValueError(
+            f"Invalid compression: {compression}. Choose from None, 'zlib'"
+        )
+
+    volume = np.asarray(volume)
+    if channel_axis is not None:
+        volume = np.moveaxis(volume, channel_axis, 0)
+    chunks = _expand_chunks(volume.shape, chunks)
+    grid = _grid_shape(volume.shape, chunks)
+    os.makedirs(path, exist_ok=True)
+
+    offsets = [0]
+    fractions = np.zeros(grid, dtype=np.float32)
+    buffer = np.zeros(chunks, dtype=volume.dtype)
+
+    with open(os.path.join(path, CHUNK_DATA_FILE), "wb") as f:
+        for chunk_idx in np.ndindex(*grid):
+            region = tuple(
+                slice(i * c, min((i + 1) * c, s))
+                for i, c, s in zip(chunk_idx, chunks, volume.shape)
+            )
+            block = volume[region]
+            if occupancy:
+                fractions[chunk_idx] = np.count_nonzero(block) / max(block.size, 1)
+
+            if block.shape != chunks:
+                buffer[...] = 0
+                buffer[tuple(slice(0, n) for n in block.shape)] = block
+                block = buffer
+            data = np.ascontiguousarray(block)
+
+            if compression == "zlib":
+                data = zlib.compress(data, level)
+                offsets.append(offsets[-1] + len(data))
+            f.write(data)
+
+    if compression == "zlib":
+        np.save(os.path.join(path, CHUNK_OFFSETS_FILE), np.array(offsets, np.int64))
+    if occupancy:
+        np.save(os.path.join(path, OCCUPANCY_FILE), fractions)
+
+    with open(os.path.join(path, CHUNK_META_FILE), "w") as f:
+        json.dump(
+            {
+                "version": CHUNK_FORMAT_VERSION,
+                "shape": list(volume.shape),
+                "dtype": volume.dtype.str,
+                "chunks": list(chunks),
+                "compression": compression,
+            },
+            f,
+            indent=2,
+        )
+
+    return ChunkedVolume(path)
+
+
+class ChunkedStore:
+    """
+    Chunked image and label volumes of one dataset variant, as written by `chunk_dataset`.
+    """
+
+    def __init__(self, store_dir):
+        meta_file = os.path.join(store_dir, STORE_META_FILE)
+        if not os.path.exists(meta_file):
+            raise FileNotFoundError(f"No chunked store found in {store_dir}")
+
+        with open(meta_file) as f:
+            self.meta = json.load(f)
+
+        self.store_dir = store_dir
+        self.paths = [sample["path"] for sample in self.meta["samples"]]
+        self.images = [
+            ChunkedVolume(os.path.join(store_dir, sample["image"]))
+            for sample in self.meta["samples"]
+        ]
+        self.labels = [
+            (
+                ChunkedVolume(os.path.join(store_dir, sample["label"]))
+                if sample["label"]
+                else None
+            )
+            for sample in self.meta["samples"]
+        ]
+
+    def __len__(self):
+        return len(self.paths)
+
+
+def _chunk_sample(
+    dataset, idx, image_path, store_dir, chunks, compression, level, channel_axis
+):
+    sample_dir = f"{idx:05d}"
+    image = load_image(image_path)
+    write_chunked(
+        os.path.join(store_dir, sample_dir, "image"),
+        image,
+        chunks=chunks,
+        compression=compression,
+        level=level,
+        channel_axis=channel_axis,
+    )
+
+    try:
+        label = dataset.get_label(image_path)
+    except FileNotFoundError:
+        label = None
+
+    label_dir = None
+    if label is not None:
+        label_dir = os.path.join(sample_dir, "label")
+        write_chunked(
+            os.path.join(store_dir, label_dir),
+            label,
+            chunks=chunks,
+            compression=compression,
+            level=level,
+            occupancy=True,
+        )
+
+    return {
+        "path": image_path,
+        "image": os.path.join(sample_dir, "image"),
+        "label": label_dir,
+    }
+
+
+def chunk_dataset(
+    dataset,
+    out_dir=None,
+    chunks=DEFAULT_CHUNKS,
+    compression=None,
+    level=1,
+    channel_axis=None,
+    workers=None,
+    overwrite=False,
+):
+    """
+    Converts the volumes (and paired labels) of a dataset variant to chunked storage.
+
+    Label volumes additionally store a per-chunk foreground occupancy index,
+    which `PatchSampler` uses for foreground-weighted sampling. Multichannel
+    images are stored channels-first (see `channel_axis`), so their spatial
+    dimensions line up with the label volumes.
+
+    :param dataset: A `BaseBBBCDataset` instance.
+    :param out_dir: Target directory (default: the dataset's "chunked" cache directory).
+    :param chunks: Chunk shape of the trailing (spatial) dimensions.
+    :param compression: None (memory-mappable) or "zlib".
+    :param level: zlib compression level.
+    :param channel_axis: Channel axis of the images, e.g. -1 for channel-last
+        (Z, Y, X, C) volumes; None if the images have no channel axis.
+    :param workers: Number of conversion threads.
+    :param overwrite: Rebuild the store even if it already exists.
+    :return: A `ChunkedStore`.
+    """
+    if out_dir is None:
+        out_dir = dataset.get_cache_dir("chunked")
+
+    if os.path.exists(os.path.join(out_dir, STORE_META_FILE)):
+        if not overwrite:
+            return ChunkedStore(out_dir)
+        shutil.rmtree(out_dir)
+    os.makedirs(out_dir, exist_ok=True)
+
+    image_paths = dataset.get_image_paths()
+    if not image_paths:
+        raise RuntimeError(f"No images found for {dataset.KEY}")
+
+    print(f"🧊 Chunking {len(image_paths)} volumes of {dataset.KEY} to {out_dir}...")
+    samples = list(
+        imap_ordered(
+            lambda item: _chunk_sample(
+                dataset,
+                item[0],
+                item[1],
+                out_dir,
+                chunks,
+                compression,
+                level,
+                channel_axis,
+            ),
+            enumerate(image_paths),
+            workers=workers,
+        )
+    )
+
+    with open(os.path.join(out_dir, STORE_META_FILE), "w") as f:
+        json.dump(
+            {
+                "version": CHUNK_FORMAT_VERSION,
+                "dataset": type(dataset).__name__,
+                "key": dataset.KEY,
+                "chunks": list(chunks),
+                "channel_axis": channel_axis,
+                "samples": samples,
+            },
+            f,
+            indent=2,
+        )
+
+    return ChunkedStore(out_dir)
+
+
+class PatchSampler:
+    """
+    Samples random fixed-size patches from a `ChunkedStore`.
+
+    Only the chunks intersecting a patch are read. With probability
+    `foreground_probability` the patch is placed over a label chunk drawn
+    proportionally to its precomputed foreground occupancy; otherwise the patch
+    origin is drawn uniformly.
+
+    Args:
+        store (ChunkedStore): The chunked volumes to sample from.
+        patch_size (tuple): Patch size of the trailing (spatial) dimensions.
+        foreground_probability (float): Probability of a foreground-weighted draw.
+        seed (int, optional): Seed of the random generator.
+    """
+
+    def __init__(
+        self, store, patch_size=(64, 64, 64), foreground_probability=0.5, seed=None
+    ):
+        if not len(store):
+            raise ValueError("Cannot sample patches from an empty store.")
+
+        self.store = store
+        self.patch_size = tuple(int(p) for p in patch_size)
+        self.foreground_probability = foreground_probability
+        self.rng = np.random.default_rng(seed)
+
+        ndim = len(self.patch_size)
+        sizes = np.array(
+            [np.prod(vol.shape[-ndim:], dtype=np.float64) for vol in store.images]
+        )
+        self._volume_weights = sizes / sizes.sum()
+
+        # Flat table of all label chunks with foreground: (volume, chunk index)
+        volumes, chunk_ids, weights = [], [], []
+        for vol_idx, label in enumerate(store.labels):
+            occupancy = label.occupancy if label is not None else None
+            if occupancy is None:
+                continue
+            flat = occupancy.reshape(-1)
+            nonzero = np.flatnonzero(flat)
+            volumes.append(np.full(len(nonzero), vol_idx, dtype=np.int32))
+            chunk_ids.append(nonzero)
+            weights.append(flat[nonzero])
+
+        self._fg_volumes = np.concatenate(volumes) if volumes else np.empty(0, np.int32)
+        self._fg_chunks = (
+            np.concatenate(chunk_ids) if chunk_ids else np.empty(0, np.int64)
+        )
+        weights = np.concatenate(weights) if weights else np.empty(0, np.float32)
+        self._fg_weights = weights / weights.sum() if weights.size else weights
+
+    def _uniform_origin(self, shape):
+        return tuple(
+            int(self.rng.integers(0, max(0, dim - p) + 1))
+            for dim, p in zip(shape, self.patch_size)
+        )
+
+    def _foreground_origin(self):
+        pick = self.rng.choice(len(self._fg_weights), p=self._fg_weights)
+        vol_idx = int(self._fg_volumes[pick])
+        label = self.store.labels[vol_idx]
+
+        chunk_idx = np.unravel_index(self._fg_chunks[pick], label.grid)
+        ndim = len(self.patch_size)
+        spatial_shape = label.shape[-ndim:]
+        spatial_chunks = label.chunks[-ndim:]
+
+        # Place the patch so that it covers the chosen chunk (or lies inside it
+        # when the patch is smaller than a chunk).
+        origin = []
+        for idx, c, dim, p in zip(
+            chunk_idx[-ndim:], spatial_chunks, spatial_shape, self.patch_size
+        ):
+            lo, hi = idx * c, min(idx * c + c, dim)
+            first, last = (hi - p, lo) if p >= hi - lo else (lo, hi - p)
+            first, last = max(0, first), min(last, max(0, dim - p))
+            origin.append(int(self.rng.integers(first, max(first, last) + 1)))
+        return vol_idx, tuple(origin)
+
+    def sample(self):
+        """
+        Returns `(image_patch, label_patch, volume_index, origin)`.
+        """
+        ndim = len(self.patch_size)
+        if self._fg_weights.size and self.rng.random() < self.foreground_probability:
+            vol_idx, origin = self._foreground_origin()
+        else:
+            vol_idx = int(self.rng.choice(len(self.store), p=self._volume_weights))
+            origin = self._uniform_origin(self.store.images[vol_idx].shape[-ndim:])
+
+        image = self.store.images[vol_idx].read_region(origin, self.patch_size)
+        label = self.store.labels[vol_idx]
+        if label is not None:
+            label = label.read_region(origin, self.patch_size)
+
+        return image, label, vol_idx, origin
+
+    def __iter__(self):
+        while True:
+            yield self.sample()
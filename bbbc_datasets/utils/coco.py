@@ -0,0 +1,391 @@
+import json
+import os
+from array import array
+
+import numpy as np
+
+COCO_INDEX_FORMAT_VERSION = 1
+DEFAULT_CHUNK_SIZE = 1 << 22  # Characters read per chunk
+STREAMED_SECTIONS = ("images", "annotations")
+
+_WHITESPACE = " \t\n\r"
+
+
+class _JSONStream:
+    """
+    Character buffer over a JSON file that is refilled chunk by chunk.
+    """
+
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        # Drop the consumed prefix, so memory stays in the order of a chunk
+        self.buffer = self.buffer[self.pos :] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """
+        Skips whitespace and returns the next character ("" at the end).
+        """
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer) or not self._fill():
+                return self.buffer[self.pos : self.pos + 1]
+
+    def expect(self, chars):
+        char = self.peek()
+        if char not in chars or not char:
+            raise ValueError(f"Expected one of {chars!r} at {self.pos}, got {char!r}")
+        self.pos += 1
+        return char
+
+    def decode(self, decoder):
+        """
+        Decodes the next JSON value, reading more chunks while it is incomplete.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # A number may continue in the next chunk
+            if end == len(self.buffer) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_coco(path, sections=STREAMED_SECTIONS, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Streams a COCO annotation file without loading it as a whole.
+
+    The elements of the top-level arrays named in `sections` are decoded one by
+    one (`json.JSONDecoder.raw_decode` on a chunked buffer) and yielded as
+    `(section, element)`; all other top-level values are yielded as `(key, value)`.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, encoding="utf-8") as f:
+        stream = _JSONStream(f, chunk_size)
+        stream.expect("{")
+        if stream.peek() == "}":
+            return
+
+        while True:
+            key = stream.decode(decoder)
+            stream.expect(":")
+            if key in sections and stream.peek() == "[":
+                stream.expect("[")
+                if stream.peek() == "]":
+                    stream.expect("]")
+                else:
+                    while True:
+                        yield key, stream.decode(decoder)
+                        if stream.expect(",]") == "]":
+                            break
+            else:
+                yield key, stream.decode(decoder)
+
+            if stream.expect(",}") == "}":
+                return
+
+
+def _ranges(starts, lengths):
+    """
+    Concatenation of `range(start, start + length)` for all pairs, without a Python loop.
+    """
+    lengths = np.asarray(lengths, dtype=np.int64)
+    total = int(lengths.sum())
+    offsets = np.cumsum(lengths) - lengths
+    return np.repeat(np.asarray(starts, dtype=np.int64) - offsets, lengths) + np.arange(
+        total, dtype=np.int64
+    )
+
+
+def _source_stamp(json_path):
+    stat = os.stat(json_path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+class CocoIndex:
+    """
+    Compact, array-backed index of a COCO annotation file.
+
+    Images are stored as parallel arrays (`image_ids`, `file_names`, `heights`,
+    `widths`). Annotations are grouped by image via an offset table
+    (`image_offsets`) and polygons are stored as flat coordinate arrays with
+    offset tables (`ann_offsets` into polygons, `poly_offsets` into `coords`),
+    so millions of vertices take a few flat arrays instead of nested Python lists.
+    Non-polygon (RLE) segmentations are indexed without polygons.
+    """
+
+    ARRAYS = (
+        "image_ids",
+        "file_names",
+        "heights",
+        "widths",
+        "image_offsets",
+        "ann_ids",
+        "category_ids",
+        "iscrowd",
+        "bboxes",
+        "ann_offsets",
+        "poly_offsets",
+        "coords",
+    )
+
+    def __init__(self, categories=None, **arrays):
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name])
+        self.categories = categories or []
+        self._lookup = None
+
+    def __len__(self):
+        return len(self.image_ids)
+
+    @property
+    def num_annotations(self):
+        return len(self.ann_ids)
+
+    def index_of(self, file_name):
+        """
+        Returns the image index of a file name (or base name).
+        """
+        if self._lookup is None:
+            self._lookup = {
+                os.path.basename(str(f)): i for i, f in enumerate(self.file_names)
+            }
+        return self._lookup[os.path.basename(file_name)]
+
+    def annotations(self, image_idx):
+        """
+        Returns the annotation range `range(start, stop)` of an image.
+        """
+        return range(
+            int(self.image_offsets[image_idx]), int(self.image_offsets[image_idx + 1])
+        )
+
+    def polygons(self, ann_idx):
+        """
+        Returns the polygons of an annotation as (N, 2) float32 `(x, y)` arrays.
+        """
+        start, stop = self.ann_offsets[ann_idx], self.ann_offsets[ann_idx + 1]
+        return [
+            self.coords[self.poly_offsets[p] : self.poly_offsets[p + 1]].reshape(-1, 2)
+            for p in range(start, stop)
+        ]
+
+    def instance_mask(self, image_idx, dtype=np.uint16):
+        """
+        Rasterizes the instance mask of an image: annotation `k` of the image gets label `k + 1`.
+        """
+        shape = (int(self.heights[image_idx]), int(self.widths[image_idx]))
+        mask = np.zeros(shape, dtype=dtype)
+        for label, ann_idx in enumerate(self.annotations(image_idx), start=1):
+            for polygon in self.polygons(ann_idx):
+                fill_polygon(mask, polygon, label)
+        return mask
+
+    def save(self, path, source_stamp=""):
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(
+            tmp_path,
+            meta=json.dumps(
+                {
+                    "format": COCO_INDEX_FORMAT_VERSION,
+                    "source": source_stamp,
+                    "categories": self.categories,
+                }
+            ),
+            **{name: getattr(self, name) for name in self.ARRAYS},
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, source_stamp=None):
+        """
+        Loads a saved index; returns None if it is outdated.
+        """
+        with np.load(path) as data:
+            meta = json.loads(data["meta"].item())
+            if meta.get("format") != COCO_INDEX_FORMAT_VERSION or (
+                source_stamp is not None and meta.get("source") != source_stamp
+            ):
+                return None
+            arrays = {name: data[name] for name in cls.ARRAYS}
+        return cls(categories=meta["categories"], **arrays)
+
+    @classmethod
+    def build(cls, json_path, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Builds the index in one streaming pass over a COCO annotation file.
+        """
+        image_ids, file_names, heights, widths = array("q"), [], array("q"), array("q")
+        ann_ids, ann_images, category_ids, iscrowd = (
+            array("q"),
+            array("q"),
+            array("q"),
+            array("b"),
+        )
+        bboxes, coords = array("f"), array("f")
+        ann_polygons, poly_lengths = array("q"), array("q")
+        categories = []
+
+        for key, value in iter_coco(json_path, chunk_size=chunk_size):
+            if key == "images":
+                image_ids.append(int(value["id"]))
+                file_names.append(value.get("file_name", ""))
+                heights.append(int(value.get("height", 0)))
+                widths.append(int(value.get("width", 0)))
+            elif key == "annotations":
+                ann_ids.append(int(value.get("id", len(ann_ids))))
+                ann_images.append(int(value["image_id"]))
+                category_ids.append(int(value.get("category_id", 0)))
+                iscrowd.append(int(value.get("iscrowd", 0)))
+                bboxes.extend(value.get("bbox") or (0.0, 0.0, 0.0, 0.0))
+
+                segmentation = value.get("segmentation")
+                polygons = segmentation if isinstance(segmentation, list) else []
+                ann_polygons.append(len(polygons))
+                for polygon in polygons:
+                    coords.extend(polygon)
+                    poly_lengths.append(len(polygon))
+            elif key == "categories":
+                categories = value
+
+        image_ids = np.frombuffer(image_ids, dtype=np.int64)
+        ann_images = np.frombuffer(ann_images, dtype=np.int64)
+
+        # Group annotations by image (stable, so the file order is kept per image)
+        image_order = np.argsort(image_ids, kind="stable")
+        sorted_ids = image_ids[image_order]
+        positions = np.searchsorted(sorted_ids, ann_images)
+        known = positions < len(sorted_ids)
+        known[known] = sorted_ids[positions[known]] == ann_images[known]
+        if not known.all():
+            unknown = np.unique(ann_images[~known])
+            raise ValueError(
+                f"{json_path}: annotations refer to {len(unknown)} unknown "
+                f"image ids, e.g. {unknown[:5].tolist()}"
+            )
+        ann_image_idx = image_order[positions]
+        order = np.argsort(ann_image_idx, kind="stable")
+        image_offsets = np.zeros(len(image_ids) + 1, dtype=np.int64)
+        np.cumsum(
+            np.bincount(ann_image_idx, minlength=len(image_ids)), out=image_offsets[1:]
+        )
+
+        # Reorder the polygons and coordinates along with their annotations
+        ann_polygons = np.frombuffer(ann_polygons, dtype=np.int64)
+        poly_lengths = np.frombuffer(poly_lengths, dtype=np.int64)
+        coords = np.frombuffer(coords, dtype=np.float32)
+        ann_starts = np.concatenate([[0], np.cumsum(ann_polygons)])
+        poly_starts = np.concatenate([[0], np.cumsum(poly_lengths)])
+
+        polygon_order = _ranges(ann_starts[:-1][order], ann_polygons[order])
+        coord_order = _ranges(
+            poly_starts[:-1][polygon_order], poly_lengths[polygon_order]
+        )
+
+        return cls(
+            categories=categories,
+            image_ids=image_ids,
+            file_names=np.array(file_names, dtype=str),
+            heights=np.frombuffer(heights, dtype=np.int64),
+            widths=np.frombuffer(widths, dtype=np.int64),
+            image_offsets=image_offsets,
+            ann_ids=np.frombuffer(ann_ids, dtype=np.int64)[order],
+            category_ids=np.frombuffer(category_ids, dtype=np.int64)[order],
+            iscrowd=np.frombuffer(iscrowd, dtype=np.int8)[order],
+            bboxes=np.frombuffer(bboxes, dtype=np.float32).reshape(-1, 4)[order],
+            ann_offsets=np.concatenate([[0], np.cumsum(ann_polygons[order])]).astype(
+                np.int64
+            ),
+            poly_offsets=np.concatenate(
+                [[0], np.cumsum(poly_lengths[polygon_order])]
+            ).astype(np.int64),
+            coords=coords[coord_order],
+        )
+
+
+def load_coco_index(json_path, cache_path=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Returns the `CocoIndex` of a COCO file, cached next to it (or at `cache_path`)
+    so that later runs skip the JSON parsing until the file changes.
+    """
+    cache_path = cache_path or f"{os.path.splitext(json_path)[0]}.index.npz"
+    stamp = _source_stamp(json_path)
+    if os.path.exists(cache_path):
+        index = CocoIndex.load(cache_path, source_stamp=stamp)
+        if index is not None:
+            return index
+
+    index = CocoIndex.build(json_path, chunk_size=chunk_size)
+    index.save(cache_path, source_stamp=stamp)
+    return index
+
+
+def fill_polygon(mask, polygon, value=1):
+    """
+    Fills a polygon into `mask` in place with a vectorized scanline fill.
+
+    The crossings of all edges with all scanlines (pixel centers) of the
+    polygon's bounding rows are computed at once; each row is then filled
+    between pairs of crossings (even-odd rule) through a cumulative sum over
+    a difference array, without a Python loop over rows.
+
+    :param mask: 2D array to draw into.
+    :param polygon: (N, 2) array of `(x, y)` vertices in pixel coordinates.
+    :param value: Value written inside the polygon.
+    """
+    polygon = np.asarray(polygon, dtype=np.float64).reshape(-1, 2)
+    if len(polygon) < 3:
+        return mask
+
+    height, width = mask.shape[:2]
+    x0, y0 = polygon[:, 0], polygon[:, 1]
+    x1, y1 = np.roll(x0, -1), np.roll(y0, -1)
+
+    row_start = max(int(np.ceil(y0.min() - 0.5)), 0)
+    row_stop = min(int(np.floor(y0.max() - 0.5)) + 1, height)
+    if row_start >= row_stop:
+        return mask
+
+    # Crossings of every edge (columns) with every scanline center (rows);
+    # half-open in y, so vertices are not counted twice
+    yc = np.arange(row_start, row_stop, dtype=np.float64)[:, None] + 0.5
+    crosses = (y0 <= yc) != (y1 <= yc)
+    rows, edges = np.nonzero(crosses)
+    if not len(rows):
+        return mask
+    t = (yc[rows, 0] - y0[edges]) / (y1[edges] - y0[edges])
+    xs = x0[edges] + t * (x1[edges] - x0[edges])
+
+    # Sort by row, then x; every row has an even number of crossings
+    order = np.lexsort((xs, rows))
+    rows, xs = rows[order], xs[order]
+    starts = np.clip(np.ceil(xs[0::2] - 0.5), 0, width).astype(np.intp)
+    stops = np.clip(np.ceil(xs[1::2] - 0.5), 0, width).astype(np.intp)
+
+    diff = np.zeros((row_stop - row_start, width + 1), dtype=np.int32)
+    np.add.at(diff, (rows[0::2], starts), 1)
+    np.add.at(diff, (rows[0::2], stops), -1)
+    inside = np.cumsum(diff[:, :width], axis=1) > 0
+
+    mask[row_start:row_stop][inside] = value
+    return mask
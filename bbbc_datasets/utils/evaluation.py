@@ -0,0 +1,336 @@
+import numpy as np
+import pandas as pd
+
+from bbbc_datasets.utils.parallel import imap_ordered
+from bbbc_datasets.utils.sample_index import image_key
+
+DEFAULT_THRESHOLDS = tuple(np.round(np.arange(0.5, 1.0, 0.05), 2))
+COUNT_COLUMNS = ("n_true", "n_pred", "tp", "sum_iou")
+MAX_DENSE_PAIRS = 1 << 20  # Label pair codes counted with one bincount up to this
+
+
+def _flat_labels(label):
+    flat = np.asarray(label).reshape(-1)
+    return flat.view(np.uint8) if flat.dtype.kind == "b" else flat
+
+
+def _max_label(flat):
+    """
+    Returns the maximum of non-negative integer labels, or None for other labels.
+    """
+    if flat.dtype.kind not in "ui":
+        return None
+    if not flat.size:
+        return 0
+    if flat.dtype.kind == "i" and flat.min() < 0:
+        return None
+    return int(flat.max())
+
+
+def relabel_sequential(label):
+    """
+    Maps the non-zero values of a label map to 1..N (in increasing order).
+
+    Non-negative integer labels are relabelled with a lookup table from
+    `np.bincount` (linear time); other labels with `np.unique`.
+
+    :param label: Instance label map of any shape.
+    :return: `(flat, ids)`: the relabelled map as a flat `int64` array and the
+        original id of every new label (`ids[k - 1]` for label `k`).
+    """
+    flat = _flat_labels(label)
+    high = _max_label(flat)
+    if high is not None and high <= 4 * flat.size:
+        ids = np.flatnonzero(np.bincount(flat, minlength=high + 1))
+        ids = ids[ids > 0]
+        lookup = np.zeros(high + 1, dtype=np.int64)
+        lookup[ids] = np.arange(1, len(ids) + 1)
+        return lookup[flat], ids
+
+    values, inverse = np.unique(flat, return_inverse=True)
+    if len(values) and values[0] == 0:
+        return inverse.astype(np.int64), values[1:]
+    return inverse.astype(np.int64) + 1, values
+
+
+class InstanceOverlap:
+    """
+    Sparse overlap of a true and a predicted instance label map.
+
+    Pixels are paired into one code per (true, predicted) label pair, and the
+    codes are counted with `np.bincount` (or `np.unique` for very many labels),
+    so only overlapping pairs are kept, without a loop over objects. Works the
+    same for 2D and 3D labels.
+
+    Args:
+        y_true (np.ndarray): True instance labels (0 is background).
+        y_pred (np.ndarray): Predicted instance labels of the same shape.
+    """
+
+    def __init__(self, y_true, y_pred):
+        if np.shape(y_true) != np.shape(y_pred):
+            raise ValueError(
+                f"Label shapes differ: {np.shape(y_true)} and {np.shape(y_pred)}"
+            )
+
+        true, pred = _flat_labels(y_true), _flat_labels(y_pred)
+        max_true, max_pred = _max_label(true), _max_label(pred)
+        limit = max(MAX_DENSE_PAIRS, true.size)
+        relabel = max_true is None or max_pred is None
+        if relabel or (max_true + 1) * (max_pred + 1) > limit:
+            # Compact labels 1..N, so that only present labels take up codes
+            true, self.true_ids = relabel_sequential(true)
+            pred, self.pred_ids = relabel_sequential(pred)
+            max_true, max_pred = len(self.true_ids), len(self.pred_ids)
+            relabel = True
+
+        if (max_true + 1) * (max_pred + 1) <= limit:
+            # Dense pair counts in one pass; the margins are the object areas
+            codes = true.astype(np.intp)
+            codes *= max_pred + 1
+            codes += pred
+            counts = np.bincount(
+                codes, minlength=(max_true + 1) * (max_pred + 1)
+            ).reshape(max_true + 1, max_pred + 1)
+            true_areas, pred_areas = counts.sum(axis=1), counts.sum(axis=0)
+            true_index = np.flatnonzero(true_areas[1:]) + 1
+            pred_index = np.flatnonzero(pred_areas[1:]) + 1
+            if not relabel:
+                self.true_ids, self.pred_ids = true_index, pred_index
+            self.true_areas = true_areas[true_index]
+            self.pred_areas = pred_areas[pred_index]
+            pairs = counts[np.ix_(true_index, pred_index)]
+            rows, cols = np.nonzero(pairs)
+            intersections = pairs[rows, cols]
+        else:
+            self.true_areas = np.bincount(true, minlength=max_true + 1)[1:]
+            self.pred_areas = np.bincount(pred, minlength=max_pred + 1)[1:]
+            both = (true > 0) & (pred > 0)
+            codes, intersections = np.unique(
+                (true[both] - 1) * max_pred + (pred[both] - 1), return_counts=True
+            )
+            rows, cols = np.divmod(codes, max_pred)
+
+        # Row/column indices are 0-based positions into true_ids/pred_ids
+        self.rows = rows.astype(np.int64)
+        self.cols = cols.astype(np.int64)
+        self.intersections = intersections.astype(np.int64)
+
+    @property
+    def n_true(self):
+        return len(self.true_ids)
+
+    @property
+    def n_pred(self):
+        return len(self.pred_ids)
+
+    @property
+    def iou(self):
+        """
+        IoU of every overlapping pair.
+        """
+        union = (
+            self.true_areas[self.rows] + self.pred_areas[self.cols] - self.intersections
+        )
+        return self.intersections / union
+
+    def match(self):
+        """
+        Matches true and predicted instances one-to-one, greedily by
+        descending IoU (for IoU > 0.5 the match is unique, so this is the
+        optimal matching at the usual thresholds).
+
+        The greedy matching is computed in vectorized rounds: every pair that
+        is the best remaining pair of both its true and its predicted instance
+        is accepted, and the instances of accepted pairs are removed. Pairs with
+        IoU >= t are never affected by pairs below t, so counting the matches
+        with IoU >= t gives the greedy matching at every threshold t.
+
+        :return: `(rows, cols, iou)` of the matched pairs.
+        """
+        iou = self.iou
+        order = np.argsort(-iou, kind="stable")
+        rows, cols = self.rows[order], self.cols[order]
+
+        accepted = []
+        remaining = np.arange(len(order))
+        while len(remaining):
+            r, c = rows[remaining], cols[remaining]
+            _, best_r = np.unique(r, return_index=True)
+            _, best_c = np.unique(c, return_index=True)
+            chosen = remaining[np.intersect1d(best_r, best_c)]
+            accepted.append(chosen)
+            used = np.isin(r, rows[chosen]) | np.isin(c, cols[chosen])
+            remaining = remaining[~used]
+
+        matched = order[np.concatenate(accepted)] if accepted else order[:0]
+        return self.rows[matched], self.cols[matched], iou[matched]
+
+    def counts(self, thresholds=DEFAULT_THRESHOLDS):
+        """
+        Returns the match counts at every IoU threshold as a DataFrame with
+        the columns `threshold` and `COUNT_COLUMNS` (see `scores`).
+        """
+        thresholds = np.asarray(thresholds, dtype=np.float64)
+        _, _, iou = self.match()
+        hits = iou[:, None] >= thresholds[None, :]
+        return pd.DataFrame(
+            {
+                "threshold": thresholds,
+                "n_true": self.n_true,
+                "n_pred": self.n_pred,
+                "tp": hits.sum(axis=0),
+                "sum_iou": (hits * iou[:, None]).sum(axis=0),
+            }
+        )
+
+
+def scores(counts):
+    """
+    Adds the matching scores to a table of match counts.
+
+    - `fp`, `fn`: unmatched predicted and true instances.
+    - `precision`, `recall`, `f1`.
+    - `ap`: tp / (tp + fp + fn), the average precision of the Data Science
+      Bowl 2018 (BBBC038) at one threshold.
+    - `mean_matched_iou`: mean IoU of the matched pairs.
+    - `panoptic_quality`: sum of matched IoUs / (tp + fp / 2 + fn / 2).
+
+    Scores with an empty denominator are 1 if there are neither true nor
+    predicted instances, and 0 otherwise.
+    """
+    table = counts.copy()
+    tp = table["tp"].to_numpy(np.float64)
+    n_true = table["n_true"].to_numpy(np.float64)
+    n_pred = table["n_pred"].to_numpy(np.float64)
+    empty = np.where((n_true == 0) & (n_pred == 0), 1.0, 0.0)
+
+    def ratio(num, den):
+        return np.where(den > 0, num / np.maximum(den, 1), empty)
+
+    table["fp"] = (n_pred - tp).astype(np.int64)
+    table["fn"] = (n_true - tp).astype(np.int64)
+    table["precision"] = ratio(tp, n_pred)
+    table["recall"] = ratio(tp, n_true)
+    table["f1"] = ratio(2 * tp, n_true + n_pred)
+    table["ap"] = ratio(tp, n_true + n_pred - tp)
+    sum_iou = table["sum_iou"].to_numpy(np.float64)
+    table["mean_matched_iou"] = ratio(sum_iou, tp)
+    table["panoptic_quality"] = ratio(sum_iou, (n_true + n_pred) / 2)
+    return table
+
+
+def evaluate_instances(y_true, y_pred, thresholds=DEFAULT_THRESHOLDS):
+    """
+    Scores a predicted instance label map against the true one (2D or 3D).
+
+    :param y_true: True instance labels, e.g. `dataset.get_label(path, kind="instance")`.
+    :param y_pred: Predicted instance labels of the same shape.
+    :param thresholds: IoU thresholds of a match.
+    :return: DataFrame with one row per threshold (see `scores`).
+    """
+    return scores(InstanceOverlap(y_true, y_pred).counts(thresholds))
+
+
+class EvaluationResult:
+    """
+    Per-image match counts of a dataset evaluation.
+
+    Args:
+        table (pd.DataFrame): One row per image and threshold with the columns
+            `image_path`, `threshold` and `COUNT_COLUMNS`.
+    """
+
+    def __init__(self, table):
+        self.table = table
+
+    def per_image(self):
+        """
+        Returns the scores of every image and threshold.
+        """
+        return scores(self.table)
+
+    def summary(self):
+        """
+        Returns the scores per threshold over the whole dataset: counts are
+        summed over all images before scoring, and `mean_image_ap` is the
+        mean of the per-image `ap`.
+        """
+        summed = self.table.groupby("threshold", as_index=False)[
+            list(COUNT_COLUMNS)
+        ].sum()
+        summary = scores(summed)
+        per_image = self.per_image().groupby("threshold")["ap"].mean()
+        summary["mean_image_ap"] = per_image.to_numpy()
+        return summary
+
+    @property
+    def mean_ap(self):
+        """
+        The per-image AP averaged over images and thresholds (the score of
+        the Data Science Bowl 2018).
+        """
+        return float(self.per_image()["ap"].mean())
+
+
+def _prediction_getter(predictions):
+    if callable(predictions):
+        return predictions
+
+    def get(image_path):
+        if image_path in predictions:
+            return predictions[image_path]
+        return predictions.get(image_key(image_path))
+
+    return get
+
+
+def evaluate_dataset(
+    dataset,
+    predictions,
+    thresholds=DEFAULT_THRESHOLDS,
+    image_paths=None,
+    workers=None,
+):
+    """
+    Scores predictions against the instance ground truth of a dataset variant.
+
+    True labels come from `dataset.get_label(path, kind="instance")`; images
+    without a label or a prediction are skipped. Images are evaluated in
+    parallel threads (the overlap counting runs in NumPy).
+
+    :param dataset: A `BaseBBBCDataset` instance.
+    :param predictions: Callable returning the predicted instance labels of an
+        image path, or a dict keyed by image path or image key (see `image_key`).
+    :param thresholds: IoU thresholds of a match.
+    :param image_paths: Images to evaluate (default: all images of the dataset).
+    :param workers: Number of evaluation threads.
+    :return: An `EvaluationResult`.
+    """
+    get_prediction = _prediction_getter(predictions)
+    if image_paths is None:
+        image_paths = dataset.get_image_paths()
+
+    def evaluate_image(image_path):
+        y_pred = get_prediction(image_path)
+        if y_pred is None:
+            return None
+        try:
+            y_true = dataset.get_label(image_path, kind="instance")
+        except FileNotFoundError:
+            return None
+        if y_true is None:
+            return None
+        counts = InstanceOverlap(y_true, y_pred).counts(thresholds)
+        counts.insert(0, "image_path", image_path)
+        return counts
+
+    tables = [
+        table
+        for table in imap_ordered(evaluate_image, image_paths, workers=workers)
+        if table is not None
+    ]
+    if not tables:
+        columns = ["image_path", "threshold", *COUNT_COLUMNS]
+        return EvaluationResult(pd.DataFrame(columns=columns))
+    return EvaluationResult(pd.concat(tables, ignore_index=True))
@@ -1,7 +1,74 @@
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
 import diplib as dip
 import numpy as np
+import tifffile as tiff
 from PIL import Image
 
+from bbbc_datasets.utils.parallel import default_workers
+
+ImageInfo = namedtuple("ImageInfo", ["shape", "dtype", "channels", "pages"])
+ImageInfo.__doc__ = """
+Header information of an image file as returned by `probe`.
+
+- shape: The shape `load_image` returns for the file.
+- dtype: The NumPy dtype `load_image` returns for the file.
+- channels: Number of channels (samples per pixel).
+- pages: Number of 2D planes (TIFF pages, ICS z-planes or animation frames).
+"""
+
+# Pillow modes -> (dtype, channels)
+PIL_MODES = {
+    "1": (np.bool_, 1),
+    "L": (np.uint8, 1),
+    "P": (np.uint8, 1),
+    "LA": (np.uint8, 2),
+    "PA": (np.uint8, 2),
+    "RGB": (np.uint8, 3),
+    "RGBA": (np.uint8, 4),
+    "RGBX": (np.uint8, 4),
+    "CMYK": (np.uint8, 4),
+    "YCbCr": (np.uint8, 3),
+    "I": (np.int32, 1),
+    "F": (np.float32, 1),
+    "I;16": (np.uint16, 1),
+    "I;16L": (np.uint16, 1),
+    "I;16B": (np.dtype(">u2"), 1),
+}
+
+# diplib data types -> NumPy dtypes
+DIP_DTYPES = {
+    "BIN": np.bool_,
+    "UINT8": np.uint8,
+    "UINT16": np.uint16,
+    "UINT32": np.uint32,
+    "UINT64": np.uint64,
+    "SINT8": np.int8,
+    "SINT16": np.int16,
+    "SINT32": np.int32,
+    "SINT64": np.int64,
+    "SFLOAT": np.float32,
+    "DFLOAT": np.float64,
+    "SCOMPLEX": np.complex64,
+    "DCOMPLEX": np.complex128,
+}
+
+
+class ImageLoadError(RuntimeError):
+    """
+    Raised by `load_images` when one or more items of a batch fail to load.
+
+    `errors` maps the index of every failed item to a `(path, exception)` tuple.
+    """
+
+    def __init__(self, errors):
+        self.errors = errors
+        details = "; ".join(
+            f"[{idx}] {path}: {exc!r}" for idx, (path, exc) in sorted(errors.items())
+        )
+        super().__init__(f"Failed to load {len(errors)} image(s): {details}")
+
 
 def load_ics_image(image_path):
     """
@@ -13,12 +80,15 @@ def load_ics_image(image_path):
 
 def load_image(image_path):
     """
-    Loads an image (2D or 3D) and converts it to a displayable format.
-    - If the image is 3D (e.g., TIFF stack), it extracts the middle slice.
-    - If the image is grayscale, it normalizes it for display.
+    Loads an image (2D or 3D) as a NumPy array in its native dtype.
+    - ICS files are read with diplib.
+    - TIFF files are read with tifffile, so multi-page stacks are returned in full.
+    - All other formats are read with Pillow.
     """
-    if image_path.endswith(".ics") or image_path.endswith(".tiff"):
+    if image_path.lower().endswith(".ics"):
         img = load_ics_image(image_path)
+    elif image_path.lower().endswith((".tif", ".tiff")):
+        img = tiff.imread(image_path)
     else:
         img = Image.open(image_path)
 
@@ -31,3 +101,146 @@ def load_image(image_path):
         img = np.array(img)
 
     return img
+
+
+def probe(image_path):
+    """
+    Reads only the header of an image and returns its `ImageInfo`.
+
+    Supports PNG/JPEG (and other Pillow formats), TIFF and ICS without decoding
+    any pixel data, so shape tables can be built for whole datasets quickly.
+    """
+    lower = image_path.lower()
+
+    if lower.endswith(".ics"):
+        info = dip.ImageReadICSInfo(image_path)
+        sizes = info["sizes"]
+        shape = tuple(reversed(sizes))
+        channels = info["tensorElements"]
+        if channels > 1:
+            shape += (channels,)
+        pages = int(np.prod(sizes[2:], dtype=np.int64)) if len(sizes) > 2 else 1
+        return ImageInfo(shape, np.dtype(DIP_DTYPES[info["dataType"]]), channels, pages)
+
+    if lower.endswith((".tif", ".tiff")):
+        with tiff.TiffFile(image_path) as tif:
+            series = tif.series[0]
+            axes = series.axes
+            channels = 1
+            for axis in ("S", "C"):
+                if axis in axes:
+                    channels = series.shape[axes.index(axis)]
+                    break
+            return ImageInfo(
+                tuple(series.shape), np.dtype(series.dtype), channels, len(tif.pages)
+            )
+
+    with Image.open(image_path) as img:
+        if img.mode not in PIL_MODES:
+            raise ValueError(f"Unsupported image mode {img.mode} in {image_path}")
+        dtype, channels = PIL_MODES[img.mode]
+        width, height = img.size
+        shape = (height, width) if channels == 1 else (height, width, channels)
+        return ImageInfo(shape, np.dtype(dtype), channels, getattr(img, "n_frames", 1))
+
+
+def _load_into(image_path, dest):
+    """
+    Decodes an image directly into `dest` where the decoder supports it.
+
+    Returns None if `dest` was filled, or the decoded array if its shape or
+    dtype does not match `dest`.
+    """
+    if image_path.lower().endswith((".tif", ".tiff")):
+        try:
+            tiff.imread(image_path, out=dest)
+            return None
+        except (ValueError, TypeError):
+            pass  # Shape/dtype mismatch, decode into a new array below
+
+    img = load_image(image_path)
+    if img is None:
+        raise ValueError(f"Could not read image {image_path}")
+    if img.shape != dest.shape or img.dtype != dest.dtype:
+        return img
+
+    dest[...] = img
+    return None
+
+
+def load_images(image_paths, workers=None, out=None, stack=True, errors="raise"):
+    """
+    Loads a batch of images concurrently with a thread pool.
+
+    The decoders (tifffile, zlib, Pillow, diplib) release the GIL, so threads
+    scale with the number of cores. Results are returned in input order.
+
+    - If `out` is given (an array with one entry per path, or a list of arrays),
+      every image is decoded into its slot; TIFFs are decoded in place.
+    - Otherwise, if `stack` is True, the first image determines shape and dtype
+      and one output array is preallocated for the whole batch. Items that do
+      not match it are returned separately and the result becomes a list.
+
+    :param image_paths: List of image paths.
+    :param workers: Number of threads (default: `default_workers()`).
+    :param out: Optional preallocated destination(s).
+    :param stack: Return one stacked array for uniformly shaped images.
+    :param errors: "raise" to raise an `ImageLoadError` listing every failed
+        item once the batch is done, or "ignore" to return None for failed items.
+    :return: An array of shape (N, ...) or a list of arrays.
+    """
+    if errors not in ("raise", "ignore"):
+        raise ValueError(
+            f"Invalid errors mode: {errors}. Choose from 'raise', 'ignore'"
+        )
+
+    image_paths = list(image_paths)
+    results = [None] * len(image_paths)
+    failures = {}
+    start = 0
+
+    if out is None and stack and image_paths:
+        start = 1
+        try:
+            first = load_image(image_paths[0])
+            if first is None:
+                raise ValueError(f"Could not read image {image_paths[0]}")
+        except Exception as exc:
+            failures[0] = (image_paths[0], exc)
+        else:
+            out = np.empty((len(image_paths),) + first.shape, dtype=first.dtype)
+            out[0] = first
+            del first
+
+    if out is not None and len(out) != len(image_paths):
+        raise ValueError(f"out has {len(out)} entries for {len(image_paths)} paths")
+
+    def load(idx):
+        try:
+            if out is None:
+                results[idx] = load_image(image_paths[idx])
+                if results[idx] is None:
+                    raise ValueError(f"Could not read image {image_paths[idx]}")
+            else:
+                results[idx] = _load_into(image_paths[idx], out[idx])
+        except Exception as exc:
+            results[idx] = None
+            failures[idx] = (image_paths[idx], exc)
+
+    with ThreadPoolExecutor(max_workers=workers or default_workers()) as executor:
+        list(executor.map(load, range(start, len(image_paths))))
+
+    if failures and errors == "raise":
+        raise ImageLoadError(failures)
+
+    if out is None:
+        return results
+
+    if not failures and all(img is None for img in results):
+        return out
+
+    # Failed items are None, mismatching items keep their own array
+    return [
+        None if idx in failures else out[idx] if img is None else img
+        for idx, img in enumerate(results)
+    ]
@@ -0,0 +1,151 @@
+import cv2
+import numpy as np
+
+INSTANCE_MODES = ("components", "rgb")
+
+
+def _instance_dtype(num_labels):
+    return np.uint16 if num_labels <= np.iinfo(np.uint16).max else np.uint32
+
+
+def _label_slice(mask):
+    """
+    Labels the 8-connected components of a 2D mask (background 0).
+    """
+    num, labels = cv2.connectedComponents(mask.view(np.uint8), connectivity=8)
+    return num - 1, labels
+
+
+def _resolve(parent, a, b):
+    """
+    Merges the label pairs `(a, b)` in a union-find `parent` array and returns
+    every label's root, without a Python loop over labels: roots are lowered
+    along the pairs and compressed by pointer jumping until they are stable.
+    """
+    while True:
+        root_a, root_b = parent[a], parent[b]
+        smaller = np.minimum(root_a, root_b)
+        np.minimum.at(parent, root_a, smaller)
+        np.minimum.at(parent, root_b, smaller)
+        while True:
+            jumped = parent[parent]
+            if np.array_equal(jumped, parent):
+                break
+            parent = jumped
+        if np.array_equal(parent[a], parent[b]):
+            return parent
+
+
+def label_components(mask):
+    """
+    Labels the connected components of a binary 2D or 3D mask.
+
+    2D masks are labelled with `cv2.connectedComponents` (8-connectivity).
+    3D masks are labelled slice by slice, and the labels of foreground pixels
+    that touch along z are merged with a vectorized union-find.
+
+    :param mask: 2D (Y, X) or 3D (Z, Y, X) array; every non-zero pixel is foreground.
+    :return: Instance map with consecutive labels 1..N (uint16, or uint32 for more labels).
+    """
+    mask = np.ascontiguousarray(np.asarray(mask) != 0)
+    if mask.ndim == 2:
+        num, labels = _label_slice(mask)
+        return labels.astype(_instance_dtype(num))
+    if mask.ndim != 3:
+        raise ValueError(f"Expected a 2D or 3D mask, got shape {mask.shape}")
+
+    labels = np.zeros(mask.shape, dtype=np.int64)
+    offset = 0
+    for z in range(mask.shape[0]):
+        num, slice_labels = _label_slice(mask[z])
+        labels[z] = np.where(slice_labels > 0, slice_labels + offset, 0)
+        offset += num
+
+    # Pairs of slice labels that touch between neighbouring slices
+    touching = (labels[:-1] > 0) & (labels[1:] > 0)
+    pairs = np.stack([labels[:-1][touching], labels[1:][touching]], axis=1)
+    parent = np.arange(offset + 1, dtype=np.int64)
+    if len(pairs):
+        pairs = np.unique(pairs, axis=0)
+        parent = _resolve(parent, pairs[:, 0], pairs[:, 1])
+
+    # Consecutive labels in the order of their roots
+    roots, relabel = np.unique(parent, return_inverse=True)
+    return relabel.reshape(parent.shape)[labels].astype(_instance_dtype(len(roots)))
+
+
+def _bounding_boxes(ids, num):
+    """
+    Returns the `(y0, y1, x0, x1)` bounds (inclusive) of the labels 1..num of
+    a 2D label map (all present) in one pass over its foreground pixels.
+    """
+    flat = ids.reshape(-1)
+    pixels = np.flatnonzero(flat)
+    pixels = pixels[np.argsort(flat[pixels], kind="stable")]
+    ys, xs = np.divmod(pixels, ids.shape[1])
+    counts = np.bincount(flat[pixels], minlength=num + 1)[1:]
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    return (
+        np.minimum.reduceat(ys, starts),
+        np.maximum.reduceat(ys, starts),
+        np.minimum.reduceat(xs, starts),
+        np.maximum.reduceat(xs, starts),
+    )
+
+
+def decode_rgb_instances(mask):
+    """
+    Decodes a color-coded instance mask (e.g. BBBC039) into an instance map.
+
+    Touching objects have distinct colors, but colors are reused for objects
+    that do not touch, so every color's connected components become separate
+    instances. Black is background.
+
+    The bounding box of every color is found in one pass over the pixels, and
+    the components of a color are labelled within its box only, so the cost
+    follows the object sizes instead of colors x image size.
+
+    :param mask: (Y, X, C) array with up to 4 8-bit channels, or a 2D array.
+    :return: Instance map with consecutive labels 1..N.
+    """
+    mask = np.asarray(mask)
+    if mask.ndim == 2:
+        codes = mask.astype(np.int64)
+    else:
+        codes = np.zeros(mask.shape[:2], dtype=np.int64)
+        for c in range(min(mask.shape[2], 4)):
+            codes |= mask[..., c].astype(np.int64) << (8 * c)
+
+    # Colors as consecutive ids 1..K (0 stays background)
+    colors, ids = np.unique(codes, return_inverse=True)
+    ids = ids.reshape(codes.shape)
+    if len(colors) and colors[0] != 0:
+        ids += 1
+    num_colors = int(ids.max()) if ids.size else 0
+
+    labels = np.zeros(codes.shape, dtype=np.int64)
+    offset = 0
+    if num_colors:
+        bounds = _bounding_boxes(ids, num_colors)
+        for color, (y0, y1, x0, x1) in enumerate(zip(*bounds), start=1):
+            box = (slice(y0, y1 + 1), slice(x0, x1 + 1))
+            num, color_labels = _label_slice(ids[box] == color)
+            inside = color_labels > 0
+            labels[box][inside] = color_labels[inside] + offset
+            offset += num
+    return labels.astype(_instance_dtype(offset))
+
+
+def to_instances(label, mode):
+    """
+    Converts a label as shipped into a canonical instance map.
+
+    :param label: The label array.
+    :param mode: "components" (connected components of a foreground mask) or
+        "rgb" (color-coded instances).
+    """
+    if mode == "components":
+        return label_components(label)
+    if mode == "rgb":
+        return decode_rgb_instances(label)
+    raise ValueError(f"Invalid instance mode: {mode}. Choose from {INSTANCE_MODES}")
@@ -0,0 +1,118 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from bbbc_datasets.utils.sample_index import image_key, load_table, save_table
+
+METADATA_FORMAT_VERSION = 1
+METADATA_EXTENSIONS = (".csv", ".tsv")
+CATEGORICAL_RATIO = 0.5  # Maximum unique values per row of categorical columns
+
+
+def file_stamp(path):
+    """
+    Returns a cheap change marker of a file (size and modification time).
+    """
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def read_metadata_csv(path, dtypes=None):
+    """
+    Parses a metadata CSV (or TSV) file into a typed table.
+
+    Columns listed in `dtypes` are parsed with that dtype. Other integer
+    columns are downcast to the smallest integer type, and text columns
+    become strings with "" for missing values; text columns with mostly
+    repeated values (e.g. plate or path names) become categorical.
+
+    :param path: The metadata file.
+    :param dtypes: Optional dict of column -> dtype.
+    """
+    sep = "\t" if path.lower().endswith(".tsv") else ","
+    table = pd.read_csv(path, sep=sep, dtype=dtypes)
+
+    dtypes = dtypes or {}
+    for name in table.columns:
+        if name in dtypes:
+            continue
+        column = table[name]
+        if pd.api.types.is_integer_dtype(column):
+            table[name] = pd.to_numeric(column, downcast="integer")
+        elif column.dtype == object:
+            column = column.fillna("").astype(str)
+            if column.nunique() <= CATEGORICAL_RATIO * len(column):
+                column = column.astype("category")
+            table[name] = column
+    return table
+
+
+def load_metadata_table(path, cache_path, dtypes=None, refresh=False):
+    """
+    Returns the typed table of a metadata file, parsed once and cached as
+    column arrays (see `save_table`), so later loads skip the text parsing
+    until the file changes.
+
+    :param path: The metadata file.
+    :param cache_path: The `.npz` cache file.
+    :param dtypes: Optional dict of column -> dtype (see `read_metadata_csv`).
+    :param refresh: Parse the file again even if the cache is up to date.
+    """
+    stamp = file_stamp(path)
+    if os.path.exists(cache_path) and not refresh:
+        table, attrs = load_table(cache_path)
+        if (
+            attrs.get("version") == METADATA_FORMAT_VERSION
+            and attrs.get("source") == stamp
+        ):
+            return table
+
+    table = read_metadata_csv(path, dtypes=dtypes)
+    save_table(table, cache_path, version=METADATA_FORMAT_VERSION, source=stamp)
+    return table
+
+
+def find_key_column(table, extensions):
+    """
+    Returns the first text column that holds image file names (most values
+    end with one of `extensions`), or None.
+    """
+    extensions = tuple(e.lower() for e in extensions)
+    for name in table.columns:
+        column = table[name]
+        if column.dtype != object or not len(column):
+            continue  # File names are unique, so never categorical
+        names = column.astype(str).str.lower()
+        if np.mean([n.endswith(extensions) for n in names]) >= 0.5:
+            return name
+    return None
+
+
+def join_metadata(tables, key_columns=None, extensions=()):
+    """
+    Joins metadata tables on the image key of their file name column.
+
+    :param tables: Dict of file name -> table (see `load_metadata_table`).
+    :param key_columns: Optional dict of file name -> column holding the image
+        file name; otherwise it is detected (see `find_key_column`).
+    :param extensions: Image file extensions used to detect the key column.
+    :return: A table with a `key` column (see `image_key`), or None if no
+        table refers to images.
+    """
+    key_columns = key_columns or {}
+    joined = None
+    for name, table in tables.items():
+        column = key_columns.get(name) or find_key_column(table, extensions)
+        if column is None:
+            continue
+
+        keyed = table.copy()
+        keyed.insert(0, "key", [image_key(v) for v in table[column].astype(str)])
+        keyed = keyed.drop_duplicates("key")
+        if joined is None:
+            joined = keyed
+        else:
+            suffix = f"_{os.path.splitext(name)[0]}"
+            joined = joined.merge(keyed, on="key", how="outer", suffixes=("", suffix))
+    return joined
@@ -0,0 +1,130 @@
+import cv2
+import numpy as np
+
+NORMALIZATION_MODES = ("minmax", "percentile", "dataset", "none", None)
+DEFAULT_PERCENTILES = (1.0, 99.8)
+EPSILON = 1e-8
+
+# dtypes supported by cv2.minMaxLoc
+_CV2_MINMAX_DTYPES = (
+    np.uint8,
+    np.int8,
+    np.uint16,
+    np.int16,
+    np.int32,
+    np.float32,
+    np.float64,
+)
+
+
+def minmax(img):
+    """
+    Returns `(min, max)` of an array in a single pass where possible (cv2.minMaxLoc),
+    without converting it to floating point first.
+    """
+    if (
+        img.size
+        and img.dtype.type in _CV2_MINMAX_DTYPES
+        and img.dtype.isnative
+        and img.flags.c_contiguous
+    ):
+        lo, hi, _, _ = cv2.minMaxLoc(img.reshape(1, -1))
+        return lo, hi
+    return img.min(), img.max()
+
+
+def integer_histogram(img, bins=None):
+    """
+    Returns the unit-bin histogram (float64 counts) of an 8/16-bit unsigned image
+    in a single pass, using cv2.calcHist for contiguous arrays.
+    """
+    bins = bins or (256 if img.dtype == np.uint8 else 65536)
+    if img.flags.c_contiguous:
+        counts = cv2.calcHist([img.reshape(1, -1)], [0], None, [bins], [0, bins])
+        return counts.reshape(-1).astype(np.float64)
+    return np.bincount(img.reshape(-1), minlength=bins).astype(np.float64)
+
+
+def histogram_percentiles(counts, q, values=None):
+    """
+    Returns the percentiles `q` of the data summarized by a histogram
+    (lower nearest-rank; `values` are the bin values, default: the bin indices).
+    """
+    cdf = np.cumsum(counts)
+    ranks = np.asarray(q, dtype=np.float64) / 100.0 * (cdf[-1] - 1)
+    idx = np.minimum(np.searchsorted(cdf, ranks, side="right"), len(counts) - 1)
+    values = np.arange(len(counts)) if values is None else np.asarray(values)
+    return tuple(float(values[i]) for i in idx)
+
+
+def percentiles(img, q=DEFAULT_PERCENTILES):
+    """
+    Returns the given percentiles of an array.
+
+    8/16-bit unsigned images use a single histogram pass instead of sorting a
+    floating point copy of the whole image.
+    """
+    if img.dtype in (np.uint8, np.uint16) and img.size:
+        return histogram_percentiles(integer_histogram(img), q)
+    return tuple(float(v) for v in np.percentile(img, q))
+
+
+def _scale(img, offset, scale, copy=True):
+    """
+    Computes `(img - offset) * scale` into a single new float32 array
+    (or in place if `copy` is False and `img` is a writable float32 array).
+    """
+    if not copy and img.dtype == np.float32 and img.flags.writeable:
+        out = img
+    else:
+        out = np.empty(img.shape, dtype=np.float32)
+    np.subtract(img, np.float32(offset), out=out, casting="unsafe")
+    out *= np.float32(scale)
+    return out
+
+
+def normalize_image(
+    img, mode="minmax", percentile_range=DEFAULT_PERCENTILES, stats=None, copy=True
+):
+    """
+    Normalizes an image with at most one float32 allocation.
+
+    Modes:
+    - "minmax": Scale to [0, 1] with the per-image minimum and maximum.
+    - "percentile": Scale the per-image `percentile_range` to [0, 1] (not clipped).
+    - "dataset": Use dataset-level `stats`, either `{"mean": .., "std": ..}`
+      (z-score) or `{"low": .., "high": ..}` (range scaling).
+    - "none" or None: Keep the native dtype.
+
+    :param img: The image array.
+    :param mode: One of `NORMALIZATION_MODES`.
+    :param percentile_range: Lower and upper percentile for mode "percentile".
+    :param stats: Dataset statistics for mode "dataset".
+    :param copy: If False, the caller hands over the image, and a writable
+        float32 image is normalized in place instead of copied.
+    :return: A float32 array, or the input array for mode "none" or None.
+    """
+    if mode is None or mode == "none":
+        return img
+
+    if mode == "minmax":
+        lo, hi = minmax(img)
+    elif mode == "percentile":
+        lo, hi = percentiles(img, percentile_range)
+    elif mode == "dataset":
+        if not stats:
+            raise ValueError(
+                "Normalization mode 'dataset' requires dataset statistics."
+            )
+        if "mean" in stats and "std" in stats:
+            return _scale(
+                img, stats["mean"], 1.0 / (float(stats["std"]) + EPSILON), copy
+            )
+        lo, hi = stats["low"], stats["high"]
+    else:
+        raise ValueError(
+            f"Invalid normalization mode: {mode}. Choose from {list(NORMALIZATION_MODES)}"
+        )
+
+    lo, hi = float(lo), float(hi)
+    return _scale(img, lo, 1.0 / (hi - lo + EPSILON), copy)
@@ -0,0 +1,365 @@
+import json
+import os
+import shutil
+import zlib
+
+import numpy as np
+
+from bbbc_datasets.utils.file_io import load_image
+from bbbc_datasets.utils.parallel import imap_ordered
+
+PACK_FORMAT_VERSION = 1
+PACK_META_FILE = "pack.json"
+PACK_INDEX_FILE = "index.npz"
+PACK_METADATA_SUBDIR = "metadata"
+
+DEFAULT_SHARD_SIZE = 256 * 1024 * 1024  # 256 MiB
+ALIGNMENT = 64  # Byte alignment of every array inside a shard
+MAX_NDIM = 6
+
+COMPRESSIONS = (None, "zlib")
+
+
+class ShardWriter:
+    """
+    Appends raw (or zlib-compressed) array bytes to a sequence of shard files.
+
+    A new shard is started as soon as the current one exceeds `shard_size`.
+    Every array starts at an `ALIGNMENT`-byte boundary so that uncompressed
+    arrays can be viewed in place from a memory map.
+    """
+
+    def __init__(
+        self,
+        out_dir,
+        prefix="shard",
+        shard_size=DEFAULT_SHARD_SIZE,
+        compression=None,
+        level=1,
+    ):
+        if compression not in COMPRESSIONS:
+            raise ValueError(
+                f"Invalid compression: {compression}. Choose from {list(COMPRESSIONS)}"
+            )
+
+        self.out_dir = out_dir
+        self.prefix = prefix
+        self.shard_size = shard_size
+        self.compression = compression
+        self.level = level
+
+        self.shards = []
+        self._file = None
+        self._offset = 0
+
+    def _open_next_shard(self):
+        if self._file:
+            self._file.close()
+        name = f"{self.prefix}-{len(self.shards):05d}.bin"
+        self.shards.append(name)
+        self._file = open(os.path.join(self.out_dir, name), "wb")
+        self._offset = 0
+
+    def write(self, array):
+        """
+        Writes an array and returns its `(shard, offset, nbytes)` location.
+        """
+        if self._file is None or self._offset >= self.shard_size:
+            self._open_next_shard()
+
+        data = np.ascontiguousarray(array)
+        if self.compression == "zlib":
+            data = zlib.compress(data, self.level)
+
+        padding = -self._offset % ALIGNMENT
+        if padding:
+            self._file.write(b"\0" * padding)
+            self._offset += padding
+
+        offset = self._offset
+        nbytes = len(data) if isinstance(data, bytes) else data.nbytes
+        self._file.write(data)
+        self._offset += nbytes
+
+        return len(self.shards) - 1, offset, nbytes
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
+class PackWriter:
+    """
+    Writes samples made of one or more named arrays (e.g. "image" and "label")
+    into sharded storage with a columnar offset index.
+
+    The index (`index.npz`) holds, for every kind, the shard id, byte offset,
+    stored size, shape and dtype of each sample. `pack.json` is written last and
+    marks the pack as complete.
+    """
+
+    def __init__(
+        self,
+        out_dir,
+        kinds=("image", "label"),
+        shard_size=DEFAULT_SHARD_SIZE,
+        compression=None,
+        level=1,
+    ):
+        os.makedirs(out_dir, exist_ok=True)
+
+        self.out_dir = out_dir
+        self.kinds = tuple(kinds)
+        self.writer = ShardWriter(
+            out_dir, shard_size=shard_size, compression=compression, level=level
+        )
+        self.paths = []
+        self.records = {kind: [] for kind in self.kinds}
+
+    def add(self, path, **arrays):
+        """
+        Appends one sample. Kinds that are missing or `None` are recorded as absent.
+        """
+        self.paths.append(path)
+        for kind in self.kinds:
+            array = arrays.get(kind)
+            if array is None:
+                self.records[kind].append((-1, 0, 0, (), ""))
+                continue
+
+            array = np.asarray(array)
+            if array.ndim > MAX_NDIM:
+                raise ValueError(
+                    f"Arrays with more than {MAX_NDIM} dimensions are not supported."
+                )
+            shard, offset, nbytes = self.writer.write(array)
+            self.records[kind].append(
+                (shard, offset, nbytes, array.shape, array.dtype.str)
+            )
+
+    def close(self, **meta):
+        """
+        Flushes the shards and writes the index and the pack description.
+        """
+        self.writer.close()
+
+        columns = {"path": np.array(self.paths, dtype=str)}
+        for kind, records in self.records.items():
+            shapes = np.full((len(records), MAX_NDIM), -1, dtype=np.int64)
+            for i, record in enumerate(records):
+                shapes[i, : len(record[3])] = record[3]
+
+            columns[f"{kind}_shard"] = np.array([r[0] for r in records], np.int32)
+            columns[f"{kind}_offset"] = np.array([r[1] for r in records], np.int64)
+            columns[f"{kind}_nbytes"] = np.array([r[2] for r in records], np.int64)
+            columns[f"{kind}_ndim"] = np.array([len(r[3]) for r in records], np.int8)
+            columns[f"{kind}_shape"] = shapes
+            columns[f"{kind}_dtype"] = np.array([r[4] for r in records], dtype=str)
+
+        np.savez(os.path.join(self.out_dir, PACK_INDEX_FILE), **columns)
+
+        description = {
+            "version": PACK_FORMAT_VERSION,
+            "kinds": list(self.kinds),
+            "shards": self.writer.shards,
+            "compression": self.writer.compression,
+            "num_samples": len(self.paths),
+        }
+        description.update(meta)
+
+        with open(os.path.join(self.out_dir, PACK_META_FILE), "w") as f:
+            json.dump(description, f, indent=2)
+
+
+class PackReader:
+    """
+    Reads samples from a pack written by `PackWriter`.
+
+    Shards are memory-mapped once per process. Uncompressed arrays are returned
+    as read-only zero-copy views into the memory map; compressed arrays are
+    decompressed on access. The reader pickles without its memory maps, so it is
+    cheap to send to DataLoader workers, which re-open the shards lazily.
+    """
+
+    def __init__(self, pack_dir):
+        meta_file = os.path.join(pack_dir, PACK_META_FILE)
+        if not os.path.exists(meta_file):
+            raise FileNotFoundError(f"No complete pack found in {pack_dir}")
+
+        with open(meta_file) as f:
+            self.meta = json.load(f)
+
+        if self.meta.get("version") != PACK_FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported pack version {self.meta.get('version')} in {pack_dir}"
+            )
+
+        self.pack_dir = pack_dir
+        self.kinds = self.meta["kinds"]
+        self.compression = self.meta["compression"]
+
+        with np.load(os.path.join(pack_dir, PACK_INDEX_FILE)) as index:
+            self.index = {name: index[name] for name in index.files}
+
+        self.paths = self.index["path"]
+        self._path_lookup = None
+        self._maps = {}
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_maps"] = {}
+        return state
+
+    def _shard(self, shard):
+        mm = self._maps.get(shard)
+        if mm is None:
+            shard_path = os.path.join(self.pack_dir, self.meta["shards"][shard])
+            mm = np.memmap(shard_path, dtype=np.uint8, mode="r")
+            self._maps[shard] = mm
+        return mm
+
+    def shape(self, idx, kind="image"):
+        """
+        Returns the stored shape of a sample without touching the shards.
+        """
+        ndim = self.index[f"{kind}_ndim"][idx]
+        return tuple(int(s) for s in self.index[f"{kind}_shape"][idx, :ndim])
+
+    def get(self, idx, kind="image"):
+        """
+        Returns the array of the given kind for sample `idx` (or None if absent).
+        """
+        shard = int(self.index[f"{kind}_shard"][idx])
+        if shard < 0:
+            return None
+
+        offset = int(self.index[f"{kind}_offset"][idx])
+        nbytes = int(self.index[f"{kind}_nbytes"][idx])
+        dtype = np.dtype(self.index[f"{kind}_dtype"][idx])
+        shape = self.shape(idx, kind)
+
+        mm = self._shard(shard)
+        if self.compression == "zlib":
+            data = zlib.decompress(mm[offset : offset + nbytes])
+            return np.frombuffer(data, dtype=dtype).reshape(shape)
+
+        return np.ndarray(shape, dtype=dtype, buffer=mm, offset=offset)
+
+    def get_image(self, idx):
+        return self.get(idx, "image")
+
+    def get_label(self, idx):
+        return self.get(idx, "label")
+
+    def index_of(self, path):
+        """
+        Returns the sample index of an original image path.
+        """
+        if self._path_lookup is None:
+            self._path_lookup = {p: i for i, p in enumerate(self.paths)}
+        return self._path_lookup[path]
+
+    def get_metadata_paths(self):
+        """
+        Returns the metadata files that were copied into the pack.
+        """
+        dir_path = os.path.join(self.pack_dir, PACK_METADATA_SUBDIR)
+        if not os.path.exists(dir_path):
+            return []
+        return [os.path.join(dir_path, f) for f in sorted(os.listdir(dir_path))]
+
+
+def is_packed(pack_dir):
+    """
+    Checks whether `pack_dir` contains a complete pack.
+    """
+    return os.path.exists(os.path.join(pack_dir, PACK_META_FILE))
+
+
+def load_sample(dataset, image_path):
+    """
+    Returns the image and paired label (None if absent) of a dataset sample.
+    """
+    image = load_image(image_path)
+    try:
+        label = dataset.get_label(image_path)
+    except FileNotFoundError:
+        label = None
+    return image, label
+
+
+def pack_dataset(
+    dataset,
+    out_dir=None,
+    shard_size=DEFAULT_SHARD_SIZE,
+    compression=None,
+    level=1,
+    workers=None,
+    overwrite=False,
+):
+    """
+    Converts a dataset variant into sharded array storage.
+
+    Images and their paired labels (through `dataset.get_label`) are decoded in
+    parallel and appended in order to the shards. Metadata files are copied into
+    the pack, so later epochs never need to touch the original tree. The pack
+    records the sample index version of its source and is rebuilt when the
+    images change; a failed build removes the partly written pack.
+
+    :param dataset: A `BaseBBBCDataset` instance.
+    :param out_dir: Target directory (default: the dataset's "packed" cache directory).
+    :param shard_size: Approximate size of a shard in bytes.
+    :param compression: None (uncompressed, zero-copy reads) or "zlib".
+    :param level: zlib compression level (1 = fast, light compression).
+    :param workers: Number of decoding threads.
+    :param overwrite: Rebuild the pack even if an up-to-date one exists.
+    :return: A `PackReader` for the pack.
+    """
+    if out_dir is None:
+        out_dir = dataset.get_cache_dir("packed")
+
+    # A complete pack is reused only while the source images are unchanged
+    version = dataset.get_sample_index().version
+    if is_packed(out_dir):
+        reader = PackReader(out_dir)
+        if reader.meta.get("source_version") == version and not overwrite:
+            return reader
+        shutil.rmtree(out_dir)
+
+    image_paths = dataset.get_image_paths()
+    if not image_paths:
+        raise RuntimeError(f"No images found for {dataset.KEY}")
+
+    print(f"📦 Packing {len(image_paths)} samples of {dataset.KEY} to {out_dir}...")
+    writer = PackWriter(
+        out_dir, shard_size=shard_size, compression=compression, level=level
+    )
+    try:
+        samples = imap_ordered(
+            lambda path: load_sample(dataset, path), image_paths, workers=workers
+        )
+        for image_path, (image, label) in zip(image_paths, samples):
+            writer.add(image_path, image=image, label=label)
+
+        metadata_dir = os.path.join(out_dir, PACK_METADATA_SUBDIR)
+        for meta_path in dataset.get_metadata_paths():
+            if os.path.isfile(meta_path):
+                os.makedirs(metadata_dir, exist_ok=True)
+                shutil.copy2(meta_path, metadata_dir)
+
+        writer.close(
+            dataset=type(dataset).__name__,
+            key=dataset.KEY,
+            is_3d=bool(dataset.is_3d),
+            source_version=version,
+        )
+    except BaseException:
+        # Never leave partly written shards behind
+        writer.writer.close()
+        shutil.rmtree(out_dir, ignore_errors=True)
+        raise
+    return PackReader(out_dir)
@@ -0,0 +1,44 @@
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+def default_workers():
+    """
+    Returns a sensible default number of worker threads for I/O and decoding.
+    """
+    return min(32, (os.cpu_count() or 1) + 4)
+
+
+def imap_ordered(
+    fn, items, workers=None, prefetch=None, executor_cls=ThreadPoolExecutor
+):
+    """
+    Applies `fn` to every item concurrently and yields the results in input order.
+
+    Unlike `Executor.map`, at most `prefetch` items are in flight at any time, so a
+    slow consumer (e.g. a writer appending to a shard) never causes all decoded
+    results to pile up in memory.
+
+    :param fn: Callable applied to each item.
+    :param items: Iterable of inputs.
+    :param workers: Number of workers (default: `default_workers()`).
+    :param prefetch: Maximum number of pending results (default: 2 * workers).
+    :param executor_cls: `ThreadPoolExecutor` (default) or `ProcessPoolExecutor`.
+    """
+    workers = workers or default_workers()
+    prefetch = max(1, prefetch or 2 * workers)
+
+    if workers <= 1:
+        for item in items:
+            yield fn(item)
+        return
+
+    with executor_cls(max_workers=workers) as executor:
+        pending = deque()
+        for item in items:
+            pending.append(executor.submit(fn, item))
+            if len(pending) >= prefetch:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
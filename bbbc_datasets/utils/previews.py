@@ -0,0 +1,256 @@
+import os
+import shutil
+
+import cv2
+import numpy as np
+
+from bbbc_datasets.utils.normalization import DEFAULT_PERCENTILES, percentiles
+from bbbc_datasets.utils.pack import load_sample
+from bbbc_datasets.utils.parallel import imap_ordered
+
+PREVIEW_FORMAT_VERSION = 1
+PROJECTIONS = ("mip", "middle")
+THUMBNAIL = "thumbnail"
+
+
+def to_plane(array, projection="mip", reduce=np.max):
+    """
+    Reduces an image to one 2D plane (keeping a trailing RGB(A) channel axis):
+    leading axes (Z, T) are reduced with a maximum-intensity projection
+    ("mip") or by taking the middle slice ("middle").
+    """
+    if projection not in PROJECTIONS:
+        raise ValueError(f"Invalid projection: {projection}. Choose from {PROJECTIONS}")
+
+    plane = np.asarray(array)
+    while plane.ndim > 3 or (plane.ndim == 3 and plane.shape[-1] not in (3, 4)):
+        if projection == "mip":
+            plane = reduce(plane, axis=0)
+        else:
+            plane = plane[plane.shape[0] // 2]
+    return plane
+
+
+def to_uint8(plane, percentile_range=DEFAULT_PERCENTILES):
+    """
+    Scales a plane to uint8 between two percentiles for display.
+    """
+    low, high = percentiles(plane, percentile_range)
+    scale = 255.0 / (high - low) if high > low else 0.0
+    out = (plane.astype(np.float32) - low) * scale
+    return np.clip(out, 0, 255).astype(np.uint8)
+
+
+def pyramid_levels(plane, num_levels, thumbnail_size, label=False):
+    """
+    Returns the downsampled levels of a plane: level `k` has `1 / 2**k` of the
+    resolution, and the thumbnail fits into `thumbnail_size` pixels.
+    Images are averaged (area interpolation), labels keep their values (nearest).
+    """
+    interpolation = cv2.INTER_NEAREST if label else cv2.INTER_AREA
+    levels = {}
+    current = plane
+    for level in range(1, num_levels + 1):
+        height, width = current.shape[:2]
+        size = (max(width // 2, 1), max(height // 2, 1))
+        current = cv2.resize(current, size, interpolation=interpolation)
+        levels[str(level)] = current
+
+    height, width = plane.shape[:2]
+    factor = min(thumbnail_size / max(height, width), 1.0)
+    size = (max(int(round(width * factor)), 1), max(int(round(height * factor)), 1))
+    levels[THUMBNAIL] = cv2.resize(plane, size, interpolation=interpolation)
+    return levels
+
+
+class PreviewCache:
+    """
+    Compact on-disk cache of downsampled previews of a dataset.
+
+    Every (kind, level) is one contiguous `.npy` buffer with an offset and
+    shape table, so a preview is a slice of a memory-mapped file and serving
+    it never touches the full-resolution image. Images are stored as uint8
+    (percentile-scaled for display), labels as uint16.
+
+    Args:
+        cache_dir (str): Directory written by `PreviewCache.build`.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        with np.load(os.path.join(cache_dir, "index.npz")) as data:
+            if int(data["format"]) != PREVIEW_FORMAT_VERSION:
+                raise ValueError(f"Unsupported preview cache version in {cache_dir}")
+            self.keys = data["keys"]
+            self.names = [str(n) for n in data["names"]]
+            self.offsets = {n: data[f"offsets:{n}"] for n in self.names}
+            self.shapes = {n: data[f"shapes:{n}"] for n in self.names}
+        self._rows = {str(key): i for i, key in enumerate(self.keys)}
+        self._buffers = {}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return key in self._rows
+
+    @property
+    def levels(self):
+        return sorted({n.split(":", 1)[1] for n in self.names})
+
+    def _buffer(self, name):
+        if name not in self._buffers:
+            self._buffers[name] = np.load(
+                os.path.join(self.cache_dir, f"{name}.npy"), mmap_mode="r"
+            )
+        return self._buffers[name]
+
+    def get(self, key, level=THUMBNAIL, kind="image"):
+        """
+        Returns the preview of a sample key at a level (1, 2, .. or "thumbnail"),
+        or None if the sample has no such preview (e.g. no label).
+        """
+        name = f"{kind}:{level}"
+        if name not in self.offsets:
+            raise KeyError(f"No {kind} previews at level {level!r}: {self.levels}")
+
+        row = self._rows[key]
+        start, stop = self.offsets[name][row], self.offsets[name][row + 1]
+        if start == stop:
+            return None
+        shape = tuple(int(d) for d in self.shapes[name][row] if d > 0)
+        return np.asarray(self._buffer(name)[start:stop]).reshape(shape)
+
+    @classmethod
+    def build(
+        cls,
+        cache_dir,
+        keys,
+        load_sample,
+        num_levels=3,
+        thumbnail_size=128,
+        projection="mip",
+        workers=None,
+    ):
+        """
+        Decodes all samples in parallel and writes their preview pyramids.
+
+        :param cache_dir: Target directory (replaced atomically).
+        :param keys: Sample keys in order (e.g. relative image paths).
+        :param load_sample: Returns `(image, label)` of a key (label may be None).
+        :param num_levels: Number of halved levels besides the thumbnail.
+        :param thumbnail_size: Maximum thumbnail side length in pixels.
+        :param projection: "mip" or "middle" for 3D samples.
+        :param workers: Number of decoding threads.
+        """
+        levels = [str(k) for k in range(1, num_levels + 1)] + [THUMBNAIL]
+        names = [f"{kind}:{level}" for kind in ("image", "label") for level in levels]
+        parts = {name: [] for name in names}
+        sizes = {name: np.zeros(len(keys), dtype=np.int64) for name in names}
+        shapes = {name: np.zeros((len(keys), 3), dtype=np.int64) for name in names}
+
+        def make(key):
+            image, label = load_sample(key)
+            previews = {}
+            image = to_uint8(to_plane(image, projection))
+            for level, array in pyramid_levels(
+                image, num_levels, thumbnail_size
+            ).items():
+                previews[f"image:{level}"] = array
+            if label is not None:
+                label = to_plane(label, projection).astype(np.uint16)
+                for level, array in pyramid_levels(
+                    label, num_levels, thumbnail_size, label=True
+                ).items():
+                    previews[f"label:{level}"] = array
+            return previews
+
+        for row, previews in enumerate(imap_ordered(make, keys, workers=workers)):
+            for name, array in previews.items():
+                parts[name].append(array.ravel())
+                sizes[name][row] = array.size
+                shapes[name][row, : array.ndim] = array.shape
+
+        tmp_dir = f"{cache_dir}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        offsets = {}
+        for name in names:
+            dtype = np.uint8 if name.startswith("image") else np.uint16
+            buffer = np.concatenate(parts[name]) if parts[name] else np.zeros(0)
+            np.save(os.path.join(tmp_dir, f"{name}.npy"), buffer.astype(dtype))
+            offsets[name] = np.concatenate([[0], np.cumsum(sizes[name])])
+        np.savez(
+            os.path.join(tmp_dir, "index.npz"),
+            format=PREVIEW_FORMAT_VERSION,
+            keys=np.array(keys, dtype=str),
+            names=np.array(names, dtype=str),
+            **{f"offsets:{n}": offsets[n] for n in names},
+            **{f"shapes:{n}": shapes[n] for n in names},
+        )
+
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        os.replace(tmp_dir, cache_dir)
+        return cls(cache_dir)
+
+
+def build_previews(
+    dataset,
+    levels=3,
+    thumbnail_size=128,
+    projection="mip",
+    workers=None,
+    refresh=False,
+):
+    """
+    Builds (or loads) the `PreviewCache` of a dataset variant: a pyramid of
+    downsampled images and labels per sample (each level halves the
+    resolution) plus a thumbnail, for browsing without decoding the
+    full-resolution files. 3D samples are reduced to one plane first.
+
+    The cache is keyed by the sample index version and the options, so it
+    is rebuilt only when the indexed files change.
+
+    :param dataset: A `BaseBBBCDataset` instance.
+    :param levels: Number of halved levels besides the thumbnail.
+    :param thumbnail_size: Maximum thumbnail side length in pixels.
+    :param projection: "mip" (maximum-intensity projection) or "middle"
+        (middle slice) for 3D samples.
+    :param workers: Number of decoding threads.
+    :param refresh: Rebuild even if a cached pyramid exists.
+    """
+    index = dataset.get_sample_index()
+    name = f"{index.version}_{projection}_{levels}_{thumbnail_size}"
+    cache_dir = os.path.join(dataset.get_cache_dir("previews"), name)
+    if os.path.exists(cache_dir) and not refresh:
+        return PreviewCache(cache_dir)
+
+    print(f"🖼️ Building previews of {dataset.KEY}...")
+    return PreviewCache.build(
+        cache_dir,
+        list(index.table["image_path"]),
+        lambda key: load_sample(dataset, os.path.join(dataset.local_path, key)),
+        num_levels=levels,
+        thumbnail_size=thumbnail_size,
+        projection=projection,
+        workers=workers,
+    )
+
+
+def get_preview(dataset, image_path, level=THUMBNAIL, kind="image", previews=None):
+    """
+    Returns a downsampled preview of a dataset sample. Images are uint8 scaled
+    for display, labels keep their values.
+
+    :param dataset: A `BaseBBBCDataset` instance.
+    :param image_path: The image path.
+    :param level: "thumbnail" or a pyramid level (1 is half resolution).
+    :param kind: "image" or "label".
+    :param previews: An open `PreviewCache` (default: the one built with the
+        default options by `build_previews`); pass it for repeated lookups.
+    :return: The 2D preview, or None if the sample has no label.
+    """
+    if previews is None:
+        previews = build_previews(dataset)
+    key = os.path.relpath(image_path, dataset.local_path)
+    return previews.get(key, level=level, kind=kind)
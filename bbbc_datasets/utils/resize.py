@@ -0,0 +1,195 @@
+import os
+import shutil
+
+import cv2
+import numpy as np
+
+from bbbc_datasets.utils.pack import PackReader, PackWriter, is_packed, load_sample
+from bbbc_datasets.utils.parallel import imap_ordered
+
+INTERPOLATIONS = {
+    "nearest": cv2.INTER_NEAREST,
+    "linear": cv2.INTER_LINEAR,
+    "cubic": cv2.INTER_CUBIC,
+    "area": cv2.INTER_AREA,
+}
+CV_DTYPES = (np.uint8, np.uint16, np.int16, np.float32, np.float64)
+CV_MAX_CHANNELS = 512  # Slices resized together as the channels of one cv2 call
+
+
+def target_shape(shape, size, spatial_dims):
+    """
+    Returns the resized spatial shape of an array.
+
+    :param shape: The array shape; the first `spatial_dims` axes are spatial.
+    :param size: One side length for all spatial axes (e.g. 512 or 256 for
+        256³), `(height, width)` (3D stacks keep their depth) or
+        `(depth, height, width)`.
+    :param spatial_dims: 2 for (Y, X[, C]) images, 3 for (Z, Y, X[, C]) stacks.
+    """
+    spatial = tuple(shape[:spatial_dims])
+    if np.isscalar(size):
+        return (int(size),) * spatial_dims
+    size = tuple(int(s) for s in size)
+    if len(size) == 2 and spatial_dims == 3:
+        return spatial[:1] + size
+    if len(size) != spatial_dims:
+        raise ValueError(f"Cannot resize shape {shape} to size {size}")
+    return size
+
+
+def _resize_nearest(array, shape):
+    # Pixel-centre sampling, exact for any dtype (e.g. int32 instance labels)
+    for axis, (n_in, n_out) in enumerate(zip(array.shape, shape)):
+        if n_in != n_out:
+            index = ((np.arange(n_out) + 0.5) * (n_in / n_out)).astype(np.intp)
+            array = np.take(array, np.minimum(index, n_in - 1), axis=axis)
+    return array
+
+
+def _resize_plane(array, height, width, interpolation):
+    """
+    Resizes the first two axes of a (Y, X, ...) array with cv2, passing
+    trailing axes as channels in chunks cv2 accepts.
+    """
+    if array.shape[:2] == (height, width):
+        return array
+    flat = array.reshape(array.shape[:2] + (-1,))
+    chunks = [
+        cv2.resize(
+            np.ascontiguousarray(flat[..., i : i + CV_MAX_CHANNELS]),
+            (width, height),
+            interpolation=interpolation,
+        ).reshape(height, width, -1)
+        for i in range(0, flat.shape[2], CV_MAX_CHANNELS)
+    ]
+    return np.concatenate(chunks, axis=2).reshape((height, width) + array.shape[2:])
+
+
+def resize_array(array, size, interpolation="linear", spatial_dims=2, label=False):
+    """
+    Resizes the spatial axes of an image or label to a fixed size.
+
+    Images are interpolated with cv2 in one call per axis pair (all slices of
+    a stack at once), keeping their dtype. Labels are always resized with
+    nearest-neighbour sampling, so instance ids are kept.
+
+    :param array: (Y, X[, C]) image or (Z, Y, X[, C]) stack.
+    :param size: Target size (see `target_shape`).
+    :param interpolation: One of `INTERPOLATIONS` for images.
+    :param spatial_dims: 2 or 3 (see `target_shape`).
+    :param label: Resize as a label (nearest neighbour).
+    """
+    if interpolation not in INTERPOLATIONS:
+        raise ValueError(
+            f"Invalid interpolation: {interpolation}. Choose from {list(INTERPOLATIONS)}"
+        )
+    array = np.asarray(array)
+    shape = target_shape(array.shape, size, spatial_dims)
+    if label or interpolation == "nearest":
+        return _resize_nearest(array, shape)
+
+    dtype = array.dtype
+    work = array if dtype in CV_DTYPES else array.astype(np.float64)
+    flag = INTERPOLATIONS[interpolation]
+    if spatial_dims == 2:
+        out = _resize_plane(work, shape[0], shape[1], flag)
+    else:
+        # In-plane with the slices as channels, then along Z over flat rows
+        planes = _resize_plane(np.moveaxis(work, 0, -1), shape[1], shape[2], flag)
+        rows = np.moveaxis(planes, -1, 0).reshape(array.shape[0], -1)
+        if array.shape[0] != shape[0]:
+            rows = cv2.resize(
+                np.ascontiguousarray(rows),
+                (rows.shape[1], shape[0]),
+                interpolation=flag,
+            )
+        out = rows.reshape(shape + array.shape[3:])
+
+    if out.dtype != dtype:
+        if np.issubdtype(dtype, np.integer):
+            info = np.iinfo(dtype)
+            out = np.clip(np.rint(out), info.min, info.max)
+        out = out.astype(dtype)
+    return out
+
+
+def _materialized_name(size, interpolation):
+    size = (size,) if np.isscalar(size) else tuple(size)
+    return f"{'x'.join(str(int(s)) for s in size)}_{interpolation}"
+
+
+def materialize_dataset(
+    dataset,
+    size,
+    interpolation="linear",
+    out_dir=None,
+    compression=None,
+    workers=None,
+    overwrite=False,
+):
+    """
+    Writes a resized copy of a dataset variant into packed storage, so
+    training at a fixed size does not resize every sample in every epoch.
+
+    Images are resized with `interpolation` and labels with nearest-neighbour
+    sampling (see `resize_array`), in parallel. The pack is keyed by the size
+    and interpolation, and rebuilt when the indexed source files change.
+
+    :param dataset: A `BaseBBBCDataset` instance.
+    :param size: Target size, e.g. 512 (512×512, or 512³ for 3D), `(512, 512)`
+        or `(64, 256, 256)` (see `target_shape`).
+    :param interpolation: Image interpolation, one of `INTERPOLATIONS`.
+    :param out_dir: Target directory (default: a "materialized" cache directory).
+    :param compression: None or "zlib" (see `PackWriter`).
+    :param workers: Number of decoding threads.
+    :param overwrite: Rebuild even if an up-to-date copy exists.
+    :return: A `PackReader` over the resized samples.
+    """
+    # Validate before decoding anything
+    target_shape((1, 1, 1), size, 3 if dataset.is_3d else 2)
+    if interpolation not in INTERPOLATIONS:
+        raise ValueError(
+            f"Invalid interpolation: {interpolation}. Choose from {list(INTERPOLATIONS)}"
+        )
+
+    if out_dir is None:
+        out_dir = os.path.join(
+            dataset.get_cache_dir("materialized"),
+            _materialized_name(size, interpolation),
+        )
+
+    version = dataset.get_sample_index().version
+    if is_packed(out_dir):
+        reader = PackReader(out_dir)
+        if reader.meta.get("source_version") == version and not overwrite:
+            return reader
+        shutil.rmtree(out_dir)
+
+    image_paths = dataset.get_image_paths()
+    if not image_paths:
+        raise RuntimeError(f"No images found for {dataset.KEY}")
+
+    def load_resized(image_path):
+        image, label = load_sample(dataset, image_path)
+        spatial_dims = 3 if dataset.is_3d and image.ndim >= 3 else 2
+        image = resize_array(image, size, interpolation, spatial_dims)
+        if label is not None:
+            label = resize_array(label, size, spatial_dims=spatial_dims, label=True)
+        return image, label
+
+    print(f"📐 Resizing {len(image_paths)} samples of {dataset.KEY} to {out_dir}...")
+    writer = PackWriter(out_dir, compression=compression)
+    samples = imap_ordered(load_resized, image_paths, workers=workers)
+    for image_path, (image, label) in zip(image_paths, samples):
+        writer.add(image_path, image=image, label=label)
+
+    writer.close(
+        dataset=type(dataset).__name__,
+        key=dataset.KEY,
+        is_3d=bool(dataset.is_3d),
+        size=list(np.atleast_1d(size).tolist()),
+        interpolation=interpolation,
+        source_version=version,
+    )
+    return PackReader(out_dir)
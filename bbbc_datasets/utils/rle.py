@@ -0,0 +1,275 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from bbbc_datasets.utils.parallel import imap_ordered
+from bbbc_datasets.utils.sample_index import image_key
+
+RLE_COLUMNS = ("ImageId", "EncodedPixels", "Height", "Width")
+RLE_FORMATS = ("csv", "parquet")
+
+
+def _runs(flat):
+    """
+    Returns the start, length and value of every run of equal non-zero
+    values in a flat array, from the positions where the value changes.
+    """
+    flat = np.asarray(flat)
+    changes = np.flatnonzero(flat[1:] != flat[:-1]) + 1
+    starts = np.concatenate([[0], changes])
+    lengths = np.diff(np.concatenate([starts, [flat.size]]))
+    values = flat[starts]
+    keep = values != 0
+    return starts[keep], lengths[keep], values[keep]
+
+
+def _format_runs(starts, lengths):
+    # Kaggle pixel numbers are 1-based
+    pairs = np.stack([starts + 1, lengths], axis=1).reshape(-1)
+    return " ".join(map(str, pairs.tolist()))
+
+
+def _parse_runs(rle):
+    """
+    Returns the 0-based starts and lengths of an RLE string (or None/NaN).
+    """
+    if not isinstance(rle, str) or not rle.strip():
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    pairs = np.array(rle.split(), dtype=np.int64)
+    if len(pairs) % 2:
+        raise ValueError("RLE strings need pairs of start and length.")
+    return pairs[0::2] - 1, pairs[1::2]
+
+
+def rle_encode(mask):
+    """
+    Encodes a binary mask as a run-length string in the Kaggle format:
+    1-based "start length" pairs over the pixels in column-major order
+    (top to bottom, then left to right).
+
+    :param mask: 2D mask; every non-zero pixel is foreground.
+    """
+    flat = np.asarray(mask).reshape(-1, order="F") != 0
+    starts, lengths, _ = _runs(flat)
+    return _format_runs(starts, lengths)
+
+
+def rle_encode_instances(label):
+    """
+    Encodes every instance of a label map as its own run-length string.
+
+    All runs are detected in one pass over the column-major pixels (where the
+    label value changes) and grouped by label, so the cost does not grow
+    with a loop over instances.
+
+    :param label: 2D instance label map (0 is background).
+    :return: Dict of label value -> RLE string, in increasing label order.
+    """
+    flat = np.asarray(label).reshape(-1, order="F")
+    starts, lengths, values = _runs(flat)
+    order = np.argsort(values, kind="stable")  # Runs stay in pixel order
+    starts, lengths, values = starts[order], lengths[order], values[order]
+
+    ids, first = np.unique(values, return_index=True)
+    bounds = np.append(first, len(values))
+    return {
+        ids[i].item(): _format_runs(
+            starts[bounds[i] : bounds[i + 1]], lengths[bounds[i] : bounds[i + 1]]
+        )
+        for i in range(len(ids))
+    }
+
+
+def rle_decode(rle, shape, value=1, dtype=np.uint8):
+    """
+    Decodes a Kaggle run-length string into a mask of the given `(height, width)`.
+    """
+    return rle_decode_instances([rle], shape, values=[value], dtype=dtype)
+
+
+def rle_decode_instances(rles, shape, values=None, dtype=None):
+    """
+    Decodes several run-length strings into one instance label map.
+
+    The runs of all strings are expanded into pixel indices at once
+    (`np.repeat` over the run lengths), without a loop over runs; where
+    instances overlap, the later one wins.
+
+    :param rles: RLE strings (missing values are empty instances).
+    :param shape: `(height, width)` of the label map.
+    :param values: Label value of every string (default: 1..N).
+    :param dtype: Label dtype (default: the smallest unsigned type for the values).
+    """
+    rles = list(rles)
+    if values is None:
+        values = np.arange(1, len(rles) + 1)
+    values = np.asarray(values)
+    if dtype is None:
+        high = int(values.max()) if len(values) else 0
+        dtype = np.uint8 if high <= 255 else np.uint16 if high <= 65535 else np.uint32
+
+    parsed = [_parse_runs(rle) for rle in rles]
+    starts = np.concatenate([p[0] for p in parsed] or [np.zeros(0, np.int64)])
+    lengths = np.concatenate([p[1] for p in parsed] or [np.zeros(0, np.int64)])
+    run_values = np.repeat(values, [len(p[0]) for p in parsed])
+
+    # Pixel index of every run pixel: run start plus the offset within the run
+    offsets = np.arange(lengths.sum()) - np.repeat(
+        np.cumsum(lengths) - lengths, lengths
+    )
+    pixels = np.repeat(starts, lengths) + offsets
+
+    size = int(np.prod(shape))
+    if len(pixels) and (pixels.min() < 0 or pixels.max() >= size):
+        raise ValueError(f"RLE runs exceed a mask of shape {tuple(shape)}")
+
+    flat = np.zeros(size, dtype=dtype)
+    flat[pixels] = np.repeat(run_values, lengths).astype(dtype)
+    return flat.reshape(tuple(shape), order="F")
+
+
+def encode_label_rows(image_id, label):
+    """
+    Returns the RLE rows of an instance label map (one row per instance, in the
+    columns of `RLE_COLUMNS`), or an empty table for a label without instances.
+    """
+    label = np.asarray(label)
+    if label.ndim != 2:
+        raise ValueError(f"RLE export needs 2D labels, got shape {label.shape}")
+    encoded = rle_encode_instances(label)
+    height, width = label.shape
+    return pd.DataFrame(
+        {
+            "ImageId": [image_id] * len(encoded),
+            "EncodedPixels": list(encoded.values()),
+            "Height": np.full(len(encoded), height, dtype=np.int64),
+            "Width": np.full(len(encoded), width, dtype=np.int64),
+        },
+        columns=list(RLE_COLUMNS),
+    )
+
+
+class _ParquetWriter:
+    def __init__(self, path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as exc:
+            raise ImportError("Parquet export needs the pyarrow package.") from exc
+
+        self._pa = pa
+        schema = pa.schema(
+            [
+                ("ImageId", pa.string()),
+                ("EncodedPixels", pa.string()),
+                ("Height", pa.int64()),
+                ("Width", pa.int64()),
+            ]
+        )
+        self._writer = pq.ParquetWriter(path, schema)
+        self._schema = schema
+
+    def write(self, table):
+        self._writer.write_table(
+            self._pa.Table.from_pandas(table, schema=self._schema, preserve_index=False)
+        )
+
+    def close(self):
+        self._writer.close()
+
+
+class _CsvWriter:
+    def __init__(self, path):
+        self._file = open(path, "w", newline="")
+        pd.DataFrame(columns=list(RLE_COLUMNS)).to_csv(self._file, index=False)
+
+    def write(self, table):
+        table.to_csv(self._file, header=False, index=False)
+
+    def close(self):
+        self._file.close()
+
+
+def export_rle(
+    dataset,
+    out_path,
+    image_paths=None,
+    file_format=None,
+    workers=None,
+    chunk_size=256,
+):
+    """
+    Streams the instance labels of a dataset variant into a run-length table
+    with the columns `RLE_COLUMNS` (the Kaggle `ImageId`/`EncodedPixels` format
+    plus the label size), one row per instance.
+
+    Labels (`dataset.get_label(path, kind="instance")`) are loaded and encoded
+    in parallel threads and appended in order in chunks, so memory use stays
+    bounded. Images without a label are skipped.
+
+    :param dataset: A `BaseBBBCDataset` instance.
+    :param out_path: The output `.csv` or `.parquet` file (written atomically).
+    :param image_paths: Images to export (default: all images of the dataset).
+    :param file_format: "csv" or "parquet" (default: from the file extension).
+    :param workers: Number of encoding threads.
+    :param chunk_size: Images per written chunk.
+    :return: The number of exported instances.
+    """
+    if file_format is None:
+        file_format = "parquet" if out_path.endswith(".parquet") else "csv"
+    if file_format not in RLE_FORMATS:
+        raise ValueError(f"Invalid format: {file_format}. Choose from {RLE_FORMATS}")
+    if image_paths is None:
+        image_paths = dataset.get_image_paths()
+
+    def encode(image_path):
+        try:
+            label = dataset.get_label(image_path, kind="instance")
+        except FileNotFoundError:
+            return None
+        if label is None:
+            return None
+        return encode_label_rows(image_key(image_path), label)
+
+    tmp_path = f"{out_path}.tmp"
+    writer = (_ParquetWriter if file_format == "parquet" else _CsvWriter)(tmp_path)
+    count = 0
+    try:
+        chunk = []
+        for rows in imap_ordered(encode, image_paths, workers=workers):
+            if rows is not None:
+                chunk.append(rows)
+            if len(chunk) >= chunk_size:
+                table = pd.concat(chunk, ignore_index=True)
+                writer.write(table)
+                count += len(table)
+                chunk = []
+        if chunk:
+            table = pd.concat(chunk, ignore_index=True)
+            writer.write(table)
+            count += len(table)
+    except BaseException:
+        writer.close()
+        os.remove(tmp_path)
+        raise
+    writer.close()
+
+    os.replace(tmp_path, out_path)
+    return count
+
+
+def read_rle(path):
+    """
+    Reads a run-length table (CSV or Parquet) as a dict of
+    `ImageId` -> list of RLE strings, one per instance.
+    """
+    if path.endswith(".parquet"):
+        table = pd.read_parquet(path)
+    else:
+        # Keys like "001" must not be parsed as numbers
+        table = pd.read_csv(path, dtype={"ImageId": str})
+    return {
+        image_id: list(group)
+        for image_id, group in table.groupby("ImageId")["EncodedPixels"]
+    }
@@ -0,0 +1,322 @@
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+from bbbc_datasets.utils.file_io import probe
+from bbbc_datasets.utils.parallel import imap_ordered
+
+INDEX_FORMAT_VERSION = 1
+SAMPLE_INDEX_FILE = "sample_index.npz"
+MAX_NDIM = 6
+QUERY_OPERATORS = ("eq", "ne", "lt", "le", "gt", "ge", "in", "contains")
+
+
+def save_table(table, path, **attrs):
+    """
+    Saves a DataFrame column by column to an `.npz` file.
+
+    String columns are stored as fixed-width unicode arrays, so reloading needs
+    no pickling and no parsing. Categorical columns are stored as codes and
+    categories. `attrs` are stored as additional scalars.
+    """
+    columns = {}
+    for name in table.columns:
+        if isinstance(table[name].dtype, pd.CategoricalDtype):
+            categories = table[name].cat.categories.to_numpy()
+            if categories.dtype == object:
+                categories = categories.astype(str)
+            columns[f"cat:{name}"] = categories
+            values = table[name].cat.codes.to_numpy()
+        else:
+            values = table[name].to_numpy()
+        if values.dtype == object:
+            values = values.astype(str)
+        columns[f"col:{name}"] = values
+    for name, value in attrs.items():
+        columns[f"attr:{name}"] = np.asarray(value)
+
+    tmp_path = f"{path}.tmp.npz"
+    np.savez(tmp_path, **columns)
+    os.replace(tmp_path, path)
+
+
+def load_table(path):
+    """
+    Loads a table written by `save_table` and returns `(table, attrs)`.
+    """
+    with np.load(path) as data:
+        columns = {
+            name[len("col:") :]: data[name]
+            for name in data.files
+            if name.startswith("col:")
+        }
+        for name in columns:
+            if f"cat:{name}" in data.files:
+                columns[name] = pd.Categorical.from_codes(
+                    columns[name], data[f"cat:{name}"]
+                )
+        attrs = {
+            name[len("attr:") :]: data[name].item()
+            for name in data.files
+            if name.startswith("attr:")
+        }
+    return pd.DataFrame(columns), attrs
+
+
+def index_version(root, image_paths):
+    """
+    Returns a short hash over the relative paths, sizes and modification times of the images.
+    """
+    digest = hashlib.sha1(str(INDEX_FORMAT_VERSION).encode())
+    for path in sorted(image_paths):
+        stat = os.stat(path)
+        digest.update(
+            f"{os.path.relpath(path, root)}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode()
+        )
+    return digest.hexdigest()[:16]
+
+
+def directory_stamp(image_paths):
+    """
+    Returns a short hash over the modification times of the image folders
+    (and their parents up to the common folder), a cheap check whether files
+    were added, removed or replaced since the index was built. Files rewritten
+    in place keep the modification time of their folder.
+    """
+    folders = {os.path.dirname(os.path.abspath(p)) for p in image_paths}
+    if not folders:
+        return ""
+    common = os.path.commonpath(list(folders))
+    for folder in list(folders):
+        while folder != common and len(folder) > len(common):
+            folder = os.path.dirname(folder)
+            folders.add(folder)
+
+    digest = hashlib.sha1()
+    for folder in sorted(folders):
+        try:
+            mtime = os.stat(folder).st_mtime_ns
+        except OSError:
+            mtime = -1
+        digest.update(f"{folder}\0{mtime}\n".encode())
+    return digest.hexdigest()[:16]
+
+
+def image_key(image_path):
+    """
+    Returns the key used to join per-image data: the file name without extension.
+    """
+    return os.path.splitext(os.path.basename(image_path))[0]
+
+
+def parse_fields(image_paths, pattern):
+    """
+    Extracts the named groups of a regular expression from the file names.
+
+    Groups that only hold numbers become integer (or float) columns; other
+    groups become string columns with "" where the pattern did not match.
+
+    :param image_paths: Image paths (only the file names are matched).
+    :param pattern: Regular expression (string or compiled) with named groups.
+    :return: A DataFrame with one column per named group.
+    """
+    names = pd.Series([os.path.basename(p) for p in image_paths], dtype=object)
+    fields = names.str.extract(pattern, expand=True)
+    for name in fields.columns:
+        column = fields[name]
+        numbers = pd.to_numeric(column, errors="coerce")
+        if column.notna().any() and (numbers.notna() == column.notna()).all():
+            if numbers.notna().all() and (numbers % 1 == 0).all():
+                numbers = numbers.astype(np.int64)
+            fields[name] = numbers
+        else:
+            fields[name] = column.fillna("").astype(str)
+    return fields
+
+
+def _probe_row(image_path):
+    try:
+        info = probe(image_path)
+    except Exception as exc:
+        print(f"Warning: Could not probe {image_path}: {exc}")
+        return (), "", 0, 0
+
+    return info.shape, info.dtype.str, info.channels, info.pages
+
+
+class SampleIndex:
+    """
+    Cached per-sample table of a dataset variant.
+
+    Holds one row per image with its relative path, join key and header-probed
+    shape information (`ndim`, `dim_0`.., `dtype`, `channels`, `pages`,
+    `height`, `width`, `depth`, `nbytes`). Later stages add their own columns
+    (e.g. fields parsed from file names and metadata), which `select` queries.
+
+    Args:
+        root (str): Directory the relative image paths are resolved against.
+        table (pd.DataFrame): The sample table.
+        version (str): Hash of the indexed files (see `index_version`).
+        stamp (str, optional): Hash of their folders (see `directory_stamp`).
+    """
+
+    def __init__(self, root, table, version, stamp=None):
+        self.root = root
+        self.table = table
+        self.version = version
+        self.stamp = stamp
+        self._sorted = {}  # Column -> (sorted values, row order)
+
+    def __len__(self):
+        return len(self.table)
+
+    def _sorted_column(self, name):
+        if name not in self._sorted:
+            if name not in self.table.columns:
+                raise KeyError(
+                    f"Unknown field: {name}. Available fields: {list(self.table.columns)}"
+                )
+            values = self.table[name].to_numpy()
+            order = np.argsort(values, kind="stable")
+            self._sorted[name] = (values[order], order)
+        return self._sorted[name]
+
+    def lookup(self, name, op, value):
+        """
+        Returns the boolean row mask of a condition `name <op> value`.
+
+        Equality, membership and range conditions are resolved by binary search
+        on a sorted copy of the column (built once per column).
+        """
+        if op not in QUERY_OPERATORS:
+            raise ValueError(f"Invalid operator: {op}. Choose from {QUERY_OPERATORS}")
+
+        values, order = self._sorted_column(name)
+        mask = np.zeros(len(values), dtype=bool)
+        if op == "ne":
+            mask[order] = values != value
+            return mask
+        if op == "contains":
+            mask[order] = [str(value) in str(v) for v in values]
+            return mask
+
+        n = len(values)
+        if op == "in":
+            bounds = [
+                (
+                    np.searchsorted(values, v, side="left"),
+                    np.searchsorted(values, v, side="right"),
+                )
+                for v in value
+            ]
+        else:
+            left = np.searchsorted(values, value, side="left")
+            right = np.searchsorted(values, value, side="right")
+            bounds = [
+                {
+                    "eq": (left, right),
+                    "lt": (0, left),
+                    "le": (0, right),
+                    "gt": (right, n),
+                    "ge": (left, n),
+                }[op]
+            ]
+        for start, stop in bounds:
+            mask[order[start:stop]] = True
+        return mask
+
+    def select(self, **query):
+        """
+        Returns the subset of samples matching all conditions as a new index.
+
+        Conditions are given as `field=value` or `field__op=value` with `op` one
+        of "eq", "ne", "lt", "le", "gt", "ge", "in" (a list of values) and
+        "contains" (substring), e.g. `select(blur=1, count__lt=20)`.
+        """
+        mask = np.ones(len(self), dtype=bool)
+        for condition, value in query.items():
+            name, _, op = condition.partition("__")
+            mask &= self.lookup(name, op or "eq", value)
+        table = self.table[mask].reset_index(drop=True)
+        return SampleIndex(self.root, table, self.version, self.stamp)
+
+    @property
+    def image_paths(self):
+        """
+        Absolute image paths in index order.
+        """
+        return [os.path.join(self.root, p) for p in self.table["image_path"]]
+
+    def shape(self, idx):
+        """
+        Returns the probed shape of sample `idx`.
+        """
+        row = self.table.iloc[idx]
+        return tuple(int(row[f"dim_{d}"]) for d in range(int(row["ndim"])))
+
+    def shapes(self):
+        """
+        Returns the probed shapes of all samples.
+        """
+        ndim = self.table["ndim"].to_numpy()
+        dims = np.stack(
+            [self.table[f"dim_{d}"].to_numpy() for d in range(MAX_NDIM)], axis=1
+        )
+        return [tuple(int(x) for x in row[:n]) for row, n in zip(dims, ndim)]
+
+    def save(self, path):
+        save_table(self.table, path, version=self.version, stamp=self.stamp or "")
+
+    @classmethod
+    def load(cls, root, path):
+        table, attrs = load_table(path)
+        return cls(root, table, attrs["version"], attrs.get("stamp") or None)
+
+    @classmethod
+    def build(cls, root, image_paths, workers=None):
+        """
+        Builds the index by probing the headers of all images in parallel.
+        """
+        image_paths = sorted(image_paths)
+        rows = list(imap_ordered(_probe_row, image_paths, workers=workers))
+
+        ndim = np.array([len(r[0]) for r in rows], dtype=np.int8)
+        dims = np.full((len(rows), MAX_NDIM), -1, dtype=np.int64)
+        height = np.zeros(len(rows), dtype=np.int64)
+        width = np.zeros(len(rows), dtype=np.int64)
+        depth = np.zeros(len(rows), dtype=np.int64)
+        nbytes = np.zeros(len(rows), dtype=np.int64)
+        for i, (shape, dtype, channels, _) in enumerate(rows):
+            if not shape:
+                continue
+            dims[i, : len(shape)] = shape[:MAX_NDIM]
+            spatial = shape[:-1] if channels > 1 and shape[-1] == channels else shape
+            height[i], width[i] = (
+                (spatial[-2], spatial[-1]) if len(spatial) > 1 else (1, spatial[0])
+            )
+            depth[i] = int(np.prod(spatial[:-2], dtype=np.int64))
+            nbytes[i] = int(np.prod(shape, dtype=np.int64)) * np.dtype(dtype).itemsize
+
+        table = pd.DataFrame(
+            {
+                "image_path": [os.path.relpath(p, root) for p in image_paths],
+                "key": [image_key(p) for p in image_paths],
+                "ndim": ndim,
+                **{f"dim_{d}": dims[:, d] for d in range(MAX_NDIM)},
+                "dtype": [r[1] for r in rows],
+                "channels": np.array([r[2] for r in rows], dtype=np.int32),
+                "pages": np.array([r[3] for r in rows], dtype=np.int32),
+                "height": height,
+                "width": width,
+                "depth": depth,
+                "nbytes": nbytes,
+            }
+        )
+        return cls(
+            root,
+            table,
+            index_version(root, image_paths),
+            directory_stamp(image_paths),
+        )
@@ -0,0 +1,258 @@
+import os
+import re
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from torch.utils.data import Dataset
+
+from bbbc_datasets.utils.file_io import load_image, probe
+from bbbc_datasets.utils.normalization import DEFAULT_PERCENTILES
+from bbbc_datasets.utils.tensors import image_to_tensor, label_to_tensor
+
+
+def natural_key(path):
+    """
+    Sort key that orders embedded numbers numerically ("t2" before "t10").
+    """
+    return [
+        int(part) if part.isdigit() else part.lower()
+        for part in re.split(r"(\d+)", path)
+    ]
+
+
+def group_sequences(image_paths):
+    """
+    Groups frame files into sequences by their parent directory.
+
+    :return: Dict mapping the directory to its naturally sorted frame paths.
+    """
+    sequences = {}
+    for path in image_paths:
+        sequences.setdefault(os.path.dirname(path), []).append(path)
+    return {
+        directory: sorted(frames, key=natural_key)
+        for directory, frames in sorted(
+            sequences.items(), key=lambda i: natural_key(i[0])
+        )
+    }
+
+
+class LazySequence:
+    """
+    A time-lapse sequence of frame files, indexable like a (T, Z, Y, X) array.
+
+    Nothing is decoded up front: shape and dtype come from the first frame's
+    header. Reading a window of frames also queues the next `read_ahead`
+    frames on a background thread, and frames outside the current window and
+    its read-ahead are dropped, so only those are resident.
+
+    The read-ahead thread pool is shut down by `close()` (or on leaving a
+    `with` block), and otherwise once the sequence is garbage collected.
+
+    Args:
+        frame_paths (list): Frame files in time order.
+        read_ahead (int): Number of frames decoded ahead of the current window.
+    """
+
+    def __init__(self, frame_paths, read_ahead=2):
+        if not frame_paths:
+            raise ValueError("A sequence needs at least one frame.")
+
+        self.frame_paths = list(frame_paths)
+        self.read_ahead = read_ahead
+        info = probe(self.frame_paths[0])
+        self.frame_shape = info.shape
+        self.dtype = info.dtype
+
+        self._executor = None
+        self._finalizer = None
+        self._frames = OrderedDict()  # Frame number -> Future
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_executor"] = None
+        state["_finalizer"] = None
+        state["_frames"] = OrderedDict()
+        return state
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return len(self.frame_paths)
+
+    @property
+    def shape(self):
+        return (len(self),) + tuple(self.frame_shape)
+
+    @property
+    def ndim(self):
+        return len(self.shape)
+
+    @property
+    def resident_frames(self):
+        """
+        Frame numbers that are currently loaded or being loaded.
+        """
+        return list(self._frames)
+
+    def _request(self, t):
+        if t not in self._frames:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=max(self.read_ahead, 1))
+                # Must not reference self, or the sequence would never be collected
+                self._finalizer = weakref.finalize(
+                    self, self._executor.shutdown, wait=False
+                )
+            self._frames[t] = self._executor.submit(load_image, self.frame_paths[t])
+        return self._frames[t]
+
+    def window(self, start, size):
+        """
+        Returns frames `start` to `start + size` as one (T, ...) array and
+        starts reading the following frames in the background.
+        """
+        stop = min(start + size, len(self))
+        if start < 0 or start >= stop:
+            raise IndexError(
+                f"Window {start}:{start + size} out of range for {len(self)} frames"
+            )
+
+        keep = range(start, min(stop + self.read_ahead, len(self)))
+        for t in list(self._frames):
+            if t not in keep:
+                self._frames.pop(t).cancel()
+
+        futures = [self._request(t) for t in range(start, stop)]
+        for t in range(stop, keep.stop):
+            self._request(t)
+
+        out = np.empty((stop - start,) + tuple(self.frame_shape), dtype=self.dtype)
+        for i, future in enumerate(futures):
+            out[i] = future.result()
+        return out
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            frames = self[key[0]]
+            if isinstance(key[0], slice):
+                return frames[(slice(None),) + key[1:]]
+            return frames[key[1:]]
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step != 1:
+                return np.stack([self[t] for t in range(start, stop, step)])
+            return self.window(start, stop - start)
+        t = int(key) + len(self) if int(key) < 0 else int(key)
+        return self.window(t, 1)[0]
+
+    def close(self):
+        """
+        Stops the background reads and drops all resident frames.
+        """
+        for future in self._frames.values():
+            future.cancel()
+        self._frames.clear()
+        if self._executor is not None:
+            self._finalizer.detach()
+            self._executor.shutdown(wait=True)
+            self._executor = None
+            self._finalizer = None
+
+
+class SlidingWindowDataset(Dataset):
+    """
+    PyTorch dataset of fixed-length sliding windows over time-lapse sequences,
+    e.g. for tracking models.
+
+    Returns `(image, label)` with the image window as a (1, T, Z, Y, X) tensor
+    and the stacked labels of its frames (None unless every frame has one).
+    Windows are numbered sequence by sequence in time order, so iterating in
+    order reuses each sequence's read-ahead.
+
+    Closing the dataset (or leaving a `with` block) closes all its sequences.
+
+    Args:
+        sequences (dict): Sequence name -> `LazySequence`.
+        window (int): Frames per window.
+        stride (int): Offset between consecutive windows.
+        get_label (callable, optional): Returns the label of a frame path (or
+            raises FileNotFoundError).
+        normalize (str, optional): Normalization mode of every window (see `BBBCDataset`).
+        percentile_range (tuple): Percentiles used by the "percentile" mode.
+        stats (dict, optional): Dataset statistics used by the "dataset" mode.
+    """
+
+    def __init__(
+        self,
+        sequences,
+        window=3,
+        stride=1,
+        get_label=None,
+        normalize="minmax",
+        percentile_range=DEFAULT_PERCENTILES,
+        stats=None,
+    ):
+        self.names = list(sequences)
+        self.sequences = [sequences[name] for name in self.names]
+        self.window = window
+        self.get_label = get_label
+        self.normalize = normalize
+        self.percentile_range = percentile_range
+        self.stats = stats
+
+        windows = [
+            (i, start)
+            for i, sequence in enumerate(self.sequences)
+            for start in range(0, len(sequence) - window + 1, stride)
+        ]
+        self.windows = np.array(windows, dtype=np.int64).reshape(-1, 2)
+
+    def __len__(self):
+        return len(self.windows)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """
+        Stops the background reads of all sequences.
+        """
+        for sequence in self.sequences:
+            sequence.close()
+
+    def load_labels(self, sequence, start):
+        if self.get_label is None:
+            return None
+
+        labels = []
+        for path in sequence.frame_paths[start : start + self.window]:
+            try:
+                label = self.get_label(path)
+            except FileNotFoundError:
+                return None
+            if label is None:
+                return None
+            labels.append(np.asarray(label))
+        return np.stack(labels)
+
+    def __getitem__(self, idx):
+        seq_idx, start = (int(v) for v in self.windows[idx])
+        sequence = self.sequences[seq_idx]
+
+        image = image_to_tensor(
+            sequence.window(start, self.window),
+            self.normalize,
+            self.percentile_range,
+            self.stats,
+        )
+        label = label_to_tensor(self.load_labels(sequence, start))
+        return image, label
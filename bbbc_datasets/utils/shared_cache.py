@@ -0,0 +1,156 @@
+import os
+import shutil
+import tempfile
+import weakref
+
+import numpy as np
+
+from bbbc_datasets.utils.pack import ALIGNMENT
+
+SHARED_MEMORY_DIR = "/dev/shm"
+DEFAULT_BUDGET_FRACTION = 0.5  # Of the free space in the cache directory
+
+
+def _remove_if_owner(path, owner_pid):
+    # Forked DataLoader workers inherit the finalizer; only the creator removes the file
+    if os.getpid() == owner_pid and os.path.exists(path):
+        os.remove(path)
+
+
+class SharedSampleCache:
+    """
+    Decoded-sample cache shared by the main process and all DataLoader workers.
+
+    The cache is a single file-backed arena (in `/dev/shm` where available, so
+    it lives in RAM) laid out up front from the probed sample shapes and dtypes:
+    a ready flag per sample followed by one aligned slot per cached sample.
+    Whichever process loads a sample first writes it into its slot and sets the
+    flag; every later access, from any process, is a zero-copy view of the
+    slot. Only the file path and offset table are pickled into workers, so the
+    data is held in memory once, not once per worker.
+
+    Samples are assigned slots in order until `max_bytes` is used up; samples
+    beyond the budget are simply not cached.
+
+    Args:
+        shapes (list): Probed shape of every sample.
+        dtypes (list): Probed dtype of every sample.
+        max_bytes (int, optional): Global byte budget (default: half of the free
+            space in the cache directory).
+        directory (str, optional): Directory of the arena file (default: `/dev/shm`
+            if it exists, else the system temp directory).
+    """
+
+    def __init__(self, shapes, dtypes, max_bytes=None, directory=None):
+        if directory is None:
+            directory = (
+                SHARED_MEMORY_DIR
+                if os.path.isdir(SHARED_MEMORY_DIR)
+                else tempfile.gettempdir()
+            )
+        if max_bytes is None:
+            max_bytes = int(shutil.disk_usage(directory).free * DEFAULT_BUDGET_FRACTION)
+
+        self.shapes = [tuple(int(d) for d in shape) for shape in shapes]
+        self.dtypes = [np.dtype(dtype) for dtype in dtypes]
+        self.max_bytes = max_bytes
+
+        # Flags first, then the slots of all samples that fit into the budget
+        num_samples = len(self.shapes)
+        self.offsets = np.full(num_samples, -1, dtype=np.int64)
+        end = num_samples + (-num_samples % ALIGNMENT)
+        used = 0
+        for i, (shape, dtype) in enumerate(zip(self.shapes, self.dtypes)):
+            nbytes = int(np.prod(shape, dtype=np.int64)) * dtype.itemsize
+            if not shape or used + nbytes > max_bytes:
+                continue
+            self.offsets[i] = end
+            end += nbytes + (-nbytes % ALIGNMENT)
+            used += nbytes
+        self.nbytes = used
+
+        fd, self.path = tempfile.mkstemp(
+            prefix="bbbc_cache_", suffix=".bin", dir=directory
+        )
+        os.ftruncate(fd, max(end, 1))  # Sparse: pages are only allocated when filled
+        os.close(fd)
+        self._finalizer = weakref.finalize(
+            self, _remove_if_owner, self.path, os.getpid()
+        )
+        self._map = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_map"] = None
+        state["_finalizer"] = None
+        return state
+
+    def __len__(self):
+        return len(self.shapes)
+
+    def _get_map(self):
+        if self._map is None:
+            self._map = np.memmap(self.path, dtype=np.uint8, mode="r+")
+        return self._map
+
+    def is_cached(self, idx):
+        return self.offsets[idx] >= 0
+
+    def is_ready(self, idx):
+        return self.is_cached(idx) and bool(self._get_map()[idx])
+
+    def num_ready(self):
+        """
+        Returns the number of samples that have been filled so far.
+        """
+        return int(np.count_nonzero(self._get_map()[: len(self)]))
+
+    def _view(self, idx):
+        shape, dtype = self.shapes[idx], self.dtypes[idx]
+        offset = int(self.offsets[idx])
+        nbytes = int(np.prod(shape, dtype=np.int64)) * dtype.itemsize
+        return self._get_map()[offset : offset + nbytes].view(dtype).reshape(shape)
+
+    def get(self, idx):
+        """
+        Returns a read-only view of sample `idx`, or None if it is not (yet) cached.
+        """
+        if not self.is_ready(idx):
+            return None
+        view = self._view(idx)
+        view.flags.writeable = False
+        return view
+
+    def put(self, idx, array):
+        """
+        Stores sample `idx` if it has a slot and matches its probed shape and dtype.
+        Returns the cached view, or the input array if it was not stored.
+        """
+        array = np.asarray(array)
+        if (
+            not self.is_cached(idx)
+            or array.shape != self.shapes[idx]
+            or array.dtype.newbyteorder("=") != self.dtypes[idx].newbyteorder("=")
+        ):
+            return array
+
+        self._view(idx)[...] = array
+        self._get_map()[idx] = 1  # Flag is set only after the data is complete
+        return self.get(idx)
+
+    def get_or_load(self, idx, loader):
+        """
+        Returns sample `idx` from the cache, loading and storing it with `loader()` first if needed.
+        """
+        cached = self.get(idx)
+        if cached is not None:
+            return cached
+        return self.put(idx, loader())
+
+    def close(self):
+        """
+        Releases the memory map and, in the creating process, removes the arena file.
+        """
+        self._map = None
+        if self._finalizer is not None:
+            self._finalizer()
@@ -0,0 +1,301 @@
+import json
+import os
+from collections import Counter
+
+import numpy as np
+
+from bbbc_datasets.utils.file_io import load_image
+from bbbc_datasets.utils.normalization import histogram_percentiles, integer_histogram
+from bbbc_datasets.utils.parallel import imap_ordered
+
+STATISTICS_FORMAT_VERSION = 1
+DEFAULT_FLOAT_BINS = 4096
+
+
+class RunningMoments:
+    """
+    Mergeable count/mean/variance/min/max accumulator (Welford, with Chan et al.'s
+    pairwise merge), so partial results from parallel workers combine exactly.
+    """
+
+    def __init__(self, count=0, mean=0.0, m2=0.0, minimum=np.inf, maximum=-np.inf):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+        self.min = minimum
+        self.max = maximum
+
+    @classmethod
+    def from_array(cls, arr):
+        if not arr.size:
+            return cls()
+        mean = float(arr.mean(dtype=np.float64))
+        m2 = float(arr.var(dtype=np.float64)) * arr.size
+        return cls(arr.size, mean, m2, float(arr.min()), float(arr.max()))
+
+    @classmethod
+    def from_histogram(cls, counts, values=None):
+        """
+        Exact moments of integer data from its unit-bin histogram, without
+        touching (or allocating temporaries for) the pixels themselves.
+        """
+        values = np.arange(len(counts), dtype=np.float64) if values is None else values
+        count = counts.sum()
+        if not count:
+            return cls()
+        nonzero = np.flatnonzero(counts)
+        mean = float(np.dot(counts, values) / count)
+        m2 = float(np.dot(counts, (values - mean) ** 2))
+        return cls(
+            int(count), mean, m2, float(values[nonzero[0]]), float(values[nonzero[-1]])
+        )
+
+    def merge(self, other):
+        if not other.count:
+            return self
+        if not self.count:
+            self.__dict__.update(other.__dict__)
+            return self
+
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta**2 * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def variance(self):
+        return self.m2 / self.count if self.count else float("nan")
+
+    @property
+    def std(self):
+        return float(np.sqrt(self.variance))
+
+
+class Histogram:
+    """
+    Mergeable fixed-bin histogram.
+
+    8/16-bit unsigned data uses one bin per value (exact percentiles);
+    other data uses `bins` equal-width bins over a known `value_range`.
+    """
+
+    def __init__(self, bins, value_range=None):
+        self.bins = bins
+        self.value_range = value_range
+        self.counts = np.zeros(bins, dtype=np.float64)
+
+    @property
+    def values(self):
+        """
+        Value represented by every bin (the lower bin edge).
+        """
+        if self.value_range is None:
+            return np.arange(self.bins, dtype=np.float64)
+        lo, hi = self.value_range
+        return lo + (hi - lo) * np.arange(self.bins, dtype=np.float64) / self.bins
+
+    def update(self, arr):
+        if self.value_range is None:
+            self.counts += integer_histogram(arr, self.bins)
+        else:
+            counts, _ = np.histogram(arr, bins=self.bins, range=self.value_range)
+            self.counts += counts
+        return self
+
+    def merge(self, other):
+        self.counts += other.counts
+        return self
+
+    def percentiles(self, q):
+        return histogram_percentiles(self.counts, q, self.values)
+
+
+class DatasetStatistics:
+    """
+    Dataset-level intensity, object count and shape statistics.
+
+    Attributes:
+        version (str): Sample index version the statistics were computed for.
+        moments (RunningMoments): Intensity count/mean/std/min/max over all pixels.
+        histogram (Histogram): Intensity histogram over all pixels.
+        object_counts (np.ndarray): Number of distinct non-zero label values per
+            image (-1 where no label is available).
+        shape_counts (dict): Number of images per shape.
+    """
+
+    def __init__(self, version, moments, histogram, object_counts, shape_counts):
+        self.version = version
+        self.moments = moments
+        self.histogram = histogram
+        self.object_counts = object_counts
+        self.shape_counts = shape_counts
+
+    @property
+    def mean(self):
+        return self.moments.mean
+
+    @property
+    def std(self):
+        return self.moments.std
+
+    def percentiles(self, q):
+        return self.histogram.percentiles(q)
+
+    def normalization_stats(self, percentile_range=None):
+        """
+        Returns stats for `normalize_image(..., mode="dataset")`: mean/std, or the
+        dataset-level `percentile_range` as low/high if given.
+        """
+        if percentile_range is None:
+            return {"mean": self.mean, "std": self.std}
+        low, high = self.percentiles(percentile_range)
+        return {"low": low, "high": high}
+
+    def summary(self):
+        labelled = self.object_counts[self.object_counts >= 0]
+        return {
+            "num_images": len(self.object_counts),
+            "mean": self.mean,
+            "std": self.std,
+            "min": self.moments.min,
+            "max": self.moments.max,
+            "percentiles": dict(
+                zip(("p1", "p50", "p99"), self.percentiles((1, 50, 99)))
+            ),
+            "objects_per_image": float(labelled.mean()) if labelled.size else None,
+            "shapes": {"x".join(map(str, k)): v for k, v in self.shape_counts.items()},
+        }
+
+    def save(self, path):
+        moments = self.moments
+        meta = {
+            "format": STATISTICS_FORMAT_VERSION,
+            "version": self.version,
+            "moments": [
+                moments.count,
+                moments.mean,
+                moments.m2,
+                moments.min,
+                moments.max,
+            ],
+            "value_range": self.histogram.value_range,
+            "shape_counts": [[list(k), v] for k, v in self.shape_counts.items()],
+        }
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(
+            tmp_path,
+            meta=json.dumps(meta),
+            counts=self.histogram.counts,
+            object_counts=self.object_counts,
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            meta = json.loads(data["meta"].item())
+            counts = data["counts"]
+            object_counts = data["object_counts"]
+
+        histogram = Histogram(len(counts), meta["value_range"])
+        histogram.counts = counts
+        shape_counts = {tuple(k): v for k, v in meta["shape_counts"]}
+        return cls(
+            meta["version"],
+            RunningMoments(*meta["moments"]),
+            histogram,
+            object_counts,
+            shape_counts,
+        )
+
+
+def count_objects(label):
+    """
+    Returns the number of distinct non-zero values of a label mask.
+    """
+    label = np.asarray(label)
+    if label.dtype.kind in "ub" and label.size:
+        return int(np.count_nonzero(np.bincount(label.reshape(-1).astype(np.intp))[1:]))
+    values = np.unique(label)
+    return int(np.count_nonzero(values))
+
+
+def _image_statistics(dataset, image_path, histogram_bins, value_range, labels):
+    img = load_image(image_path)
+
+    if value_range is None:
+        histogram = Histogram(histogram_bins).update(img)
+        moments = RunningMoments.from_histogram(histogram.counts)
+    else:
+        histogram = Histogram(histogram_bins, value_range).update(img)
+        moments = RunningMoments.from_array(img)
+
+    objects = -1
+    if labels:
+        try:
+            label = dataset.get_label(image_path)
+        except FileNotFoundError:
+            label = None
+        if label is not None:
+            objects = count_objects(label)
+
+    return moments, histogram, objects
+
+
+def compute_statistics(dataset, labels=True, workers=None, bins=DEFAULT_FLOAT_BINS):
+    """
+    Streams once over a dataset variant and returns its `DatasetStatistics`.
+
+    Images are decoded in parallel and reduced to per-image accumulators, which
+    are merged in order, so memory use stays bounded. 8/16-bit unsigned data is
+    summarized exactly from unit-bin histograms in a single pass; other dtypes
+    need a first pass over the moments to fix the histogram range.
+
+    :param dataset: A `BaseBBBCDataset` instance.
+    :param labels: Also count the objects in every label mask.
+    :param workers: Number of decoding threads.
+    :param bins: Histogram bins for data that is not 8/16-bit unsigned.
+    """
+    index = dataset.get_sample_index()
+    image_paths = index.image_paths
+    dtypes = set(index.table["dtype"])
+    exact = dtypes <= {np.dtype(np.uint8).str, np.dtype(np.uint16).str}
+
+    if exact:
+        histogram_bins = 256 if dtypes == {np.dtype(np.uint8).str} else 65536
+        value_range = None
+    else:
+        pass_moments = RunningMoments()
+        for moments in imap_ordered(
+            lambda path: RunningMoments.from_array(load_image(path)),
+            image_paths,
+            workers=workers,
+        ):
+            pass_moments.merge(moments)
+        histogram_bins = bins
+        value_range = (pass_moments.min, np.nextafter(pass_moments.max, np.inf))
+
+    total_moments = RunningMoments()
+    total_histogram = Histogram(histogram_bins, value_range)
+    object_counts = np.full(len(image_paths), -1, dtype=np.int64)
+
+    partials = imap_ordered(
+        lambda path: _image_statistics(
+            dataset, path, histogram_bins, value_range, labels
+        ),
+        image_paths,
+        workers=workers,
+    )
+    for i, (moments, histogram, objects) in enumerate(partials):
+        total_moments.merge(moments)
+        total_histogram.merge(histogram)
+        object_counts[i] = objects
+
+    shape_counts = dict(Counter(index.shapes()))
+    return DatasetStatistics(
+        index.version, total_moments, total_histogram, object_counts, shape_counts
+    )
@@ -0,0 +1,291 @@
+import numpy as np
+import torch.distributed as dist
+from torch.utils.data import DataLoader, IterableDataset, get_worker_info
+
+from bbbc_datasets.utils.normalization import DEFAULT_PERCENTILES
+from bbbc_datasets.utils.pack import DEFAULT_SHARD_SIZE, PackReader
+from bbbc_datasets.utils.tensors import image_to_tensor, label_to_tensor
+
+SHARDS_PER_CONSUMER = 4
+
+
+def resolve_rank(rank=None, world_size=None):
+    """
+    Returns `(rank, world_size)`, defaulting to torch.distributed (or a single rank).
+    """
+    distributed = dist.is_available() and dist.is_initialized()
+    if rank is None:
+        rank = dist.get_rank() if distributed else 0
+    if world_size is None:
+        world_size = dist.get_world_size() if distributed else 1
+    return rank, world_size
+
+
+def stream_shard_size(
+    total_nbytes, num_consumers, shards_per_consumer=SHARDS_PER_CONSUMER
+):
+    """
+    Returns a shard size that splits `total_nbytes` into at least
+    `shards_per_consumer` shards per consumer (rank x DataLoader worker), so
+    shard shuffling and partitioning have whole shards to distribute. Capped
+    at the default shard size.
+    """
+    num_shards = max(int(num_consumers), 1) * shards_per_consumer
+    return int(min(DEFAULT_SHARD_SIZE, max(int(total_nbytes) // num_shards, 1)))
+
+
+def shuffle_buffer_order(items, buffer_size, rng):
+    """
+    Returns the order in which a bounded shuffle buffer emits `items`: the
+    buffer is filled in input order and a random buffered item is emitted
+    whenever it is full, so reading never runs more than `buffer_size` items
+    ahead of the emitted ones.
+    """
+    if buffer_size <= 1:
+        return list(items)
+
+    buffer, order = [], []
+    for item in items:
+        buffer.append(item)
+        if len(buffer) >= buffer_size:
+            j = int(rng.integers(len(buffer)))
+            buffer[j], buffer[-1] = buffer[-1], buffer[j]
+            order.append(buffer.pop())
+    rng.shuffle(buffer)
+    order.extend(buffer)
+    return order
+
+
+class PackStreamDataset(IterableDataset):
+    """
+    Streaming dataset over a pack (see `bbbc_datasets.utils.pack`).
+
+    - Every consumer (rank x DataLoader worker) reads a contiguous block of
+      samples in shard and offset order, so the shards are read sequentially
+      in large requests instead of one small file per sample.
+    - The partition is deterministic: shards are shuffled with the seed and
+      epoch (identical on all ranks), then split into near-equal blocks.
+    - Samples are shuffled through a bounded buffer of `shuffle_buffer` samples.
+    - Iteration can resume mid-epoch: the emission order is a function of the
+      seed, epoch and partition only, so skipped samples are not read at all.
+      `StreamLoader` tracks the cursor for a DataLoader.
+
+    Args:
+        pack_dir (str or PackReader): The pack to stream.
+        shuffle_buffer (int): Size of the shuffle buffer (1 = no shuffling).
+        seed (int): Seed of the shard and buffer shuffling.
+        rank (int, optional): Rank of this process (default: torch.distributed rank or 0).
+        world_size (int, optional): Number of ranks (default: torch.distributed world size or 1).
+        transform (callable, optional): Optional transform to apply to images.
+        target_transform (callable, optional): Optional transform for labels.
+        normalize (str, optional): Normalization mode (see `BBBCDataset`).
+        percentile_range (tuple): Percentiles used by the "percentile" mode.
+        stats (dict, optional): Dataset statistics used by the "dataset" mode.
+    """
+
+    def __init__(
+        self,
+        pack_dir,
+        shuffle_buffer=1000,
+        seed=0,
+        rank=None,
+        world_size=None,
+        transform=None,
+        target_transform=None,
+        normalize="minmax",
+        percentile_range=DEFAULT_PERCENTILES,
+        stats=None,
+    ):
+        self.reader = (
+            pack_dir if isinstance(pack_dir, PackReader) else PackReader(pack_dir)
+        )
+        rank, world_size = resolve_rank(rank, world_size)
+
+        self.shuffle_buffer = shuffle_buffer
+        self.seed = seed
+        self.rank = rank
+        self.world_size = world_size
+        self.transform = transform
+        self.target_transform = target_transform
+        self.normalize = normalize
+        self.percentile_range = percentile_range
+        self.stats = stats
+
+        self.epoch = 0
+        self.skip = {}  # Samples already consumed per worker of this rank
+        self.worker_shift = 0  # Worker that continues first after resuming
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+
+    def state_dict(self):
+        return {
+            "epoch": self.epoch,
+            "seed": self.seed,
+            "skip": dict(self.skip),
+            "worker_shift": self.worker_shift,
+        }
+
+    def load_state_dict(self, state):
+        """
+        Restores a cursor: the epoch and the number of samples every worker of
+        this rank had already emitted.
+        """
+        self.epoch = state["epoch"]
+        self.seed = state.get("seed", self.seed)
+        self.skip = {int(k): int(v) for k, v in state.get("skip", {}).items()}
+        self.worker_shift = state.get("worker_shift", 0)
+
+    def partition(self, consumer, num_consumers):
+        """
+        Returns the sample indices of one consumer in sequential read order.
+        """
+        index = self.reader.index
+        shards = index["image_shard"]
+        rng = np.random.default_rng((self.seed, self.epoch))
+        shard_rank = np.argsort(rng.permutation(int(shards.max()) + 1))
+        order = np.lexsort((index["image_offset"], shard_rank[shards]))
+        return np.array_split(order, num_consumers)[consumer]
+
+    def sample_order(self, worker_id=0, num_workers=1):
+        """
+        Returns `(read_order, emission_order)` of the samples of one worker of this rank.
+        """
+        consumer = self.rank * num_workers + worker_id
+        indices = self.partition(consumer, self.world_size * num_workers).tolist()
+        rng = np.random.default_rng((self.seed, self.epoch, consumer))
+        return indices, shuffle_buffer_order(indices, self.shuffle_buffer, rng)
+
+    def __iter__(self):
+        worker = get_worker_info()
+        worker_id, num_workers = (
+            (0, 1) if worker is None else (worker.id, worker.num_workers)
+        )
+
+        # DataLoader workers take turns from worker 0; after resuming mid-epoch
+        # worker 0 continues the block of the worker whose turn it was
+        worker_id = (worker_id + self.worker_shift) % num_workers
+
+        read_order, order = self.sample_order(worker_id, num_workers)
+        # Resolved now, not on the first `next`, so the cursor can be reset right after
+        skip = self.skip.get(worker_id, 0)
+
+        # The cursor only applies to the resumed pass; persistent DataLoader
+        # workers keep their own copy of the dataset, so it is cleared here too
+        self.skip = {}
+        self.worker_shift = 0
+        return self._iter_samples(read_order, order, skip)
+
+    def _iter_samples(self, read_order, order, skip):
+        # Read sequentially and hold each sample only until it is emitted
+        # (at most `shuffle_buffer` samples); samples before the cursor are never read
+        remaining = set(order[skip:])
+        reads = (idx for idx in read_order if idx in remaining)
+        pending = {}
+        for idx in order[skip:]:
+            while idx not in pending:
+                read_idx = next(reads)
+                pending[read_idx] = self.load_sample(read_idx)
+            yield pending.pop(idx)
+
+    def load_sample(self, idx):
+        image = image_to_tensor(
+            self.reader.get_image(idx),
+            self.normalize,
+            self.percentile_range,
+            self.stats,
+        )
+        label = label_to_tensor(self.reader.get_label(idx))
+
+        if self.transform:
+            image = self.transform(image)
+        if self.target_transform and label is not None:
+            label = self.target_transform(label)
+
+        return image, label
+
+
+class StreamLoader(DataLoader):
+    """
+    DataLoader for a `PackStreamDataset` that tracks how many batches were
+    consumed in the current epoch, so training can resume mid-epoch.
+
+    The DataLoader takes batches from its workers in round-robin order, so the
+    number of consumed batches determines how many samples every worker has
+    already emitted. Call `set_epoch` before every epoch.
+    """
+
+    def __init__(self, dataset, batch_size=1, **kwargs):
+        super().__init__(dataset, batch_size=batch_size, **kwargs)
+        self.batches = 0
+
+    def set_epoch(self, epoch):
+        self.dataset.set_epoch(epoch)
+        self.batches = 0
+
+    def __iter__(self):
+        iterator = super().__iter__()
+        # Workers (or the in-process iterator) already captured the cursor
+        self.dataset.skip = {}
+        self.dataset.worker_shift = 0
+        return self._count(iterator)
+
+    def _count(self, iterator):
+        for batch in iterator:
+            self.batches += 1
+            yield batch
+
+    def state_dict(self):
+        return {"epoch": self.dataset.epoch, "batches": self.batches}
+
+    def load_state_dict(self, state):
+        num_workers = max(self.num_workers, 1)
+        batches = state["batches"]
+        skip = {
+            worker_id: len(range(worker_id, batches, num_workers)) * self.batch_size
+            for worker_id in range(num_workers)
+        }
+        self.dataset.load_state_dict(
+            {
+                "epoch": state["epoch"],
+                "skip": skip,
+                "worker_shift": batches % num_workers,
+            }
+        )
+        self.batches = batches
+
+
+def stream_dataset(dataset, num_workers=1, pack_kwargs=None, stream_kwargs=None):
+    """
+    Packs a dataset variant (if needed) and returns a `PackStreamDataset` over it.
+
+    Unless `pack_kwargs` sets a `shard_size`, the shard size is chosen from the
+    sample index so that every consumer (rank x DataLoader worker) gets several
+    shards (see `stream_shard_size`). A warning is printed when an existing pack
+    has fewer shards than consumers, since some of them would then stream nothing.
+
+    :param dataset: A `BaseBBBCDataset` instance.
+    :param num_workers: Number of DataLoader workers per rank.
+    :param pack_kwargs: Arguments for `pack_dataset`.
+    :param stream_kwargs: Arguments for `PackStreamDataset`.
+    """
+    pack_kwargs = dict(pack_kwargs or {})
+    stream_kwargs = dict(stream_kwargs or {})
+    _, world_size = resolve_rank(
+        stream_kwargs.get("rank"), stream_kwargs.get("world_size")
+    )
+    num_consumers = max(num_workers, 1) * world_size
+
+    if "shard_size" not in pack_kwargs:
+        total_nbytes = dataset.get_sample_index().table["nbytes"].sum()
+        pack_kwargs["shard_size"] = stream_shard_size(total_nbytes, num_consumers)
+    reader = dataset.pack(**pack_kwargs)
+
+    num_shards = len(reader.meta["shards"])
+    if num_shards < num_consumers:
+        print(
+            f"Warning: The pack of {dataset.KEY} has {num_shards} shards for "
+            f"{num_consumers} stream consumers; repack it with a smaller shard_size "
+            f"(pack_kwargs={{'overwrite': True}}) to keep every worker busy."
+        )
+    return PackStreamDataset(reader, **stream_kwargs)
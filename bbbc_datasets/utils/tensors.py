@@ -0,0 +1,42 @@
+import numpy as np
+import torch
+
+from bbbc_datasets.utils.normalization import DEFAULT_PERCENTILES, normalize_image
+
+
+def image_to_tensor(
+    img, normalize="minmax", percentile_range=DEFAULT_PERCENTILES, stats=None, copy=True
+):
+    """
+    Normalizes an image array and wraps it as a tensor with a leading channel
+    dimension: (C, H, W) for 2D images, (C, Z, H, W) for 3D volumes.
+
+    Pass `copy=False` only for a freshly loaded image that nothing else
+    references, so that a float32 image can be normalized in place.
+    """
+    img = normalize_image(img, normalize, percentile_range, stats, copy=copy)
+
+    # torch.from_numpy shares memory, so it needs a writable native-endian array
+    if not img.flags.writeable or not img.dtype.isnative:
+        img = img.astype(img.dtype.newbyteorder("="))
+
+    return torch.from_numpy(img).unsqueeze(0)
+
+
+def label_to_tensor(label):
+    """
+    Converts a label mask to an integer tensor (None stays None).
+    """
+    if label is None:
+        return None
+
+    label = np.asarray(label)
+    if label.dtype.kind == "b":
+        label = label.astype(np.uint8)
+    elif label.dtype in (np.uint16, np.uint32, np.uint64):
+        # Limited operator support for unsigned types beyond uint8 in torch
+        label = label.astype(np.int64)
+    elif not label.flags.writeable or not label.dtype.isnative:
+        label = label.astype(label.dtype.newbyteorder("="))
+
+    return torch.from_numpy(np.ascontiguousarray(label))
@@ -0,0 +1,256 @@
+import os
+
+import cv2
+import numpy as np
+import pandas as pd
+from torch.utils.data import Dataset
+
+from bbbc_datasets.utils.normalization import DEFAULT_PERCENTILES
+from bbbc_datasets.utils.pack import PackReader
+from bbbc_datasets.utils.parallel import imap_ordered
+from bbbc_datasets.utils.sample_index import load_table, save_table
+from bbbc_datasets.utils.tensors import image_to_tensor, label_to_tensor
+
+TILE_INDEX_FORMAT_VERSION = 1
+
+
+def _axis_origins(size, tile, stride):
+    """
+    Tile origins along one axis; the last tile is aligned to the border, so the
+    whole axis is covered without tiles reaching outside the image.
+    """
+    if size <= tile:
+        return np.zeros(1, dtype=np.int64)
+    origins = np.arange(0, size - tile + 1, stride, dtype=np.int64)
+    if origins[-1] != size - tile:
+        origins = np.append(origins, size - tile)
+    return origins
+
+
+def tile_grid(shape, tile_size, overlap=0):
+    """
+    Returns the `(y, x)` origins of a tile grid over a 2D image shape.
+
+    :param shape: Image shape; the first two dimensions are tiled.
+    :param tile_size: `(height, width)` of a tile.
+    :param overlap: Overlap between neighbouring tiles in pixels.
+    :return: An int64 array of shape (N, 2).
+    """
+    tile_h, tile_w = tile_size
+    if overlap >= min(tile_h, tile_w):
+        raise ValueError("The overlap must be smaller than the tile size.")
+
+    ys = _axis_origins(shape[0], tile_h, tile_h - overlap)
+    xs = _axis_origins(shape[1], tile_w, tile_w - overlap)
+    grid = np.stack(np.meshgrid(ys, xs, indexing="ij"), axis=-1)
+    return grid.reshape(-1, 2)
+
+
+def foreground_fractions(label, origins, tile_size):
+    """
+    Returns the fraction of non-zero label pixels of every tile, using one
+    integral image instead of summing every tile.
+    """
+    mask = np.asarray(label) != 0
+    if mask.ndim > 2:
+        mask = mask.reshape(mask.shape[0], mask.shape[1], -1).any(axis=-1)
+    integral = cv2.integral(mask.view(np.uint8))
+
+    tile_h, tile_w = tile_size
+    y0, x0 = origins[:, 0], origins[:, 1]
+    y1 = np.minimum(y0 + tile_h, mask.shape[0])
+    x1 = np.minimum(x0 + tile_w, mask.shape[1])
+    counts = integral[y1, x1] - integral[y0, x1] - integral[y1, x0] + integral[y0, x0]
+    return counts / float(tile_h * tile_w)
+
+
+def _tile_sample(reader, idx, tile_size, overlap):
+    shape = reader.shape(idx, "image")
+    origins = tile_grid(shape, tile_size, overlap)
+    label = reader.get_label(idx)
+    if label is None:
+        fractions = np.full(len(origins), np.nan)
+    else:
+        fractions = foreground_fractions(label, origins, tile_size)
+    return origins, fractions
+
+
+class TileIndex:
+    """
+    Table of all tiles of a pack: one row per tile with its sample (`sample`),
+    origin (`y`, `x`) and label foreground fraction (`foreground`, NaN for
+    samples without a label).
+    """
+
+    def __init__(self, table, tile_size, overlap):
+        self.table = table
+        self.tile_size = tuple(int(t) for t in tile_size)
+        self.overlap = int(overlap)
+
+    def __len__(self):
+        return len(self.table)
+
+    @staticmethod
+    def file_name(tile_size, overlap):
+        return f"tiles_{tile_size[0]}x{tile_size[1]}_o{overlap}.npz"
+
+    def save(self, path):
+        save_table(
+            self.table,
+            path,
+            version=TILE_INDEX_FORMAT_VERSION,
+            tile_h=self.tile_size[0],
+            tile_w=self.tile_size[1],
+            overlap=self.overlap,
+        )
+
+    @classmethod
+    def load(cls, path):
+        table, attrs = load_table(path)
+        if attrs.get("version") != TILE_INDEX_FORMAT_VERSION:
+            raise ValueError(f"Unsupported tile index version in {path}")
+        return cls(table, (attrs["tile_h"], attrs["tile_w"]), attrs["overlap"])
+
+    @classmethod
+    def build(cls, reader, tile_size, overlap=0, workers=None):
+        """
+        Computes the tile grid and foreground fractions of every sample of a pack in parallel.
+        """
+        results = imap_ordered(
+            lambda idx: _tile_sample(reader, idx, tile_size, overlap),
+            range(len(reader)),
+            workers=workers,
+        )
+        samples, origins, fractions = [], [], []
+        for idx, (sample_origins, sample_fractions) in enumerate(results):
+            samples.append(np.full(len(sample_origins), idx, dtype=np.int64))
+            origins.append(sample_origins)
+            fractions.append(sample_fractions)
+
+        origins = np.concatenate(origins)
+        table = pd.DataFrame(
+            {
+                "sample": np.concatenate(samples),
+                "y": origins[:, 0],
+                "x": origins[:, 1],
+                "foreground": np.concatenate(fractions).astype(np.float32),
+            }
+        )
+        return cls(table, tile_size, overlap)
+
+    def select(self, min_foreground=0.0):
+        """
+        Returns the tiles with at least `min_foreground` foreground (tiles of
+        samples without a label are kept).
+        """
+        if not min_foreground:
+            return self
+        foreground = self.table["foreground"].to_numpy()
+        keep = np.isnan(foreground) | (foreground >= min_foreground)
+        return TileIndex(
+            self.table[keep].reset_index(drop=True), self.tile_size, self.overlap
+        )
+
+
+def get_tile_index(reader, tile_size=(256, 256), overlap=0, workers=None):
+    """
+    Returns the cached `TileIndex` of a pack, building it on first use.
+    """
+    tile_size = tuple(int(t) for t in tile_size)
+    path = os.path.join(reader.pack_dir, TileIndex.file_name(tile_size, overlap))
+    if os.path.exists(path):
+        return TileIndex.load(path)
+
+    index = TileIndex.build(reader, tile_size, overlap, workers=workers)
+    index.save(path)
+    return index
+
+
+class TileDataset(Dataset):
+    """
+    PyTorch dataset of fixed-size tiles read from a pack.
+
+    The tile grid (with overlap) and the foreground fraction of every tile are
+    computed once and cached next to the pack, so the dataset length is the
+    number of (selected) tiles. Uncompressed packs are memory-mapped, so a
+    tile only touches the rows of the image it covers instead of decoding the
+    whole image. Tiles of images smaller than the tile size are zero-padded.
+
+    Args:
+        pack_dir (str or PackReader): The pack to read.
+        tile_size (tuple): `(height, width)` of a tile.
+        overlap (int): Overlap between neighbouring tiles in pixels.
+        min_foreground (float): Minimum label foreground fraction of a tile.
+        transform (callable, optional): Optional transform to apply to images.
+        target_transform (callable, optional): Optional transform for labels.
+        normalize (str, optional): Normalization mode of every tile (see `BBBCDataset`).
+        percentile_range (tuple): Percentiles used by the "percentile" mode.
+        stats (dict, optional): Dataset statistics used by the "dataset" mode.
+        workers (int, optional): Number of threads for building the tile index.
+    """
+
+    def __init__(
+        self,
+        pack_dir,
+        tile_size=(256, 256),
+        overlap=0,
+        min_foreground=0.0,
+        transform=None,
+        target_transform=None,
+        normalize="minmax",
+        percentile_range=DEFAULT_PERCENTILES,
+        stats=None,
+        workers=None,
+    ):
+        self.reader = (
+            pack_dir if isinstance(pack_dir, PackReader) else PackReader(pack_dir)
+        )
+        self.tile_size = tuple(int(t) for t in tile_size)
+        index = get_tile_index(self.reader, self.tile_size, overlap, workers=workers)
+        self.index = index.select(min_foreground)
+
+        # Compact columns instead of the DataFrame for per-item access
+        self.samples = self.index.table["sample"].to_numpy()
+        self.origins = self.index.table[["y", "x"]].to_numpy()
+
+        self.transform = transform
+        self.target_transform = target_transform
+        self.normalize = normalize
+        self.percentile_range = percentile_range
+        self.stats = stats
+
+    def __len__(self):
+        return len(self.samples)
+
+    def read_tile(self, idx, kind="image"):
+        """
+        Returns the (zero-padded) tile `idx` of the image or label in its native dtype.
+        """
+        array = self.reader.get(int(self.samples[idx]), kind)
+        if array is None:
+            return None
+
+        y, x = (int(v) for v in self.origins[idx])
+        tile_h, tile_w = self.tile_size
+        tile = array[y : y + tile_h, x : x + tile_w]
+        if tile.shape[:2] != self.tile_size:
+            padded = np.zeros(self.tile_size + tile.shape[2:], dtype=tile.dtype)
+            padded[: tile.shape[0], : tile.shape[1]] = tile
+            tile = padded
+        return tile
+
+    def __getitem__(self, idx):
+        image = image_to_tensor(
+            self.read_tile(idx, "image"),
+            self.normalize,
+            self.percentile_range,
+            self.stats,
+        )
+        label = label_to_tensor(self.read_tile(idx, "label"))
+
+        if self.transform:
+            image = self.transform(image)
+        if self.target_transform and label is not None:
+            label = self.target_transform(label)
+
+        return image, label
@@ -0,0 +1,153 @@
+import hashlib
+import itertools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from bbbc_datasets.utils.sample_index import SampleIndex
+
+
+class VariantGrid:
+    """
+    Handle for all variants of a dataset class (e.g. BBBC024 clustering × SNR,
+    BBBC004 overlap levels, BBBC046 phenotype × fluorescence × anisotropy).
+
+    The grid is the product of the class's `VARIANTS`; fixed arguments narrow
+    it down (a single value) or select values (a list). Variants are
+    instantiated without downloading. `download` fetches all their files in
+    one scheduled batch, and `get_index` combines their sample indexes into one
+    index with a column per variant argument.
+
+    Args:
+        dataset_cls: A dataset class with `VARIANTS`.
+        download_dir (str, optional): Download directory of all variants.
+        **fixed: Variant arguments to fix, or lists of values to keep.
+    """
+
+    def __init__(self, dataset_cls, download_dir=None, **fixed):
+        if not dataset_cls.VARIANTS:
+            raise ValueError(f"{dataset_cls.__name__} has no variants.")
+        unknown = set(fixed) - set(dataset_cls.VARIANTS)
+        if unknown:
+            raise ValueError(
+                f"Unknown variant arguments: {sorted(unknown)}. "
+                f"Choose from {list(dataset_cls.VARIANTS)}"
+            )
+
+        self.dataset_cls = dataset_cls
+        self.download_dir = download_dir
+        self.axes = {
+            name: (
+                list(fixed[name])
+                if isinstance(fixed.get(name), (list, tuple))
+                else [fixed[name]] if name in fixed else list(values)
+            )
+            for name, values in dataset_cls.VARIANTS.items()
+        }
+        self.variants = [
+            dict(zip(self.axes, values))
+            for values in itertools.product(*self.axes.values())
+        ]
+        self._datasets = [None] * len(self.variants)
+        self._index = None
+
+    def __len__(self):
+        return len(self.variants)
+
+    def __iter__(self):
+        for i, variant in enumerate(self.variants):
+            yield variant, self.get_dataset(i)
+
+    def get_dataset(self, variant):
+        """
+        Returns the dataset of a variant, by position or by its arguments.
+        """
+        if isinstance(variant, dict):
+            variant = self.variants.index(variant)
+        if self._datasets[variant] is None:
+            self._datasets[variant] = self.dataset_cls(
+                download_dir=self.download_dir,
+                download_files=False,
+                **self.variants[variant],
+            )
+        return self._datasets[variant]
+
+    def download(self, workers=4):
+        """
+        Downloads the files of all variants in one batch.
+
+        Files shared by several variants (e.g. a BBBC046 phenotype archive)
+        are fetched once. Archives extracted into the same folder run one after
+        another in the same job, and the jobs run on `workers` threads.
+
+        :return: The number of scheduled files.
+        """
+        jobs = {}  # Target folder -> [(dataset, key, url)]
+        seen = set()
+        for i in range(len(self)):
+            dataset = self.get_dataset(i)
+            os.makedirs(dataset.local_path, exist_ok=True)
+            for key, url in dataset.get_download_tasks():
+                local_file, folder = dataset.get_download_folder(url, key)
+                if local_file in seen:
+                    continue
+                seen.add(local_file)
+                target = folder if local_file.endswith(".zip") else local_file
+                jobs.setdefault(target, []).append((dataset, key, url))
+
+        def run(tasks):
+            for dataset, key, url in tasks:
+                dataset._download_and_extract(key, url)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for future in [executor.submit(run, tasks) for tasks in jobs.values()]:
+                future.result()
+        return len(seen)
+
+    def get_index(self, refresh=False):
+        """
+        Returns one `SampleIndex` over all variants.
+
+        Its root is the download directory; every row has the variant's
+        position (`variant`) and one column per variant argument, so a sweep
+        can filter with `select` (e.g. `grid.get_index().select(snr="low")`).
+        """
+        if self._index is not None and not refresh:
+            return self._index
+
+        tables, versions = [], []
+        root = None
+        for i, variant in enumerate(self.variants):
+            dataset = self.get_dataset(i)
+            index = dataset.get_sample_index(refresh=refresh)
+            root = root or dataset.download_dir
+            table = index.table.copy()
+            table["image_path"] = [
+                os.path.relpath(os.path.join(index.root, p), root)
+                for p in table["image_path"]
+            ]
+            table.insert(0, "variant", i)
+            for position, (name, value) in enumerate(variant.items(), start=1):
+                table.insert(position, name, value)
+            tables.append(table)
+            versions.append(index.version)
+
+        version = hashlib.sha1("\n".join(versions).encode()).hexdigest()[:16]
+        table = pd.concat(tables, ignore_index=True)
+        self._index = SampleIndex(root, table, version)
+        return self._index
+
+    def select(self, **query):
+        """
+        Returns the samples of all variants matching a query (see `SampleIndex.select`).
+        """
+        return self.get_index().select(**query)
+
+    def get_label(self, row, **kwargs):
+        """
+        Returns the label of a row of the combined index through its variant's dataset.
+        """
+        dataset = self.get_dataset(int(row["variant"]))
+        image_path = os.path.join(self.get_index().root, row["image_path"])
+        return dataset.get_label(image_path, **kwargs)
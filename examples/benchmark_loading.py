@@ -0,0 +1,69 @@
+import argparse
+import pickle
+import time
+
+from torch.utils.data import DataLoader
+
+from bbbc_datasets.dataset_manager import DatasetManager
+
+
+def _keep_samples(batch):
+    # Labels may be None or differ in shape, so batches are kept as lists
+    return batch
+
+
+def benchmark_loader(dataset, num_workers=(0, 2, 4), batch_size=4, epochs=2):
+    """
+    Measures the DataLoader throughput (samples/sec) of a dataset for several worker counts.
+    :param dataset: A `BBBCDataset` (or any map-style dataset).
+    :param num_workers: Worker counts to measure.
+    :param batch_size: Samples per batch.
+    :param epochs: Number of passes; with workers > 0 the first pass includes worker startup.
+    :return: Dict mapping the worker count to samples/sec.
+    """
+    print(f"Pickled dataset size: {len(pickle.dumps(dataset)) / 1024:.1f} KiB")
+
+    results = {}
+    for workers in num_workers:
+        loader = DataLoader(
+            dataset,
+            batch_size=batch_size,
+            num_workers=workers,
+            collate_fn=_keep_samples,
+            persistent_workers=workers > 0,
+        )
+
+        start = time.perf_counter()
+        samples = 0
+        for _ in range(epochs):
+            for batch in loader:
+                samples += len(batch)
+        elapsed = time.perf_counter() - start
+
+        results[workers] = samples / elapsed
+        print(f"num_workers={workers}: {results[workers]:.1f} samples/sec")
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark BBBCDataset loading.")
+    parser.add_argument("name", nargs="?", default="BBBC039")
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 2, 4])
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--epochs", type=int, default=2)
+    parser.add_argument("--preload", action="store_true")
+    args = parser.parse_args()
+
+    dataset = DatasetManager.get_dataset(args.name, preload=args.preload)
+    if dataset.preload_report:
+        report = dataset.preload_report
+        print(
+            f"Preloaded {report['num_samples']} samples in {report['seconds']:.1f}s: "
+            f"images {report['image_bytes'] / 2**20:.1f} MiB "
+            f"(float32: {report['float32_image_bytes'] / 2**20:.1f} MiB), "
+            f"labels {report['label_bytes'] / 2**20:.1f} MiB, "
+            f"peak {report['peak_bytes'] / 2**20:.1f} MiB, "
+            f"steady {report['steady_bytes'] / 2**20:.1f} MiB"
+        )
+    benchmark_loader(dataset, args.workers, args.batch_size, args.epochs)
@@ -0,0 +1,90 @@
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from bbbc_datasets.utils.metadata import load_metadata_table, read_metadata_csv
+
+
+def _best_time(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def benchmark_metadata(paths, repeats=5):
+    """
+    Compares parsing metadata files against reloading their column cache.
+    :param paths: Metadata CSV files.
+    :param repeats: Measurements per file (the best one is reported).
+    :return: Dict mapping the file name to (parse seconds, reload seconds).
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for path in paths:
+            cache_path = os.path.join(cache_dir, f"{os.path.basename(path)}.npz")
+            load_metadata_table(path, cache_path)  # Fill the cache
+
+            parse = _best_time(lambda: read_metadata_csv(path), repeats)
+            reload = _best_time(lambda: load_metadata_table(path, cache_path), repeats)
+            results[os.path.basename(path)] = (parse, reload)
+            print(
+                f"{os.path.basename(path)}: parse {parse * 1000:.1f} ms, "
+                f"reload {reload * 1000:.1f} ms ({parse / reload:.1f}x)"
+            )
+    return results
+
+
+def write_synthetic_csv(path, rows, seed=0):
+    """
+    Writes a CellProfiler-like results table with `rows` images.
+    """
+    rng = np.random.default_rng(seed)
+    pd.DataFrame(
+        {
+            "Image_FileName": [
+                f"SIMCEPImages_A01_C{i % 100}_F{i % 48}_s{i}_w1.TIF"
+                for i in range(rows)
+            ],
+            "Image_Count_Cells": rng.integers(0, 100, rows),
+            "Image_Intensity_Mean": rng.random(rows),
+            "Image_PathName": ["/data/BBBC005/images"] * rows,
+        }
+    ).to_csv(path, index=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark metadata parsing against the column cache."
+    )
+    parser.add_argument("name", nargs="?", default="BBBC005")
+    parser.add_argument(
+        "--rows", type=int, default=0, help="Use a synthetic CSV with this many rows"
+    )
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.rows:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "results.csv")
+            write_synthetic_csv(path, args.rows)
+            benchmark_metadata([path], args.repeats)
+    else:
+        from bbbc_datasets.dataset_manager import DatasetManager
+
+        dataset = DatasetManager.get_dataset(args.name).get_base_dataset()
+        paths = [
+            os.path.join(dir_path, name)
+            for dir_path, _, files in os.walk(
+                os.path.join(dataset.local_path, "metadata")
+            )
+            for name in files
+            if name.lower().endswith((".csv", ".tsv"))
+        ]
+        benchmark_metadata(paths, args.repeats)
@@ -0,0 +1,55 @@
+import time
+
+import numpy as np
+import torch
+
+from bbbc_datasets.utils.normalization import normalize_image
+
+
+def legacy_to_tensor(img):
+    """
+    The previous BBBCDataset path: float64 temporaries, two scans and a copy into torch.
+    """
+    img = (img - np.min(img)) / (np.max(img) - np.min(img) + 1e-8)
+    return torch.tensor(img, dtype=torch.float32).unsqueeze(0)
+
+
+def to_tensor(img, mode, **kwargs):
+    return torch.from_numpy(normalize_image(img, mode, **kwargs)).unsqueeze(0)
+
+
+def time_per_sample(fn, img, repeats):
+    fn(img)  # Warm-up
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn(img)
+    return (time.perf_counter() - start) / repeats * 1e3
+
+
+def benchmark_normalization(repeats=20):
+    """
+    Prints the per-sample latency (ms) of the normalization modes for a 2D and a 3D input.
+    """
+    rng = np.random.default_rng(0)
+    inputs = {
+        "2D 520x696 uint16": rng.integers(0, 4096, (520, 696), dtype=np.uint16),
+        "3D 64x256x256 uint16": rng.integers(0, 4096, (64, 256, 256), dtype=np.uint16),
+    }
+    methods = {
+        "legacy (float64)": legacy_to_tensor,
+        "minmax": lambda img: to_tensor(img, "minmax"),
+        "percentile": lambda img: to_tensor(img, "percentile"),
+        "dataset": lambda img: to_tensor(
+            img, "dataset", stats={"mean": 2048.0, "std": 1182.0}
+        ),
+        "none (native)": lambda img: to_tensor(img, None),
+    }
+
+    for name, img in inputs.items():
+        print(f"{name}:")
+        for method, fn in methods.items():
+            print(f"  {method:<18} {time_per_sample(fn, img, repeats):8.2f} ms")
+
+
+if __name__ == "__main__":
+    benchmark_normalization()
@@ -1,7 +1,7 @@
 from bbbc_datasets.datasets.bbbc003 import BBBC003
 from bbbc_datasets.datasets.bbbc004 import BBBC004
 from bbbc_datasets.datasets.bbbc005 import BBBC005
-from bbbc_datasets.datasets.bbbc006 import BBBC006
+from bbbc_datasets.datasets.bbbc006 import BBBC006, BBBC006Stack
 from bbbc_datasets.datasets.bbbc008 import BBBC008
 from bbbc_datasets.datasets.bbbc010 import BBBC010
 from bbbc_datasets.datasets.bbbc024 import BBBC024
@@ -23,6 +23,7 @@ DATASETS = [
     BBBC004,
     BBBC005,
     BBBC006,
+    BBBC006Stack,
     BBBC008,
     BBBC010,
     BBBC024,
@@ -0,0 +1,52 @@
+import os
+
+import cv2
+import numpy as np
+
+from bbbc_datasets.datasets.base_dataset import BaseBBBCDataset
+
+
+class SyntheticDataset(BaseBBBCDataset):
+    """
+    Synthetic Dataset: Small generated image/label pairs for offline tests.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.KEY = "SYNTHETIC"
+        self.image_paths = None
+        self.label_path = None
+        self.metadata_paths = None
+        self.is_3d = False
+
+        kwargs.setdefault("download_files", False)
+        super().__init__(*args, **kwargs)
+
+
+def make_synthetic_dataset(root, num_images=4, shape=(32, 48), seed=0):
+    """
+    Writes `num_images` uint16 PNG images with instance label masks to
+    `root/SYNTHETIC` and returns a `SyntheticDataset` reading from there.
+    """
+    rng = np.random.default_rng(seed)
+    image_dir = os.path.join(root, "SYNTHETIC", "images")
+    label_dir = os.path.join(root, "SYNTHETIC", "labels")
+    metadata_dir = os.path.join(root, "SYNTHETIC", "metadata")
+    for dir_path in (image_dir, label_dir, metadata_dir):
+        os.makedirs(dir_path, exist_ok=True)
+
+    with open(os.path.join(metadata_dir, "counts.csv"), "w") as f:
+        f.write("image,count\n")
+        for i in range(num_images):
+            f.write(f"img_{i:03d},{i + 1}\n")
+
+    for i in range(num_images):
+        image = rng.integers(0, 4096, size=shape, dtype=np.uint16)
+        label = np.zeros(shape, dtype=np.uint8)
+        for obj in range(i + 1):
+            y, x = 2 + 6 * obj, 3 + 5 * obj
+            label[y : y + 4, x : x + 4] = obj + 1
+
+        cv2.imwrite(os.path.join(image_dir, f"img_{i:03d}.png"), image)
+        cv2.imwrite(os.path.join(label_dir, f"img_{i:03d}_mask.png"), label)
+
+    return SyntheticDataset(download_dir=root)
@@ -0,0 +1,108 @@
+import os
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+import torch
+from torch.utils.data import DataLoader
+
+from bbbc_datasets.dataset_manager import BBBCDataset
+from bbbc_datasets.utils.batching import ShapeBucketBatchSampler, pad_collate
+from tests.synthetic import SyntheticDataset, make_synthetic_dataset
+
+
+class TestShapeBucketBatchSampler(unittest.TestCase):
+    """Test case to check shape bucketing and padding-aware collation."""
+
+    def test_exact_shape_buckets(self):
+        """Every sample appears once and batches never mix shapes."""
+        shapes = [(256, 256)] * 7 + [(520, 696)] * 5 + [(1024, 1024)] * 3
+        sampler = ShapeBucketBatchSampler(shapes, batch_size=4, seed=1)
+
+        batches = list(sampler)
+        self.assertEqual(len(batches), len(sampler))
+        self.assertEqual(sorted(i for b in batches for i in b), list(range(15)))
+        for batch in batches:
+            self.assertEqual(len({shapes[i] for i in batch}), 1)
+        self.assertEqual(sampler.padding_fraction(), 0.0)
+
+        sampler.set_epoch(1)
+        self.assertNotEqual(list(sampler), batches)
+
+    def test_aspect_buckets_reduce_padding(self):
+        """Aspect buckets pad far less than batching in random order."""
+        rng = np.random.default_rng(0)
+        shapes = [(s, s) for s in rng.integers(256, 1024, 64)]
+        shapes += [(s, 2 * s) for s in rng.integers(128, 512, 64)]
+
+        bucketed = ShapeBucketBatchSampler(shapes, batch_size=8, bucket_by="aspect")
+        for batch in bucketed:
+            self.assertEqual(len({shapes[i][1] // shapes[i][0] for i in batch}), 1)
+
+        sizes = np.array([h * w for h, w in shapes])
+        random_batches = np.array_split(rng.permutation(len(shapes)), 16)
+        random_padded = sum(
+            np.prod(np.max([shapes[i] for i in b], axis=0)) * len(b)
+            for b in random_batches
+        )
+        self.assertLess(bucketed.padding_fraction(), 0.15)
+        self.assertGreater(1 - sizes.sum() / random_padded, 0.3)
+
+    def test_aspect_buckets_channel_last(self):
+        """(H, W, C) samples are bucketed by their spatial aspect ratio only."""
+        shapes = [(256, 256, 4), (300, 310, 4), (520, 696, 4), (512, 700, 4)]
+        shapes += [(256, 256), (512, 512, 3)]
+        sampler = ShapeBucketBatchSampler(shapes, batch_size=8, bucket_by="aspect")
+        buckets = sorted(sorted(b.tolist()) for b in sampler.buckets)
+        self.assertEqual(buckets, [[0, 1], [2, 3], [4], [5]])
+
+    def test_pad_collate(self):
+        """Samples are padded to the batch maximum and masked."""
+        batch = [
+            (torch.ones(1, 4, 6), torch.ones(4, 6, dtype=torch.int64)),
+            (torch.ones(1, 5, 3), torch.full((5, 3), 2, dtype=torch.int64)),
+        ]
+        images, labels, masks = pad_collate(batch)
+
+        self.assertEqual(tuple(images.shape), (2, 1, 5, 6))
+        self.assertEqual(tuple(labels.shape), (2, 5, 6))
+        self.assertEqual(tuple(masks.shape), (2, 5, 6))
+        self.assertEqual(int(masks[0].sum()), 24)
+        self.assertEqual(int(masks[1].sum()), 15)
+        torch.testing.assert_close(images[:, 0] != 0, masks)
+        self.assertEqual(int(labels[1][~masks[1]].abs().sum()), 0)
+
+        _, labels, _ = pad_collate([(torch.ones(1, 2, 2), None)])
+        self.assertIsNone(labels)
+
+    def test_dataset_loader(self):
+        """A dataset with two image sizes is loaded in shape-pure batches."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            make_synthetic_dataset(tmp_dir, num_images=3)
+            root = os.path.join(tmp_dir, "SYNTHETIC")
+            for i in range(3):
+                name = f"big_{i:03d}"
+                image = np.full((40, 64), i + 1, dtype=np.uint16)
+                cv2.imwrite(os.path.join(root, "images", f"{name}.png"), image)
+                label = np.zeros((40, 64), dtype=np.uint8)
+                cv2.imwrite(os.path.join(root, "labels", f"{name}_mask.png"), label)
+
+            dataset = BBBCDataset(
+                SyntheticDataset, dataset_kwargs={"download_dir": tmp_dir}
+            )
+            shapes = dataset.get_shapes()
+            self.assertEqual(sorted(set(shapes)), [(32, 48), (40, 64)])
+
+            sampler = ShapeBucketBatchSampler(shapes, batch_size=2)
+            loader = DataLoader(dataset, batch_sampler=sampler, collate_fn=pad_collate)
+            seen = 0
+            for images, labels, masks in loader:
+                self.assertTrue(bool(masks.all()))
+                self.assertEqual(images.shape[2:], labels.shape[1:])
+                seen += len(images)
+            self.assertEqual(seen, len(dataset))
+
+
+if __name__ == "__main__":
+    unittest.main()
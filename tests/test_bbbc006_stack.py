@@ -0,0 +1,122 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import cv2
+import numpy as np
+import tifffile
+
+from bbbc_datasets.datasets.bbbc006 import BBBC006, BBBC006Stack
+from tests import DATASETS
+
+
+class TestBBBC006Stack(unittest.TestCase):
+    """Test case to check focal-stack assembly across BBBC006 z-planes."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        rng = np.random.default_rng(0)
+        self.planes = {}
+        for z in range(3):
+            # The layout of the BBBC006 plane variants
+            plane_dir = os.path.join(
+                self.tmp_dir.name,
+                f"BBBC006_Z{z:02}",
+                "images",
+                f"BBBC006_v1_images_z_{z:02}",
+            )
+            os.makedirs(plane_dir)
+            for field in ("a01_s1", "b02_s2"):
+                for channel in (1, 2):
+                    image = rng.integers(0, 4096, (16, 20), dtype=np.uint16)
+                    name = f"mcf-z-stacks-03212011_{field}_w{channel}abc.tif"
+                    tifffile.imwrite(os.path.join(plane_dir, name), image)
+                    self.planes[(field, channel, z)] = image
+
+        label_dir = os.path.join(
+            self.tmp_dir.name, "BBBC006_Z00", "labels", "BBBC006_v1_labels"
+        )
+        os.makedirs(label_dir)
+        for i, field in enumerate(("a01_s1", "b02_s2")):
+            label = np.full((16, 20), i + 1, dtype=np.uint8)
+            cv2.imwrite(
+                os.path.join(label_dir, f"mcf-z-stacks-03212011_{field}.png"), label
+            )
+
+        self.dataset = BBBC006Stack(
+            z_planes=range(3), download_dir=self.tmp_dir.name, download_files=False
+        )
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_field_index_and_stacks(self):
+        """Every field becomes one (Z, Y, X) stack of the selected channel."""
+        self.assertEqual(self.dataset.get_fields(), ["a01_s1", "b02_s2"])
+        self.assertEqual(len(self.dataset.get_image_paths()), 6)
+        self.assertFalse(self.dataset.is_3d)  # Image paths are 2D planes
+        self.assertIn(BBBC006Stack, DATASETS)
+
+        stack = self.dataset.get_stack("b02_s2")
+        self.assertEqual(stack.shape, (3, 16, 20))
+        expected = np.stack([self.planes[("b02_s2", 1, z)] for z in range(3)])
+        np.testing.assert_array_equal(stack[:], expected)
+        stack.close()
+
+    def test_shared_labels(self):
+        """All planes of a field (and the field key itself) share one label."""
+        paths = self.dataset.get_field_index()
+        for _, row in paths.iterrows():
+            label = self.dataset.get_label(row["image_path"])
+            self.assertEqual(int(label.max()), 1 if row["field"] == "a01_s1" else 2)
+        self.assertEqual(int(self.dataset.get_label("b02_s2").max()), 2)
+
+    def test_concurrent_plane_downloads(self):
+        """Plane archives are fetched concurrently into the BBBC006 plane folders."""
+        calls, threads = [], set()
+
+        def download(dataset, key, url):
+            calls.append((key, dataset.get_download_folder(url, key)[1]))
+            threads.add(threading.get_ident())
+
+        with mock.patch.object(BBBC006Stack, "_download_and_extract", download):
+            BBBC006Stack(z_planes=[4, 16], download_dir=self.tmp_dir.name)
+
+        folders = {
+            key: os.path.relpath(folder, self.tmp_dir.name) for key, folder in calls
+        }
+        self.assertEqual(
+            folders,
+            {
+                "image_z_04": os.path.join("BBBC006_Z04", "images"),
+                "image_z_16": os.path.join("BBBC006_Z16", "images"),
+                "label": os.path.join("BBBC006_Z16", "labels"),
+                "metadata": os.path.join("BBBC006_Z16", "metadata"),
+            },
+        )
+        self.assertNotIn(threading.get_ident(), threads)
+
+    def test_reuses_plane_downloads(self):
+        """Planes downloaded through BBBC006 are not fetched again."""
+        for z in range(3):
+            marker = BBBC006._marker_name(f"BBBC006_v1_images_z_{z:02}.zip")
+            open(os.path.join(self.dataset.get_plane_dir(z), marker), "w").close()
+        label_dir = os.path.join(self.tmp_dir.name, "BBBC006_Z00", "labels")
+        open(os.path.join(label_dir, ".BBBC006_v1_labels.zip.extracted"), "w").close()
+        metadata_dir = os.path.join(self.tmp_dir.name, "BBBC006_Z00", "metadata")
+        os.makedirs(metadata_dir)
+        for name in ("BBBC006_v1_counts.csv", "BBBC006_results_bray.csv"):
+            open(os.path.join(metadata_dir, name), "w").close()
+
+        with mock.patch(
+            "bbbc_datasets.datasets.base_dataset.requests.get",
+            side_effect=AssertionError,
+        ):
+            stacks = BBBC006Stack(z_planes=range(3), download_dir=self.tmp_dir.name)
+        self.assertEqual(stacks.get_stack("a01_s1").shape, (3, 16, 20))
+
+
+if __name__ == "__main__":
+    unittest.main()
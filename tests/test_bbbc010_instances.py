@@ -0,0 +1,74 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import cv2
+import numpy as np
+import tifffile
+
+from bbbc_datasets.datasets.bbbc010 import BBBC010
+
+
+class TestBBBC010Instances(unittest.TestCase):
+    """Test case to check the composed per-worm instance labels of BBBC010."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        root = os.path.join(self.tmp_dir.name, "BBBC010")
+        image_dir = os.path.join(root, "images", "BBBC010_v2_images")
+        label_dir = os.path.join(root, "labels", "BBBC010_v1_foreground")
+        worm_dir = os.path.join(
+            root, "labels_eachworm", "BBBC010_v1_foreground_eachworm"
+        )
+        for d in (image_dir, label_dir, worm_dir):
+            os.makedirs(d)
+
+        self.images = {}
+        for i, well in enumerate(("A01", "B02")):
+            name = f"1649_1109_0003_Amp5-1_B_20070424_{well}_w1_9E84F49F.tif"
+            path = os.path.join(image_dir, name)
+            tifffile.imwrite(path, np.zeros((12, 16), dtype=np.uint16))
+            self.images[well] = path
+
+            foreground = np.zeros((12, 16), dtype=np.uint8)
+            for worm in range(i + 2):
+                mask = np.zeros((12, 16), dtype=np.uint8)
+                mask[worm * 3 : worm * 3 + 4, 2:10] = 255
+                foreground |= mask
+                cv2.imwrite(
+                    os.path.join(worm_dir, f"{well}_{worm + 1:02}_ground_truth.png"),
+                    mask,
+                )
+            cv2.imwrite(os.path.join(label_dir, f"{well}_binary.png"), foreground)
+
+        self.dataset = BBBC010(download_dir=self.tmp_dir.name, download_files=False)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_instance_labels(self):
+        """Worm masks become one uint16 map per well, later worms on top."""
+        self.assertEqual(self.dataset.build_instance_labels(workers=2), 2)
+        label = self.dataset.get_label(self.images["B02"], kind="instance")
+        self.assertEqual(label.dtype, np.uint16)
+        self.assertEqual(sorted(np.unique(label)), [0, 1, 2, 3])
+        self.assertEqual(label[3, 5], 2)  # Overlap of worm 1 and 2
+        self.assertEqual(label[9, 5], 3)
+
+        foreground = self.dataset.get_label(self.images["B02"])
+        np.testing.assert_array_equal(foreground > 0, label > 0)
+
+    def test_cached_instance_labels(self):
+        """Cached instance maps are read back without composing the worm masks again."""
+        self.dataset.build_instance_labels()
+        self.assertEqual(self.dataset.build_instance_labels(), 0)
+        with mock.patch.object(
+            BBBC010, "compose_instances", side_effect=AssertionError
+        ):
+            label = self.dataset.get_label(self.images["A01"], kind="instance")
+        self.assertEqual(label.max(), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
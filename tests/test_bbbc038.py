@@ -0,0 +1,38 @@
+import os
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+
+from bbbc_datasets.datasets.bbbc038 import BBBC038
+
+
+class TestBBBC038(unittest.TestCase):
+    """Test case to check the BBBC038 instance maps composed from per-nucleus masks."""
+
+    def test_more_than_255_nuclei(self):
+        """Every mask file keeps its own id, also beyond the uint8 range."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            sample_dir = os.path.join(tmp_dir, "BBBC038", "all", "sample")
+            image_dir = os.path.join(sample_dir, "images")
+            mask_dir = os.path.join(sample_dir, "masks")
+            os.makedirs(image_dir)
+            os.makedirs(mask_dir)
+
+            image_path = os.path.join(image_dir, "sample.png")
+            cv2.imwrite(image_path, np.zeros((20, 20), dtype=np.uint8))
+            for i in range(300):
+                mask = np.zeros((20, 20), dtype=np.uint8)
+                mask[i // 20, i % 20] = 255
+                cv2.imwrite(os.path.join(mask_dir, f"nucleus_{i:03d}.png"), mask)
+
+            dataset = BBBC038(download_dir=tmp_dir, download_files=False)
+            label = dataset.get_label(image_path, kind="instance")
+            self.assertEqual(label.dtype, np.uint16)
+            self.assertEqual(len(np.unique(label[label > 0])), 300)
+            self.assertEqual(int(label.max()), 300)
+
+
+if __name__ == "__main__":
+    unittest.main()
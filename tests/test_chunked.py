@@ -0,0 +1,94 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from bbbc_datasets.utils.chunked import (
+    ChunkedStore,
+    ChunkedVolume,
+    PatchSampler,
+    write_chunked,
+)
+
+
+class TestChunkedVolume(unittest.TestCase):
+    """Test case to check chunked volume storage and patch sampling."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        rng = np.random.default_rng(0)
+        self.volume = rng.integers(0, 1000, size=(20, 37, 29), dtype=np.uint16)
+        self.label = np.zeros(self.volume.shape, dtype=np.uint16)
+        self.label[15:18, 30:35, 20:27] = 7
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_read_region(self):
+        """Regions read from chunks match the source volume, including padding."""
+        for compression in (None, "zlib"):
+            with self.subTest(compression=compression):
+                path = os.path.join(self.tmp_dir.name, str(compression))
+                volume = write_chunked(
+                    path, self.volume, chunks=(8, 16, 16), compression=compression
+                )
+                volume = ChunkedVolume(path)
+                np.testing.assert_array_equal(volume.to_numpy(), self.volume)
+                np.testing.assert_array_equal(
+                    volume.read_region((3, 10, 5), (9, 20, 17)),
+                    self.volume[3:12, 10:30, 5:22],
+                )
+
+                region = volume.read_region((-2, 30, 20), (6, 10, 10))
+                expected = np.zeros((6, 10, 10), dtype=np.uint16)
+                expected[2:, :7, :9] = self.volume[0:4, 30:37, 20:29]
+                np.testing.assert_array_equal(region, expected)
+
+    def test_channel_last(self):
+        """Channel-last volumes are stored channels-first and chunked spatially."""
+        volume = np.stack([self.volume, self.volume // 2], axis=-1)
+        chunked = write_chunked(
+            os.path.join(self.tmp_dir.name, "channels"),
+            volume,
+            chunks=(8, 16, 16),
+            channel_axis=-1,
+        )
+        self.assertEqual(chunked.shape, (2, 20, 37, 29))
+        self.assertEqual(chunked.chunks, (2, 8, 16, 16))
+        np.testing.assert_array_equal(
+            chunked.read_region((3, 10, 5), (9, 20, 17)),
+            np.moveaxis(volume[3:12, 10:30, 5:22], -1, 0),
+        )
+
+    def test_foreground_sampling(self):
+        """Foreground-weighted patches always contain labelled voxels."""
+        store = ChunkedStore.__new__(ChunkedStore)
+        store.paths = ["volume"]
+        store.images = [
+            write_chunked(
+                os.path.join(self.tmp_dir.name, "image"), self.volume, (8, 8, 8)
+            )
+        ]
+        store.labels = [
+            write_chunked(
+                os.path.join(self.tmp_dir.name, "label"),
+                self.label,
+                (8, 8, 8),
+                occupancy=True,
+            )
+        ]
+
+        sampler = PatchSampler(
+            store, patch_size=(8, 8, 8), foreground_probability=1.0, seed=0
+        )
+        for _ in range(20):
+            image, label, vol_idx, origin = sampler.sample()
+            self.assertEqual(image.shape, (8, 8, 8))
+            self.assertTrue(np.any(label))
+            start = tuple(slice(o, o + 8) for o in origin)
+            np.testing.assert_array_equal(image, self.volume[start])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+import json
+import os
+import tempfile
+import unittest
+
+import numpy as np
+from matplotlib.path import Path
+
+from bbbc_datasets.utils.coco import (
+    CocoIndex,
+    fill_polygon,
+    iter_coco,
+    load_coco_index,
+)
+
+
+def make_coco(num_images=4, seed=0):
+    rng = np.random.default_rng(seed)
+    images, annotations = [], []
+    for image_id in range(num_images):
+        images.append(
+            {
+                "id": 100 + image_id,
+                "file_name": f"img_{image_id}.tif",
+                "width": 64,
+                "height": 48,
+            }
+        )
+        for k in range(image_id + 1):
+            cx, cy = rng.uniform(10, 54), rng.uniform(10, 38)
+            angles = np.sort(rng.uniform(0, 2 * np.pi, 7))
+            radius = rng.uniform(3, 9, 7)
+            polygon = np.stack(
+                [cx + radius * np.cos(angles), cy + radius * np.sin(angles)], axis=1
+            )
+            annotations.append(
+                {
+                    "id": len(annotations) + 1,
+                    "image_id": 100 + image_id,
+                    "category_id": 1,
+                    "iscrowd": 0,
+                    "bbox": [1.0, 2.0, 3.0, 4.0],
+                    "segmentation": [polygon.round(2).reshape(-1).tolist()],
+                }
+            )
+    # Annotations out of image order, as in merged files
+    annotations = annotations[::-1]
+    return {
+        "info": {"description": "test"},
+        "images": images,
+        "annotations": annotations,
+        "categories": [{"id": 1, "name": "cell"}],
+    }
+
+
+class TestCoco(unittest.TestCase):
+    """Test case to check the streaming COCO parser, index and rasterizer."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.coco = make_coco()
+        self.json_path = os.path.join(self.tmp_dir.name, "coco.json")
+        with open(self.json_path, "w") as f:
+            json.dump(self.coco, f, indent=1)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_streaming_parser(self):
+        """Chunk boundaries anywhere in the file do not change the parsed elements."""
+        items = list(iter_coco(self.json_path, chunk_size=7))
+        self.assertEqual([v for k, v in items if k == "images"], self.coco["images"])
+        self.assertEqual(
+            [v for k, v in items if k == "annotations"], self.coco["annotations"]
+        )
+        self.assertIn(("categories", self.coco["categories"]), items)
+
+    def test_index_groups_annotations(self):
+        """Annotations are grouped per image with their polygons as flat arrays."""
+        index = CocoIndex.build(self.json_path, chunk_size=64)
+        self.assertEqual(len(index), 4)
+        self.assertEqual(index.num_annotations, 10)
+
+        for image in self.coco["images"]:
+            idx = index.index_of(image["file_name"])
+            expected = [
+                a for a in self.coco["annotations"] if a["image_id"] == image["id"]
+            ]
+            anns = index.annotations(idx)
+            self.assertEqual(
+                [int(index.ann_ids[a]) for a in anns], [a["id"] for a in expected]
+            )
+            for a, ann in zip(anns, expected):
+                np.testing.assert_allclose(
+                    index.polygons(a)[0].reshape(-1), ann["segmentation"][0], rtol=1e-6
+                )
+
+    def test_unknown_image_ids(self):
+        """Annotations of image ids missing from the images list are rejected."""
+        for image_id in (99, 102, 110):  # Before, between and after the known ids
+            coco = make_coco()
+            coco["images"] = [i for i in coco["images"] if i["id"] != image_id]
+            coco["annotations"][0]["image_id"] = image_id
+            with open(self.json_path, "w") as f:
+                json.dump(coco, f)
+            with self.assertRaisesRegex(ValueError, str(image_id)):
+                CocoIndex.build(self.json_path)
+
+    def test_cached_index(self):
+        """The index is cached and rebuilt only when the JSON file changes."""
+        cache_path = os.path.join(self.tmp_dir.name, "coco.index.npz")
+        index = load_coco_index(self.json_path, cache_path=cache_path)
+        self.assertTrue(os.path.exists(cache_path))
+
+        cached = load_coco_index(self.json_path, cache_path=cache_path)
+        np.testing.assert_array_equal(cached.coords, index.coords)
+        np.testing.assert_array_equal(cached.file_names, index.file_names)
+
+        with open(self.json_path, "w") as f:
+            json.dump(make_coco(num_images=2), f)
+        self.assertEqual(len(load_coco_index(self.json_path, cache_path=cache_path)), 2)
+
+    def test_scanline_fill(self):
+        """The vectorized fill matches a box and a point-in-polygon test of pixel centers."""
+        mask = fill_polygon(
+            np.zeros((10, 12), np.uint8), [(2, 3), (7, 3), (7, 8), (2, 8)]
+        )
+        expected = np.zeros((10, 12), np.uint8)
+        expected[3:8, 2:7] = 1
+        np.testing.assert_array_equal(mask, expected)
+
+        index = CocoIndex.build(self.json_path)
+        ys, xs = np.mgrid[0:48, 0:64] + 0.5
+        centers = np.stack([xs.ravel(), ys.ravel()], axis=1)
+        for ann in range(index.num_annotations):
+            polygon = index.polygons(ann)[0]
+            ours = fill_polygon(np.zeros((48, 64), np.uint8), polygon)
+            reference = Path(polygon).contains_points(centers).reshape(48, 64)
+            np.testing.assert_array_equal(ours.astype(bool), reference)
+
+        mask = index.instance_mask(index.index_of("img_3.tif"))
+        self.assertEqual(mask.dtype, np.uint16)
+        self.assertEqual(mask.max(), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
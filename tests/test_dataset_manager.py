@@ -0,0 +1,111 @@
+import pickle
+import tempfile
+import unittest
+
+import numpy as np
+import torch
+from torch.utils.data import DataLoader
+
+from bbbc_datasets.dataset_manager import BBBCDataset
+from bbbc_datasets.utils.arena import SampleArena
+from bbbc_datasets.utils.normalization import normalize_image
+from bbbc_datasets.utils.tensors import image_to_tensor
+from tests.synthetic import SyntheticDataset, make_synthetic_dataset
+
+
+class TestBBBCDataset(unittest.TestCase):
+    """Test case to check the PyTorch dataset wrapper on a synthetic dataset."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.source = make_synthetic_dataset(self.tmp_dir.name, num_images=6)
+        self.dataset = BBBCDataset(
+            SyntheticDataset, dataset_kwargs={"download_dir": self.tmp_dir.name}
+        )
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_labels_are_paired_per_sample(self):
+        """Every sample returns the label mask of its own image."""
+        for idx, image_path in enumerate(self.dataset.image_paths):
+            image, label = self.dataset[idx]
+            self.assertEqual(tuple(image.shape), (1, 32, 48))
+            np.testing.assert_array_equal(
+                label.numpy(), self.source.get_label(str(image_path))
+            )
+
+    def test_normalization_modes(self):
+        """Images are normalized to float32 in [0, 1] or kept in their native dtype."""
+        image, _ = self.dataset[0]
+        self.assertEqual(image.dtype, torch.float32)
+        self.assertAlmostEqual(float(image.min()), 0.0, places=5)
+        self.assertAlmostEqual(float(image.max()), 1.0, places=5)
+
+        native = BBBCDataset(
+            SyntheticDataset,
+            dataset_kwargs={"download_dir": self.tmp_dir.name},
+            normalize=None,
+        )
+        image, _ = native[0]
+        self.assertEqual(image.dtype, torch.uint16)
+
+    def test_pickles_sample_table_only(self):
+        """Workers receive the sample table, not the dataset object."""
+        state = pickle.loads(pickle.dumps(self.dataset))
+        self.assertIsNone(state.dataset)
+        np.testing.assert_array_equal(state.image_paths, self.dataset.image_paths)
+
+        loader = DataLoader(
+            self.dataset, batch_size=2, num_workers=2, collate_fn=lambda b: b
+        )
+        self.assertEqual(sum(len(batch) for batch in loader), len(self.dataset))
+
+    def test_preload(self):
+        """Preloaded samples match lazily loaded ones and stay in their native dtype."""
+        preloaded = BBBCDataset(
+            SyntheticDataset,
+            dataset_kwargs={"download_dir": self.tmp_dir.name},
+            preload=True,
+            workers=2,
+        )
+        for idx in range(len(self.dataset)):
+            image, label = preloaded[idx]
+            expected_image, expected_label = self.dataset[idx]
+            torch.testing.assert_close(image, expected_image)
+            torch.testing.assert_close(label, expected_label)
+
+        self.assertEqual(preloaded.images.get(0).dtype, np.uint16)
+        self.assertTrue(
+            np.shares_memory(preloaded.images.get(5), preloaded.images.buffer)
+        )
+
+        report = preloaded.preload_report
+        self.assertEqual(report["image_bytes"], 6 * 32 * 48 * 2)
+        self.assertEqual(report["float32_image_bytes"], 2 * report["image_bytes"])
+        self.assertGreaterEqual(report["peak_bytes"], report["image_bytes"])
+        self.assertGreaterEqual(report["steady_bytes"], report["image_bytes"])
+
+    def test_arena_samples_are_read_only(self):
+        """Arena samples, including overflow ones, are never normalized in place."""
+        volume = np.arange(12, dtype=np.float32).reshape(3, 4)
+        arena = SampleArena([(3, 4), (2, 2)], [np.float32, np.uint8])
+        arena.set(0, volume)
+        arena.set(1, volume)  # Other shape and dtype than announced: overflow
+        self.assertIn(1, arena.overflow)
+
+        for idx in range(2):
+            sample = arena.get(idx)
+            self.assertFalse(sample.flags.writeable)
+            first = image_to_tensor(sample)
+            torch.testing.assert_close(image_to_tensor(arena.get(idx)), first)
+            np.testing.assert_array_equal(arena.get(idx), volume)
+        self.assertTrue(arena.overflow[1].flags.writeable)
+
+        owned = volume.copy()
+        self.assertFalse(np.shares_memory(normalize_image(volume), volume))
+        self.assertIs(normalize_image(owned, copy=False), owned)
+
+
+if __name__ == "__main__":
+    unittest.main()
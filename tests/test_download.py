@@ -0,0 +1,87 @@
+import io
+import os
+import tempfile
+import unittest
+import zipfile
+from unittest import mock
+
+import cv2
+import numpy as np
+
+from bbbc_datasets.datasets.bbbc039 import BBBC039
+
+IMAGE_NAME = "IXMtest_A01_s1_w1ABC"
+
+
+def make_zip(files):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        for name, data in files.items():
+            zf.writestr(name, data)
+    return buffer.getvalue()
+
+
+ARCHIVES = {
+    "images.zip": {
+        f"images/{IMAGE_NAME}.tif": cv2.imencode(
+            ".tiff", np.zeros((4, 6), dtype=np.uint16)
+        )[1].tobytes()
+    },
+    "masks.zip": {
+        f"masks/{IMAGE_NAME}.png": cv2.imencode(
+            ".png", np.zeros((4, 6, 3), dtype=np.uint8)
+        )[1].tobytes()
+    },
+    "metadata.zip": {
+        "metadata/training.txt": f"{IMAGE_NAME}.png\n",
+        "metadata/test.txt": "",
+    },
+}
+
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, data):
+        self.data = data
+        self.headers = {"content-length": str(len(data))}
+
+    def iter_content(self, chunk_size=1024):
+        for i in range(0, len(self.data), chunk_size):
+            yield self.data[i : i + chunk_size]
+
+
+class TestDownload(unittest.TestCase):
+    """Test case to check downloading and extracting into an empty directory."""
+
+    def test_fresh_download(self):
+        """Image, label and metadata archives are all fetched on a fresh install."""
+        urls = []
+
+        def get(url, stream=False):
+            urls.append(url)
+            return FakeResponse(make_zip(ARCHIVES[os.path.basename(url)]))
+
+        with tempfile.TemporaryDirectory() as tmp_dir, mock.patch(
+            "bbbc_datasets.datasets.base_dataset.requests.get", get
+        ):
+            dataset = BBBC039(download_dir=tmp_dir)
+            self.assertEqual(
+                sorted(os.path.basename(url) for url in urls), sorted(ARCHIVES)
+            )
+            metadata_dir = os.path.join(dataset.local_path, "metadata")
+            self.assertTrue(
+                os.path.exists(os.path.join(metadata_dir, ".metadata.zip.extracted"))
+            )
+            self.assertFalse(os.path.exists(os.path.join(metadata_dir, "metadata.zip")))
+            self.assertEqual(
+                list(dataset.get_sample_index().table["split"]), ["training"]
+            )
+
+            # Extracted archives are not fetched again
+            BBBC039(download_dir=tmp_dir)
+            self.assertEqual(len(urls), len(ARCHIVES))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+import tempfile
+import unittest
+from unittest import mock
+
+import cv2
+import numpy as np
+
+from bbbc_datasets.utils.evaluation import (
+    InstanceOverlap,
+    evaluate_dataset,
+    evaluate_instances,
+)
+from bbbc_datasets.utils.sample_index import image_key
+from tests.synthetic import make_synthetic_dataset
+
+
+def random_instances(rng, shape=(96, 128), num=25):
+    label = np.zeros(shape, dtype=np.uint16)
+    for i in range(num):
+        y, x = rng.integers(8, np.array(shape) - 8)
+        cv2.circle(label, (int(x), int(y)), int(rng.integers(3, 8)), i + 1, -1)
+    return label
+
+
+class TestEvaluation(unittest.TestCase):
+    """Test case to check vectorized instance matching and scoring."""
+
+    def test_matches_reference(self):
+        """Overlaps and greedy matches equal a per-object reference computation."""
+        rng = np.random.default_rng(0)
+        y_true = random_instances(rng)
+        y_pred = np.roll(y_true, 2, axis=1)
+        y_pred[y_pred % 5 == 0] = 0
+
+        overlap = InstanceOverlap(y_true, y_pred)
+        pairs = []
+        for i, t in enumerate(overlap.true_ids):
+            for j, p in enumerate(overlap.pred_ids):
+                a, b = y_true == t, y_pred == p
+                if (a & b).any():
+                    pairs.append(((a & b).sum() / (a | b).sum(), i, j))
+        iou = dict(((i, j), v) for v, i, j in pairs)
+        for i, j, v in zip(overlap.rows, overlap.cols, overlap.iou):
+            self.assertAlmostEqual(v, iou.pop((i, j)))
+        self.assertFalse(iou)
+
+        used_true, used_pred, matched = set(), set(), []
+        for v, i, j in sorted(pairs, reverse=True):
+            if i not in used_true and j not in used_pred:
+                used_true.add(i)
+                used_pred.add(j)
+                matched.append(v)
+
+        thresholds = (0.1, 0.5, 0.75)
+        scores = evaluate_instances(y_true, y_pred, thresholds)
+        expected = [sum(v >= t for v in matched) for t in thresholds]
+        self.assertEqual(list(scores["tp"]), expected)
+        self.assertEqual(list(scores["fn"]), [overlap.n_true - tp for tp in expected])
+
+    def test_label_types_and_sparse_pairs(self):
+        """Label values and dtypes do not change the result, nor do many labels."""
+        rng = np.random.default_rng(1)
+        y_true = random_instances(rng)
+        y_pred = np.roll(y_true, 1, axis=0)
+        expected = evaluate_instances(y_true, y_pred)
+        relabelled = evaluate_instances(
+            y_true.astype(np.int64) * 100_003 - 7 * (y_true > 0),
+            y_pred.astype(np.float32),
+        )
+        np.testing.assert_allclose(
+            relabelled[["tp", "ap", "f1"]], expected[["tp", "ap", "f1"]]
+        )
+
+        # More label pairs than pixels (and the dense limit) are counted sparsely
+        y_true = np.arange(1, 101).reshape(10, 10)
+        y_pred = (y_true + 1) // 2  # Every prediction covers two true objects
+        with mock.patch("bbbc_datasets.utils.evaluation.MAX_DENSE_PAIRS", 0):
+            scores = evaluate_instances(y_true, y_pred, thresholds=(0.5, 0.6))
+        self.assertEqual(list(scores["tp"]), [50, 0])
+        self.assertEqual(list(scores["fn"]), [50, 100])
+
+    def test_volumes(self):
+        """3D objects are matched as a whole, and empty labels score 1."""
+        y_true = np.zeros((6, 16, 16), dtype=np.uint8)
+        y_true[1:5, 2:8, 2:8] = 1
+        y_true[0:3, 10:14, 10:14] = 2
+        y_pred = np.zeros_like(y_true)
+        y_pred[2:5, 2:8, 2:8] = 4  # Misses one slice of object 1
+
+        scores = evaluate_instances(y_true, y_pred, thresholds=(0.5, 0.8))
+        self.assertEqual(list(scores["tp"]), [1, 0])
+        self.assertEqual(list(scores["fn"]), [1, 2])
+        self.assertAlmostEqual(scores["ap"][0], 0.5)
+        self.assertAlmostEqual(scores["mean_matched_iou"][0], 0.75)
+
+        empty = evaluate_instances(np.zeros((4, 4)), np.zeros((4, 4)))
+        self.assertTrue((empty["ap"] == 1).all())
+
+    def test_dataset_evaluation(self):
+        """A dataset is scored from its labels; images without predictions are skipped."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            dataset = make_synthetic_dataset(tmp_dir, num_images=4)
+            image_paths = sorted(dataset.get_image_paths())
+            predictions = {
+                image_key(path): dataset.get_label(path) for path in image_paths[1:]
+            }
+            predictions[image_key(image_paths[3])][
+                predictions[image_key(image_paths[3])] == 4
+            ] = 0
+
+            result = evaluate_dataset(
+                dataset, predictions, thresholds=(0.5, 0.9), workers=2
+            )
+            self.assertEqual(len(result.table), 6)
+            summary = result.summary()
+            self.assertEqual(list(summary["tp"]), [8, 8])
+            self.assertEqual(list(summary["fn"]), [1, 1])
+            self.assertAlmostEqual(summary["recall"][0], 8 / 9)
+            self.assertAlmostEqual(result.mean_ap, (1 + 1 + 3 / 4) / 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
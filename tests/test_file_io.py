@@ -0,0 +1,115 @@
+import os
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+import tifffile as tiff
+
+import diplib as dip
+
+from bbbc_datasets.utils.file_io import (
+    ImageLoadError,
+    load_image,
+    load_images,
+    probe,
+)
+
+
+class TestLoadImages(unittest.TestCase):
+    """Test case to check batched, multi-threaded image loading."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        rng = np.random.default_rng(0)
+        self.images = []
+        self.paths = []
+        for i in range(6):
+            image = rng.integers(0, 65535, size=(16, 24), dtype=np.uint16)
+            path = os.path.join(
+                self.tmp_dir.name, f"img_{i}.{'tif' if i % 2 else 'png'}"
+            )
+            if path.endswith(".tif"):
+                tiff.imwrite(path, image)
+            else:
+                cv2.imwrite(path, image)
+            self.images.append(image)
+            self.paths.append(path)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_uniform_batch_is_stacked(self):
+        """Uniformly shaped images are returned as one array in input order."""
+        batch = load_images(self.paths, workers=3)
+        self.assertIsInstance(batch, np.ndarray)
+        np.testing.assert_array_equal(batch, np.stack(self.images))
+
+    def test_preallocated_output(self):
+        """Images are decoded into a caller-provided array."""
+        out = np.zeros((len(self.paths), 16, 24), dtype=np.uint16)
+        batch = load_images(self.paths, out=out)
+        self.assertIs(batch, out)
+        np.testing.assert_array_equal(out, np.stack(self.images))
+
+    def test_mixed_shapes(self):
+        """Images that do not match the batch shape are returned as a list."""
+        path = os.path.join(self.tmp_dir.name, "large.tif")
+        tiff.imwrite(
+            path, np.ones((3, 16, 24), dtype=np.uint16), photometric="minisblack"
+        )
+        batch = load_images(self.paths + [path])
+        self.assertIsInstance(batch, list)
+        self.assertEqual(batch[-1].shape, (3, 16, 24))
+        np.testing.assert_array_equal(batch[2], self.images[2])
+
+    def test_errors_per_item(self):
+        """Failures are reported per item, or returned as None when ignored."""
+        paths = list(self.paths)
+        paths[3] = os.path.join(self.tmp_dir.name, "missing.png")
+
+        with self.assertRaises(ImageLoadError) as ctx:
+            load_images(paths)
+        self.assertEqual(list(ctx.exception.errors), [3])
+
+        batch = load_images(paths, errors="ignore")
+        self.assertIsNone(batch[3])
+        np.testing.assert_array_equal(batch[4], load_image(self.paths[4]))
+
+
+class TestProbe(unittest.TestCase):
+    """Test case to check that header probing matches the decoded images."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def check_probe(self, name, write, channels=1, pages=1):
+        path = os.path.join(self.tmp_dir.name, name)
+        write(path)
+        info = probe(path)
+        image = load_image(path)
+        self.assertEqual(info.shape, image.shape)
+        self.assertEqual(info.dtype, image.dtype)
+        self.assertEqual(info.channels, channels)
+        self.assertEqual(info.pages, pages)
+
+    def test_probe_formats(self):
+        """PNG, JPEG, TIFF and ICS headers report the decoded shape and dtype."""
+        gray16 = np.arange(20 * 30, dtype=np.uint16).reshape(20, 30)
+        rgb = np.zeros((20, 30, 3), dtype=np.uint8)
+        stack = np.zeros((5, 20, 30), dtype=np.uint16)
+
+        self.check_probe("gray16.png", lambda p: cv2.imwrite(p, gray16))
+        self.check_probe("rgb.png", lambda p: cv2.imwrite(p, rgb), channels=3)
+        self.check_probe("rgb.jpg", lambda p: cv2.imwrite(p, rgb), channels=3)
+        self.check_probe("stack.tif", lambda p: tiff.imwrite(p, stack), pages=5)
+        self.check_probe(
+            "stack.ics", lambda p: dip.ImageWriteICS(dip.Image(stack), p), pages=5
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+import os
+import tempfile
+import unittest
+from collections import deque
+from unittest import mock
+
+import numpy as np
+
+from bbbc_datasets.utils.instances import decode_rgb_instances, label_components
+from tests.synthetic import SyntheticDataset, make_synthetic_dataset
+
+
+class ForegroundDataset(SyntheticDataset):
+    """Synthetic dataset whose label masks are treated as foreground masks."""
+
+    INSTANCE_MODE = "components"
+
+
+def flood_fill_3d(mask):
+    """Reference labelling: 8-connected within a slice, 6-connected along z."""
+    labels = np.zeros(mask.shape, dtype=np.int64)
+    steps = [(0, dy, dx) for dy in (-1, 0, 1) for dx in (-1, 0, 1)] + [
+        (-1, 0, 0),
+        (1, 0, 0),
+    ]
+    num = 0
+    for start in zip(*np.nonzero(mask)):
+        if labels[start]:
+            continue
+        num += 1
+        labels[start] = num
+        queue = deque([start])
+        while queue:
+            z, y, x = queue.popleft()
+            for dz, dy, dx in steps:
+                n = (z + dz, y + dy, x + dx)
+                if all(0 <= c < s for c, s in zip(n, mask.shape)):
+                    if mask[n] and not labels[n]:
+                        labels[n] = num
+                        queue.append(n)
+    return labels
+
+
+def same_partition(a, b):
+    """Checks that two label maps describe the same objects (up to renumbering)."""
+    pairs = np.unique(np.stack([a.ravel(), b.ravel()]), axis=1)
+    return len(pairs[0]) == len(np.unique(a)) == len(np.unique(b))
+
+
+class TestInstances(unittest.TestCase):
+    """Test case to check the conversion of labels into instance maps."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_components_2d(self):
+        """Separate foreground blobs get consecutive labels."""
+        mask = np.zeros((10, 10), dtype=np.uint8)
+        mask[1:3, 1:3] = 255
+        mask[3, 3] = 255  # Diagonal neighbour of the first blob
+        mask[6:9, 5:9] = 255
+        labels = label_components(mask)
+        self.assertEqual(labels.dtype, np.uint16)
+        self.assertEqual(labels.max(), 2)
+        self.assertEqual(labels[3, 3], labels[1, 1])
+
+    def test_components_3d(self):
+        """Slice labels that touch along z are merged, also through several slices."""
+        rng = np.random.default_rng(0)
+        mask = rng.random((6, 12, 12)) > 0.7
+        # A U-shaped object whose arms only connect in the last slice
+        mask[:, 0, :] = False
+        mask[0:4, 0, 0] = True
+        mask[0:4, 0, 11] = True
+        mask[3, 0, :] = True
+
+        labels = label_components(mask)
+        reference = flood_fill_3d(mask)
+        self.assertEqual(labels.max(), reference.max())
+        self.assertTrue(same_partition(labels, reference))
+        self.assertEqual(labels[0, 0, 0], labels[0, 0, 11])
+
+    def test_rgb_decoding(self):
+        """Touching colors are separate objects, as are distant objects of one color."""
+        mask = np.zeros((8, 12, 3), dtype=np.uint8)
+        mask[1:4, 1:4] = (255, 0, 0)
+        mask[1:4, 4:7] = (0, 255, 0)
+        mask[5:7, 9:11] = (255, 0, 0)
+        labels = decode_rgb_instances(mask)
+        self.assertEqual(labels.max(), 3)
+        self.assertEqual(len({labels[2, 2], labels[2, 5], labels[6, 10]}), 3)
+
+    def test_rgb_decoding_many_colors(self):
+        """Every color region is labelled like a per-color flood fill."""
+        rng = np.random.default_rng(3)
+        mask = rng.integers(0, 700, size=(48, 64)).astype(np.int64)
+        mask = np.kron(mask[::4, ::4], np.ones((4, 4), dtype=np.int64))
+        mask[rng.random(mask.shape) < 0.2] = 0
+        mask[:, :6] = 5  # One color in several distant places
+        rgb = np.stack([mask & 255, mask >> 8, np.zeros_like(mask)], axis=-1)
+
+        labels = decode_rgb_instances(rgb.astype(np.uint8))
+        reference = np.zeros(mask.shape, dtype=np.int64)
+        for code in np.unique(mask[mask > 0]):
+            color_labels = flood_fill_3d((mask == code)[None])[0]
+            inside = color_labels > 0
+            reference[inside] = color_labels[inside] + reference.max()
+        self.assertEqual(labels.max(), reference.max())
+        self.assertTrue(same_partition(labels, reference))
+
+    def test_cached_instance_labels(self):
+        """Instance maps are converted in a process pool and read back from the cache."""
+        make_synthetic_dataset(self.tmp_dir.name, num_images=3)
+        dataset = ForegroundDataset(download_dir=self.tmp_dir.name)
+        image_paths = sorted(dataset.get_image_paths())
+
+        self.assertEqual(dataset.build_instance_labels(workers=2), 3)
+        for i, image_path in enumerate(image_paths):
+            self.assertTrue(os.path.exists(dataset._instance_file(image_path)))
+            with mock.patch(
+                "bbbc_datasets.datasets.base_dataset.to_instances",
+                side_effect=AssertionError,
+            ):
+                labels = dataset.get_label(image_path, kind="instance")
+            self.assertEqual(labels.max(), i + 1)
+            self.assertTrue(same_partition(labels, dataset.get_label(image_path)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from tests.synthetic import SyntheticDataset, make_synthetic_dataset
+
+
+class KeyedDataset(SyntheticDataset):
+    """Synthetic dataset with a declared metadata key column and dtype."""
+
+    METADATA_KEY_COLUMNS = {"counts.csv": "image"}
+    METADATA_DTYPES = {"counts.csv": {"count": "float32"}}
+
+
+class TestMetadata(unittest.TestCase):
+    """Test case to check typed, cached metadata tables and their join."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        make_synthetic_dataset(self.tmp_dir.name, num_images=4)
+        self.metadata_dir = os.path.join(self.tmp_dir.name, "SYNTHETIC", "metadata")
+        with open(os.path.join(self.metadata_dir, "results.csv"), "w") as f:
+            f.write("Image_FileName,Cells,Plate\n")
+            for i in range(3):
+                f.write(f"img_{i:03d}.png,{10 * i},{'P1' if i < 2 else ''}\n")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_typed_tables(self):
+        """Columns get compact or declared dtypes and text columns stay strings."""
+        tables = KeyedDataset(download_dir=self.tmp_dir.name).get_metadata()
+        self.assertEqual(sorted(tables), ["counts.csv", "results.csv"])
+        self.assertEqual(tables["results.csv"]["Cells"].dtype, np.int8)
+        self.assertEqual(list(tables["results.csv"]["Plate"]), ["P1", "P1", ""])
+        self.assertEqual(tables["counts.csv"]["count"].dtype, np.float32)
+
+    def test_cached_tables(self):
+        """Reloading reads the column cache and re-parses only changed files."""
+        SyntheticDataset(download_dir=self.tmp_dir.name).get_metadata()
+        with mock.patch(
+            "bbbc_datasets.utils.metadata.pd.read_csv", side_effect=AssertionError
+        ):
+            tables = SyntheticDataset(download_dir=self.tmp_dir.name).get_metadata()
+        self.assertEqual(tables["results.csv"]["Cells"].dtype, np.int8)
+
+        with open(os.path.join(self.metadata_dir, "results.csv"), "a") as f:
+            f.write("img_003.png,1000,P2\n")
+        tables = SyntheticDataset(download_dir=self.tmp_dir.name).get_metadata()
+        self.assertEqual(len(tables["results.csv"]), 4)
+        self.assertEqual(tables["results.csv"]["Cells"].dtype, np.int16)
+
+    def test_join_on_index(self):
+        """Metadata columns are joined onto the sample index by image key."""
+        dataset = KeyedDataset(download_dir=self.tmp_dir.name)
+        table = dataset.get_sample_index().table
+        np.testing.assert_array_equal(table["Cells"], [0, 10, 20, np.nan])
+        self.assertEqual(list(table["Plate"]), ["P1", "P1", "", ""])
+        self.assertEqual(list(table["count"]), [1.0, 2.0, 3.0, 4.0])
+        self.assertEqual(
+            len(dataset.get_sample_index().select(Cells__ge=10, Plate="P1")), 1
+        )
+        self.assertEqual(len(dataset.get_sample_index().select(Cells__lt=100)), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+from functools import partial
+
+from torch.utils.data import DataLoader
+
+from bbbc_datasets.dataset_manager import BBBCDataset, DatasetManager, MixtureDataset
+from tests.synthetic import SyntheticDataset, make_synthetic_dataset
+
+
+class TestMixtureDataset(unittest.TestCase):
+    """Test case to check weighted, lazily instantiated dataset mixtures."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.factories = {}
+        for name, shape in (("small", (16, 24)), ("large", (32, 48))):
+            root = os.path.join(self.tmp_dir.name, name)
+            make_synthetic_dataset(root, num_images=3, shape=shape)
+            self.factories[name] = partial(
+                BBBCDataset, SyntheticDataset, dataset_kwargs={"download_dir": root}
+            )
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_weighted_lazy_sampling(self):
+        """Sources are created on first use and drawn according to their weights."""
+        mixture = MixtureDataset(
+            self.factories,
+            {"small": 3.0, "large": 1.0},
+            num_samples=400,
+            return_source=True,
+        )
+        self.assertEqual(mixture._sources, {})
+
+        counts = {"small": 0, "large": 0}
+        for idx in range(len(mixture)):
+            image, label, name = mixture[idx]
+            expected = (16, 24) if name == "small" else (32, 48)
+            self.assertEqual(tuple(image.shape[1:]), expected)
+            self.assertEqual(tuple(label.shape), expected)
+            counts[name] += 1
+
+        self.assertAlmostEqual(counts["small"] / 400, 0.75, delta=0.07)
+        throughput = mixture.throughput()
+        self.assertEqual(throughput["small"]["samples"], counts["small"])
+        self.assertGreater(throughput["large"]["samples_per_sec"], 0)
+
+    def test_counters_are_shared_with_workers(self):
+        """Samples loaded in DataLoader workers are counted in the main process."""
+        mixture = MixtureDataset(
+            self.factories, {"small": 1.0, "large": 1.0}, num_samples=20
+        )
+        loader = DataLoader(mixture, batch_size=4, num_workers=2, collate_fn=list)
+        self.assertEqual(sum(len(batch) for batch in loader), 20)
+
+        throughput = mixture.throughput()
+        self.assertEqual(sum(t["samples"] for t in throughput.values()), 20)
+        self.assertEqual(mixture._sources, {})
+
+    def test_get_mixture(self):
+        """The manager builds mixtures by name without instantiating any dataset."""
+        mixture = DatasetManager.get_mixture(
+            {"BBBC004": 1.0, "BBBC039": (3.0, {})}, num_samples=10
+        )
+        self.assertEqual(mixture.names, ["BBBC004", "BBBC039"])
+        self.assertEqual(list(mixture.weights), [0.25, 0.75])
+        self.assertEqual(mixture._sources, {})
+
+        with self.assertRaises(ValueError):
+            DatasetManager.get_mixture({"BBBC999": 1.0}, num_samples=10)
+        with self.assertRaises(ValueError):  # Summing lengths would build every source
+            DatasetManager.get_mixture({"BBBC004": 1.0}, num_samples=None)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import cv2
+import numpy as np
+
+from bbbc_datasets.utils.file_io import load_image
+from bbbc_datasets.utils.pack import PackReader, is_packed, pack_dataset
+from tests.synthetic import SyntheticDataset, make_synthetic_dataset
+
+
+class TestPack(unittest.TestCase):
+    """Test case to check that packed datasets round-trip images, labels and metadata."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dataset = make_synthetic_dataset(self.tmp_dir.name)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def check_pack(self, reader):
+        image_paths = sorted(self.dataset.get_image_paths())
+        self.assertEqual(len(reader), len(image_paths))
+
+        for image_path in image_paths:
+            idx = reader.index_of(image_path)
+            np.testing.assert_array_equal(reader.get_image(idx), load_image(image_path))
+            np.testing.assert_array_equal(
+                reader.get_label(idx), self.dataset.get_label(image_path)
+            )
+
+        metadata = [os.path.basename(p) for p in reader.get_metadata_paths()]
+        self.assertEqual(metadata, ["counts.csv"])
+
+    def test_uncompressed_pack_is_zero_copy(self):
+        """Uncompressed samples are read-only views into the memory-mapped shards."""
+        reader = pack_dataset(self.dataset, shard_size=4096, workers=2)
+        self.check_pack(reader)
+        self.assertGreater(len(reader.meta["shards"]), 1)
+
+        image = reader.get_image(0)
+        self.assertFalse(image.flags.writeable)
+        self.assertFalse(image.flags.owndata)
+
+    def test_compressed_pack(self):
+        """zlib-compressed packs decode to the same arrays."""
+        out_dir = os.path.join(self.tmp_dir.name, "packed_zlib")
+        reader = pack_dataset(self.dataset, out_dir=out_dir, compression="zlib")
+        self.assertTrue(is_packed(out_dir))
+        self.check_pack(PackReader(out_dir))
+        self.assertEqual(reader.compression, "zlib")
+
+    def test_stale_and_failed_packs(self):
+        """Packs are rebuilt after the images change, and failed builds leave nothing."""
+        out_dir = os.path.join(self.tmp_dir.name, "packed_stale")
+        reader = pack_dataset(self.dataset, out_dir=out_dir)
+        with mock.patch("bbbc_datasets.utils.pack.PackWriter") as writer:
+            pack_dataset(self.dataset, out_dir=out_dir)
+        writer.assert_not_called()
+
+        image_path = sorted(self.dataset.get_image_paths())[0]
+        cv2.imwrite(f"{image_path}.new.png", np.full((8, 8), 7, dtype=np.uint16))
+        os.replace(f"{image_path}.new.png", image_path)
+        self.dataset = SyntheticDataset(download_dir=self.tmp_dir.name)
+        rebuilt = pack_dataset(self.dataset, out_dir=out_dir)
+        self.assertNotEqual(
+            rebuilt.meta["source_version"], reader.meta["source_version"]
+        )
+        self.check_pack(rebuilt)
+
+        failed_dir = os.path.join(self.tmp_dir.name, "packed_failed")
+        with mock.patch.object(
+            self.dataset, "get_label", side_effect=RuntimeError("broken label")
+        ):
+            with self.assertRaises(RuntimeError):
+                pack_dataset(self.dataset, out_dir=failed_dir)
+        self.assertFalse(os.path.exists(failed_dir))
+
+
+if __name__ == "__main__":
+    unittest.main()
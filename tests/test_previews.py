@@ -0,0 +1,80 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from bbbc_datasets.utils.file_io import load_image
+from bbbc_datasets.utils.previews import (
+    build_previews,
+    get_preview,
+    pyramid_levels,
+    to_plane,
+    to_uint8,
+)
+from tests.synthetic import SyntheticDataset, make_synthetic_dataset
+
+
+class TestPreviews(unittest.TestCase):
+    """Test case to check the multi-resolution preview cache."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dataset = make_synthetic_dataset(self.tmp_dir.name, num_images=3)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_preview_pyramid(self):
+        """Levels halve the resolution, and labels keep their instance values."""
+        previews = build_previews(self.dataset, levels=2, thumbnail_size=24, workers=2)
+        image_path = self.dataset.get_sample_index().image_paths[2]
+
+        def preview(**kwargs):
+            return get_preview(self.dataset, image_path, previews=previews, **kwargs)
+
+        thumbnail = preview()
+        self.assertEqual(thumbnail.shape, (16, 24))
+        self.assertEqual(thumbnail.dtype, np.uint8)
+        self.assertEqual(preview(level=1).shape, (16, 24))
+        self.assertEqual(preview(level=2).shape, (8, 12))
+
+        label = preview(level=1, kind="label")
+        full_label = self.dataset.get_label(image_path)
+        np.testing.assert_array_equal(label, full_label[::2, ::2])
+        self.assertEqual(set(np.unique(label)), {0, 1, 2, 3})
+        with self.assertRaises(KeyError):
+            preview(level=3)
+
+    def test_served_from_cache(self):
+        """A new dataset instance serves cached previews without decoding images."""
+        build_previews(self.dataset)
+        image_path = self.dataset.get_sample_index().image_paths[0]
+        expected = to_uint8(load_image(image_path))
+
+        dataset = SyntheticDataset(download_dir=self.tmp_dir.name)
+        with mock.patch(
+            "bbbc_datasets.utils.pack.load_image", side_effect=AssertionError
+        ):
+            thumbnail = get_preview(dataset, image_path)
+        np.testing.assert_array_equal(thumbnail, expected)
+
+        cache_dir = dataset.get_cache_dir("previews")
+        self.assertEqual(len(os.listdir(cache_dir)), 1)
+
+    def test_projection(self):
+        """3D stacks are reduced by maximum projection or to their middle slice."""
+        stack = np.arange(5 * 4 * 6, dtype=np.uint16).reshape(5, 4, 6)
+        np.testing.assert_array_equal(to_plane(stack), stack[-1])
+        np.testing.assert_array_equal(to_plane(stack, "middle"), stack[2])
+        rgb = np.zeros((4, 6, 3), dtype=np.uint8)
+        self.assertEqual(to_plane(rgb).shape, (4, 6, 3))
+
+        levels = pyramid_levels(np.ones((100, 60), dtype=np.uint8), 2, 50)
+        self.assertEqual(levels["2"].shape, (25, 15))
+        self.assertEqual(levels["thumbnail"].shape, (50, 30))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import cv2
+import numpy as np
+
+from bbbc_datasets.dataset_manager import BBBCDataset
+from bbbc_datasets.utils.pack import is_packed
+from bbbc_datasets.utils.resize import resize_array
+from tests.synthetic import SyntheticDataset, make_synthetic_dataset
+
+
+class TestResize(unittest.TestCase):
+    """Test case to check fixed-size resizing and the materialized dataset copy."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.source = make_synthetic_dataset(self.tmp_dir.name, num_images=4)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_resize_array(self):
+        """Stacks are resized per axis like slice-wise cv2, labels keep their ids."""
+        rng = np.random.default_rng(0)
+        stack = rng.integers(0, 4096, size=(8, 32, 48), dtype=np.uint16)
+        resized = resize_array(stack, (4, 16, 24), "area", spatial_dims=3)
+        self.assertEqual(resized.dtype, np.uint16)
+
+        slices = np.stack(
+            [cv2.resize(s, (24, 16), interpolation=cv2.INTER_AREA) for s in stack]
+        ).astype(np.float64)
+        expected = (slices[0::2] + slices[1::2]) / 2
+        self.assertLessEqual(np.abs(resized - expected).max(), 1)
+
+        label = rng.integers(0, 100_000, size=(16, 24), dtype=np.int32)
+        upsampled = resize_array(label, 2 * np.array(label.shape), label=True)
+        np.testing.assert_array_equal(upsampled[::2, ::2], label)
+        self.assertEqual(resize_array(stack, (16, 16), spatial_dims=3).shape[0], 8)
+
+    def test_materialized_dataset(self):
+        """BBBCDataset reads resized samples from the cached copy."""
+        kwargs = {"download_dir": self.tmp_dir.name}
+        materialize = {"size": (16, 24), "interpolation": "area"}
+        dataset = BBBCDataset(
+            SyntheticDataset, dataset_kwargs=kwargs, materialize=materialize
+        )
+        self.assertEqual(dataset.get_shapes(), [(16, 24)] * 4)
+
+        image_path = str(dataset.image_paths[3])
+        image, label = dataset[3]
+        self.assertEqual(tuple(image.shape), (1, 16, 24))
+        np.testing.assert_array_equal(
+            label.numpy(), self.source.get_label(image_path)[1::2, 1::2]
+        )
+        pack_dir = os.path.join(self.source.get_cache_dir("materialized"), "16x24_area")
+        self.assertTrue(is_packed(pack_dir))
+
+        # A second dataset reuses the copy without decoding the originals
+        with mock.patch("bbbc_datasets.utils.pack.load_image", side_effect=OSError):
+            cached = BBBCDataset(
+                SyntheticDataset, dataset_kwargs=kwargs, materialize=materialize
+            )
+            np.testing.assert_array_equal(cached[3][0].numpy(), image.numpy())
+
+        with self.assertRaises(ValueError):
+            BBBCDataset(
+                SyntheticDataset,
+                dataset_kwargs=kwargs,
+                materialize=materialize,
+                cache=True,
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+import importlib.util
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from bbbc_datasets.utils.rle import (
+    export_rle,
+    read_rle,
+    rle_decode,
+    rle_decode_instances,
+    rle_encode,
+    rle_encode_instances,
+)
+from tests.synthetic import SyntheticDataset, make_synthetic_dataset
+
+
+def reference_encode(mask):
+    """Per-pixel Kaggle encoder used as the reference."""
+    runs, start = [], None
+    pixels = list(np.asarray(mask).flatten(order="F") != 0) + [False]
+    for i, value in enumerate(pixels):
+        if value and start is None:
+            start = i
+        elif not value and start is not None:
+            runs += [start + 1, i - start]
+            start = None
+    return " ".join(map(str, runs))
+
+
+class TestRLE(unittest.TestCase):
+    """Test case to check run-length encoding and the bulk export."""
+
+    def test_kaggle_format(self):
+        """Runs are 1-based and column-major, and decoding inverts encoding."""
+        mask = np.zeros((3, 4), dtype=np.uint8)
+        mask[1:, 0] = 1
+        mask[0, 1] = 1
+        mask[:, 3] = 1
+        self.assertEqual(rle_encode(mask), "2 3 10 3")
+        np.testing.assert_array_equal(rle_decode("2 3 10 3", mask.shape), mask)
+        self.assertEqual(rle_encode(np.zeros((2, 2))), "")
+
+        rng = np.random.default_rng(0)
+        for _ in range(5):
+            mask = rng.random((17, 23)) > 0.6
+            self.assertEqual(rle_encode(mask), reference_encode(mask))
+
+    def test_instance_round_trip(self):
+        """All instances are encoded in one pass and decoded back into the label map."""
+        rng = np.random.default_rng(1)
+        label = rng.integers(0, 6, size=(31, 29)).astype(np.uint16) * 100
+        encoded = rle_encode_instances(label)
+        self.assertEqual(list(encoded), [100, 200, 300, 400, 500])
+        for value, rle in encoded.items():
+            self.assertEqual(rle, reference_encode(label == value))
+
+        decoded = rle_decode_instances(
+            encoded.values(), label.shape, values=list(encoded)
+        )
+        self.assertEqual(decoded.dtype, np.uint16)
+        np.testing.assert_array_equal(decoded, label)
+
+        with self.assertRaises(ValueError):
+            rle_decode("900 5", label.shape)
+
+    def test_export_matches_csv_ground_truth(self):
+        """Exported instance labels are read back through the CSV ground-truth path."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            dataset = make_synthetic_dataset(tmp_dir, num_images=3)
+            csv_path = os.path.join(tmp_dir, "labels.csv")
+            self.assertEqual(export_rle(dataset, csv_path, workers=2), 1 + 2 + 3)
+
+            table = pd.read_csv(csv_path)
+            self.assertEqual(
+                list(table.columns), ["ImageId", "EncodedPixels", "Height", "Width"]
+            )
+            self.assertEqual(len(read_rle(csv_path)["img_002"]), 3)
+
+            from_csv = SyntheticDataset(download_dir=tmp_dir)
+            from_csv.ground_truth = csv_path
+            for image_path in dataset.get_image_paths():
+                np.testing.assert_array_equal(
+                    from_csv.get_label(image_path), dataset.get_label(image_path)
+                )
+
+    def test_export_failure_and_numeric_ids(self):
+        """A failed export leaves no files behind, and numeric image ids stay strings."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            dataset = make_synthetic_dataset(tmp_dir, num_images=3)
+            csv_path = os.path.join(tmp_dir, "labels.csv")
+            with mock.patch.object(
+                dataset, "get_label", side_effect=RuntimeError("broken label")
+            ):
+                with self.assertRaises(RuntimeError):
+                    export_rle(dataset, csv_path)
+            self.assertFalse(os.path.exists(csv_path))
+            self.assertFalse(os.path.exists(f"{csv_path}.tmp"))
+
+            with open(csv_path, "w") as f:
+                f.write("ImageId,EncodedPixels,Height,Width\n001,1 2,4,4\n")
+            self.assertEqual(read_rle(csv_path), {"001": ["1 2"]})
+
+    @unittest.skipUnless(importlib.util.find_spec("pyarrow"), "pyarrow not installed")
+    def test_parquet_export(self):
+        """Parquet exports hold the same rows as CSV exports."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            dataset = make_synthetic_dataset(tmp_dir, num_images=3)
+            export_rle(dataset, os.path.join(tmp_dir, "labels.csv"))
+            export_rle(dataset, os.path.join(tmp_dir, "labels.parquet"))
+            self.assertEqual(
+                read_rle(os.path.join(tmp_dir, "labels.csv")),
+                read_rle(os.path.join(tmp_dir, "labels.parquet")),
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
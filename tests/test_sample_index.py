@@ -0,0 +1,74 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import cv2
+import numpy as np
+
+from bbbc_datasets.utils.file_io import load_image
+from bbbc_datasets.utils.sample_index import SAMPLE_INDEX_FILE
+from tests.synthetic import SyntheticDataset, make_synthetic_dataset
+
+
+class TestSampleIndex(unittest.TestCase):
+    """Test case to check the cached sample index and its shape table."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dataset = make_synthetic_dataset(self.tmp_dir.name, shape=(24, 40))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_shape_table(self):
+        """The index lists every image with its probed shape and is cached on disk."""
+        index = self.dataset.get_sample_index()
+        self.assertEqual(
+            sorted(index.image_paths), sorted(self.dataset.get_image_paths())
+        )
+
+        for i, path in enumerate(index.image_paths):
+            self.assertEqual(index.shape(i), load_image(path).shape)
+        self.assertEqual(set(index.table["height"]), {24})
+        self.assertEqual(set(index.table["width"]), {40})
+        self.assertEqual(set(index.table["nbytes"]), {24 * 40 * 2})
+
+        self.assertTrue(
+            os.path.exists(
+                os.path.join(self.dataset.get_cache_dir(), SAMPLE_INDEX_FILE)
+            )
+        )
+        reloaded = SyntheticDataset(download_dir=self.tmp_dir.name).get_sample_index()
+        self.assertEqual(reloaded.version, index.version)
+        self.assertEqual(reloaded.shapes(), index.shapes())
+        self.assertEqual(list(reloaded.table["key"]), list(index.table["key"]))
+
+    def test_stale_cache(self):
+        """A cached index is rebuilt when images are added or rewritten."""
+        index = self.dataset.get_sample_index()
+
+        # Unchanged folders are trusted without touching every file
+        with mock.patch(
+            "bbbc_datasets.datasets.base_dataset.index_version",
+            side_effect=AssertionError,
+        ):
+            reloaded = SyntheticDataset(download_dir=self.tmp_dir.name)
+            self.assertEqual(reloaded.get_sample_index().version, index.version)
+
+        image_dir = os.path.join(self.tmp_dir.name, "SYNTHETIC", "images")
+        cv2.imwrite(os.path.join(image_dir, "img_000.png"), np.zeros((8, 8), np.uint16))
+        cv2.imwrite(
+            os.path.join(image_dir, "img_100.png"), np.zeros((24, 40), np.uint16)
+        )
+
+        reloaded = SyntheticDataset(download_dir=self.tmp_dir.name).get_sample_index()
+        self.assertNotEqual(reloaded.version, index.version)
+        self.assertEqual(len(reloaded), len(index) + 1)
+        self.assertEqual(
+            reloaded.shape(list(reloaded.table["key"]).index("img_000")), (8, 8)
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import io
+import os
+import tempfile
+import unittest
+import zipfile
+from unittest import mock
+
+import numpy as np
+import tifffile
+
+from bbbc_datasets.datasets.bbbc005 import BBBC005
+from bbbc_datasets.datasets.bbbc039 import BBBC039
+
+
+class TestSelect(unittest.TestCase):
+    """Test case to check parsed sample fields and subset queries."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def make_images(self, key, names):
+        image_dir = os.path.join(self.tmp_dir.name, key, "images")
+        os.makedirs(image_dir, exist_ok=True)
+        for name in names:
+            tifffile.imwrite(
+                os.path.join(image_dir, name), np.zeros((4, 6), dtype=np.uint8)
+            )
+
+    def test_filename_fields(self):
+        """Blur level and cell count are parsed from BBBC005 file names and queried."""
+        names = [
+            f"SIMCEPImages_A{count:02}_C{count}_F{blur}_s01_w1.TIF"
+            for count in (1, 14, 27)
+            for blur in (1, 4)
+        ]
+        self.make_images("BBBC005", names)
+        dataset = BBBC005(download_dir=self.tmp_dir.name, download_files=False)
+
+        table = dataset.get_sample_index().table
+        self.assertEqual(table["count"].dtype, np.int64)
+        self.assertEqual(sorted(set(table["blur"])), [1, 4])
+
+        subset = dataset.get_sample_index().select(blur=1, count__lt=20)
+        self.assertEqual(sorted(subset.table["count"]), [1, 14])
+        self.assertTrue(all("_F1_" in path for path in subset.image_paths))
+
+        self.assertEqual(len(dataset.get_sample_index().select(count__in=[1, 27])), 4)
+        self.assertEqual(
+            len(dataset.get_sample_index().select(blur__ne=1, count__ge=14)), 2
+        )
+        self.assertEqual(len(dataset.get_sample_index().select(well__contains="A1")), 2)
+        with self.assertRaises(KeyError):
+            dataset.get_sample_index().select(focus=1)
+
+    def test_metadata_fields(self):
+        """BBBC039 splits from the metadata file lists are joined on the image key."""
+        names = [f"IXMtest_A{i:02}_s1_w1ABC{i}.tif" for i in range(1, 5)]
+        self.make_images("BBBC039", names)
+        metadata_dir = os.path.join(
+            self.tmp_dir.name, "BBBC039", "metadata", "metadata"
+        )
+        os.makedirs(metadata_dir)
+        with open(os.path.join(metadata_dir, "training.txt"), "w") as f:
+            f.write("IXMtest_A01_s1_w1ABC1.png\nIXMtest_A02_s1_w1ABC2.png\n")
+        with open(os.path.join(metadata_dir, "test.txt"), "w") as f:
+            f.write("IXMtest_A03_s1_w1ABC3.png\n")
+
+        dataset = BBBC039(download_dir=self.tmp_dir.name, download_files=False)
+        self.assertEqual(len(dataset.get_sample_index().select(split="training")), 2)
+        self.assertEqual(
+            list(dataset.get_sample_index().select(split="test").table["well"]), ["A03"]
+        )
+        self.assertEqual(
+            len(dataset.get_sample_index().select(split="")), 1
+        )  # Not listed
+
+    def test_metadata_download(self):
+        """Metadata files are downloaded into the metadata folder, each one once."""
+
+        def fake_get(url, stream=True):
+            buffer = io.BytesIO()
+            if url.endswith(".zip"):
+                with zipfile.ZipFile(buffer, "w") as zf:
+                    zf.writestr(os.path.basename(url) + ".txt", "data")
+            else:
+                buffer.write(b"image,count\n")
+            response = mock.Mock(status_code=200, headers={})
+            response.iter_content.return_value = [buffer.getvalue()]
+            return response
+
+        with mock.patch(
+            "bbbc_datasets.datasets.base_dataset.requests.get", side_effect=fake_get
+        ) as get, mock.patch("builtins.print"):
+            dataset = BBBC005(download_dir=self.tmp_dir.name)
+            self.assertEqual(get.call_count, 3)
+            BBBC005(download_dir=self.tmp_dir.name)
+            self.assertEqual(get.call_count, 3)
+
+        self.assertEqual(
+            [os.path.basename(p) for p in dataset.get_metadata_paths()],
+            ["BBBC005_results_bray.csv"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import gc
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import tifffile
+
+from bbbc_datasets.utils.sequence import (
+    LazySequence,
+    SlidingWindowDataset,
+    group_sequences,
+)
+
+
+class TestSequences(unittest.TestCase):
+    """Test case to check lazy time-lapse sequences and sliding windows."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        rng = np.random.default_rng(0)
+        self.frames = {}
+        for name, num_frames in (("embryo_2", 12), ("embryo_10", 5)):
+            dir_path = os.path.join(self.tmp_dir.name, name)
+            os.makedirs(dir_path)
+            volumes = rng.integers(0, 1000, (num_frames, 4, 8, 10), dtype=np.uint16)
+            for t, volume in enumerate(volumes):
+                tifffile.imwrite(
+                    os.path.join(dir_path, f"t{t + 1}.tif"),
+                    volume,
+                    photometric="minisblack",
+                )
+            self.frames[dir_path] = volumes
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def get_sequences(self, read_ahead=2):
+        paths = [os.path.join(d, f) for d in self.frames for f in sorted(os.listdir(d))]
+        return {
+            d: LazySequence(frames, read_ahead=read_ahead)
+            for d, frames in group_sequences(paths).items()
+        }
+
+    def test_grouping_and_natural_sort(self):
+        """Frames are grouped by directory and sorted by their frame number."""
+        sequences = self.get_sequences()
+        self.assertEqual(
+            [os.path.basename(d) for d in sequences], ["embryo_2", "embryo_10"]
+        )
+        sequence = next(iter(sequences.values()))
+        self.assertEqual(
+            [os.path.basename(p) for p in sequence.frame_paths[:3]],
+            ["t1.tif", "t2.tif", "t3.tif"],
+        )
+        self.assertEqual(sequence.shape, (12, 4, 8, 10))
+
+    def test_lazy_indexing_and_read_ahead(self):
+        """Indexing decodes only the requested frames plus the read-ahead."""
+        directory, expected = next(iter(self.frames.items()))
+        sequence = self.get_sequences(read_ahead=2)[directory]
+        self.assertEqual(sequence.resident_frames, [])
+
+        np.testing.assert_array_equal(sequence[3:6], expected[3:6])
+        self.assertEqual(sorted(sequence.resident_frames), [3, 4, 5, 6, 7])
+
+        np.testing.assert_array_equal(sequence[8, 1], expected[8, 1])
+        self.assertEqual(sorted(sequence.resident_frames), [8, 9, 10])
+        np.testing.assert_array_equal(sequence[-1], expected[-1])
+        np.testing.assert_array_equal(sequence[0:12:4, :, 2], expected[0:12:4, :, 2])
+        sequence.close()
+
+    def test_read_ahead_pool_shutdown(self):
+        """The read-ahead pool is shut down on exit or once the sequence is collected."""
+        directory = next(iter(self.frames))
+        with self.get_sequences()[directory] as sequence:
+            sequence[0:2]
+            executor = sequence._executor
+        self.assertTrue(executor._shutdown)
+        self.assertEqual(sequence.resident_frames, [])
+
+        sequence = self.get_sequences()[directory]
+        sequence[0:2]
+        executor = sequence._executor
+        del sequence
+        gc.collect()
+        self.assertTrue(executor._shutdown)
+
+    def test_sliding_windows(self):
+        """Windows cover every sequence with the given length and stride."""
+        windows = SlidingWindowDataset(
+            self.get_sequences(), window=3, stride=2, normalize=None
+        )
+        self.assertEqual(len(windows), 5 + 2)
+
+        expected = list(self.frames.values())
+        image, label = windows[1]
+        self.assertIsNone(label)
+        self.assertEqual(tuple(image.shape), (1, 3, 4, 8, 10))
+        np.testing.assert_array_equal(image[0].numpy(), expected[0][2:5])
+        image, _ = windows[6]
+        np.testing.assert_array_equal(image[0].numpy(), expected[1][2:5])
+
+
+if __name__ == "__main__":
+    unittest.main()
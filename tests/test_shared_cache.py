@@ -0,0 +1,68 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import torch
+from torch.utils.data import DataLoader
+
+from bbbc_datasets.dataset_manager import BBBCDataset
+from bbbc_datasets.utils.shared_cache import SharedSampleCache
+from tests.synthetic import SyntheticDataset, make_synthetic_dataset
+
+
+class TestSharedSampleCache(unittest.TestCase):
+    """Test case to check the shared-memory sample cache."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        make_synthetic_dataset(self.tmp_dir.name, num_images=6)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_budget_and_round_trip(self):
+        """Samples beyond the byte budget are not cached; cached ones round-trip."""
+        shapes = [(8, 8), (16, 16), (8, 8)]
+        cache = SharedSampleCache(shapes, ["<u2"] * 3, max_bytes=2 * 8 * 8 * 2)
+        self.assertEqual(list(cache.offsets >= 0), [True, False, True])
+
+        data = np.arange(64, dtype=np.uint16).reshape(8, 8)
+        self.assertIsNone(cache.get(0))
+        view = cache.put(0, data)
+        np.testing.assert_array_equal(view, data)
+        self.assertFalse(view.flags.writeable)
+        self.assertIs(cache.put(1, np.zeros((16, 16), np.uint16)).base, None)
+        self.assertEqual(cache.num_ready(), 1)
+
+        cache.close()
+        self.assertFalse(os.path.exists(cache.path))
+
+    def test_workers_share_one_cache(self):
+        """Samples decoded in workers are visible to the main process."""
+        dataset = BBBCDataset(
+            SyntheticDataset,
+            dataset_kwargs={"download_dir": self.tmp_dir.name},
+            cache=True,
+        )
+        uncached = BBBCDataset(
+            SyntheticDataset, dataset_kwargs={"download_dir": self.tmp_dir.name}
+        )
+
+        loader = DataLoader(dataset, batch_size=2, num_workers=2, collate_fn=list)
+        self.assertEqual(sum(len(batch) for batch in loader), len(dataset))
+        self.assertEqual(dataset.cache.num_ready(), len(dataset))
+
+        for idx in range(len(dataset)):
+            image, label = dataset[idx]
+            expected, expected_label = uncached[idx]
+            torch.testing.assert_close(image, expected)
+            torch.testing.assert_close(label, expected_label)
+
+        path = dataset.cache.path
+        dataset.cache.close()
+        self.assertFalse(os.path.exists(path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from bbbc_datasets.utils.file_io import load_image
+from bbbc_datasets.utils.statistics import RunningMoments
+from tests.synthetic import make_synthetic_dataset
+
+
+class TestStatistics(unittest.TestCase):
+    """Test case to check the streaming dataset statistics engine."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dataset = make_synthetic_dataset(self.tmp_dir.name, num_images=5)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_dataset_statistics(self):
+        """Merged streaming statistics match a direct computation and are cached."""
+        stats = self.dataset.get_statistics(workers=3)
+
+        index = self.dataset.get_sample_index()
+        pixels = np.concatenate(
+            [load_image(p).reshape(-1) for p in index.image_paths]
+        ).astype(np.float64)
+
+        self.assertAlmostEqual(stats.mean, pixels.mean(), places=6)
+        self.assertAlmostEqual(stats.std, pixels.std(), places=6)
+        self.assertEqual(stats.moments.min, pixels.min())
+        self.assertEqual(stats.moments.max, pixels.max())
+        self.assertEqual(
+            stats.percentiles((1, 50, 99)),
+            tuple(np.percentile(pixels, (1, 50, 99), method="lower")),
+        )
+        self.assertEqual(list(stats.object_counts), [1, 2, 3, 4, 5])
+        self.assertEqual(stats.shape_counts, {(32, 48): 5})
+
+        stats_file = os.path.join(
+            self.dataset.get_cache_dir(), f"statistics_{index.version}.npz"
+        )
+        self.assertTrue(os.path.exists(stats_file))
+        cached = self.dataset.get_statistics()
+        self.assertAlmostEqual(cached.std, stats.std)
+        np.testing.assert_array_equal(cached.histogram.counts, stats.histogram.counts)
+
+    def test_moments_merge(self):
+        """Pairwise merged moments equal the moments of the concatenated data."""
+        rng = np.random.default_rng(0)
+        parts = [rng.normal(i, 1 + i, size=100 + 10 * i) for i in range(4)]
+        merged = RunningMoments()
+        for part in parts:
+            merged.merge(RunningMoments.from_array(part))
+
+        data = np.concatenate(parts)
+        self.assertAlmostEqual(merged.mean, data.mean())
+        self.assertAlmostEqual(merged.std, data.std())
+
+
+if __name__ == "__main__":
+    unittest.main()
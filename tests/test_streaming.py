@@ -0,0 +1,150 @@
+import io
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+import numpy as np
+
+from bbbc_datasets.utils.pack import pack_dataset
+from bbbc_datasets.utils.streaming import (
+    PackStreamDataset,
+    StreamLoader,
+    shuffle_buffer_order,
+    stream_dataset,
+)
+from tests.synthetic import make_synthetic_dataset
+
+
+class TestPackStreamDataset(unittest.TestCase):
+    """Test case to check sharded streaming, partitioning and resuming."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        dataset = make_synthetic_dataset(self.tmp_dir.name, num_images=12)
+        self.reader = pack_dataset(dataset, shard_size=8192)
+        self.images = {
+            self.reader.get_image(i).tobytes(): i for i in range(len(self.reader))
+        }
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def sample_ids(self, batches):
+        return [
+            self.images[image.numpy().tobytes()]
+            for images, _ in batches
+            for image in images[:, 0]
+        ]
+
+    def test_shuffle_buffer_is_bounded(self):
+        """Reading never runs more than `buffer_size` items ahead of emitting."""
+        order = shuffle_buffer_order(list(range(100)), 8, np.random.default_rng(0))
+        self.assertEqual(sorted(order), list(range(100)))
+        self.assertNotEqual(order, list(range(100)))
+        self.assertTrue(all(item - pos < 8 for pos, item in enumerate(order)))
+
+    def test_partition_by_rank_and_worker(self):
+        """Ranks and workers read disjoint blocks that cover the pack."""
+        self.assertGreater(len(self.reader.meta["shards"]), 1)
+
+        def consumed(epoch):
+            samples = []
+            for rank in range(2):
+                stream = PackStreamDataset(self.reader, rank=rank, world_size=2)
+                stream.set_epoch(epoch)
+                for worker_id in range(2):
+                    samples.append(stream.sample_order(worker_id, num_workers=2)[1])
+            return samples
+
+        samples = consumed(0)
+        self.assertEqual(sorted(sum(samples, [])), list(range(12)))
+        self.assertEqual(samples, consumed(0))
+        self.assertNotEqual(samples, consumed(1))
+
+    def test_resume_mid_epoch(self):
+        """A restored cursor continues exactly where the interrupted epoch stopped."""
+        for num_workers in (0, 2):
+            with self.subTest(num_workers=num_workers):
+
+                def make_loader():
+                    stream = PackStreamDataset(
+                        self.reader, shuffle_buffer=4, seed=3, normalize=None
+                    )
+                    return StreamLoader(stream, batch_size=2, num_workers=num_workers)
+
+                loader = make_loader()
+                loader.set_epoch(1)
+                full = self.sample_ids(loader)
+                self.assertEqual(sorted(full), list(range(12)))
+
+                loader = make_loader()
+                loader.set_epoch(1)
+                head = []
+                for batch in loader:
+                    head.append(batch)
+                    if len(head) == 3:
+                        break
+                state = loader.state_dict()
+
+                resumed = make_loader()
+                resumed.load_state_dict(state)
+                tail = self.sample_ids(resumed)
+                self.assertEqual(sorted(self.sample_ids(head) + tail), list(range(12)))
+                self.assertEqual(self.sample_ids(head) + tail, full)
+
+    def test_resume_partial_batches(self):
+        """Resuming works with a partial final batch and only for the resumed epoch."""
+        for num_workers in (0, 2):
+            with self.subTest(num_workers=num_workers):
+
+                def make_loader():
+                    stream = PackStreamDataset(
+                        self.reader, shuffle_buffer=4, seed=3, normalize=None
+                    )
+                    return StreamLoader(
+                        stream,
+                        batch_size=5,
+                        drop_last=False,
+                        num_workers=num_workers,
+                        persistent_workers=num_workers > 0,
+                    )
+
+                loader = make_loader()
+                loader.set_epoch(1)
+                full = self.sample_ids(loader)
+                self.assertEqual(sorted(full), list(range(12)))
+
+                loader = make_loader()
+                loader.set_epoch(1)
+                head = []
+                for batch in loader:
+                    head.append(batch)
+                    if len(head) == 3:  # Includes a partial batch
+                        break
+                self.assertLess(len(head[-1][0]), 5)
+
+                resumed = make_loader()
+                resumed.load_state_dict(loader.state_dict())
+                self.assertEqual(self.sample_ids(head) + self.sample_ids(resumed), full)
+
+                # The next pass of the same (persistent) workers is complete again
+                resumed.set_epoch(1)
+                self.assertEqual(self.sample_ids(resumed), full)
+
+    def test_shards_per_consumer(self):
+        """New stream packs get several shards per consumer; too few shards warn."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            dataset = make_synthetic_dataset(tmp_dir, num_images=12)
+            stream = stream_dataset(
+                dataset, num_workers=2, stream_kwargs={"world_size": 1}
+            )
+            self.assertGreaterEqual(len(stream.reader.meta["shards"]), 8)
+
+            output = io.StringIO()
+            with redirect_stdout(output):
+                stream_dataset(dataset, num_workers=2, stream_kwargs={"world_size": 8})
+            self.assertIn("Warning", output.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from bbbc_datasets.utils.file_io import load_image
+from bbbc_datasets.utils.pack import pack_dataset
+from bbbc_datasets.utils.tiling import TileDataset, TileIndex, tile_grid
+from tests.synthetic import make_synthetic_dataset
+
+
+class TestTiling(unittest.TestCase):
+    """Test case to check tile grids, the cached tile index and tile reads."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dataset = make_synthetic_dataset(self.tmp_dir.name, num_images=3)
+        self.reader = pack_dataset(self.dataset)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_tile_grid_covers_image(self):
+        """Tiles overlap as requested and the last tile is aligned to the border."""
+        origins = tile_grid((32, 48), (16, 16), overlap=4)
+        self.assertEqual(sorted(set(origins[:, 0])), [0, 12, 16])
+        self.assertEqual(sorted(set(origins[:, 1])), [0, 12, 24, 32])
+        self.assertEqual(tile_grid((10, 10), (16, 16)).tolist(), [[0, 0]])
+
+    def test_tiles_match_images(self):
+        """Tiles are read from the pack and the dataset length is the tile count."""
+        tiles = TileDataset(self.reader, tile_size=(16, 16), normalize=None)
+        self.assertEqual(len(tiles), 3 * 2 * 3)
+
+        for idx in range(len(tiles)):
+            sample, (y, x) = tiles.samples[idx], tiles.origins[idx]
+            image_path = str(self.reader.paths[sample])
+            expected = load_image(image_path)[y : y + 16, x : x + 16]
+            image, label = tiles[idx]
+            np.testing.assert_array_equal(image[0].numpy(), expected)
+            np.testing.assert_array_equal(
+                label.numpy(),
+                self.dataset.get_label(image_path)[y : y + 16, x : x + 16],
+            )
+
+        index_file = os.path.join(
+            self.reader.pack_dir, TileIndex.file_name((16, 16), 0)
+        )
+        self.assertTrue(os.path.exists(index_file))
+
+    def test_foreground_filter_and_padding(self):
+        """Tiles below the foreground fraction are skipped; small images are padded."""
+        tiles = TileDataset(self.reader, tile_size=(16, 16), min_foreground=0.05)
+        fractions = tiles.index.table["foreground"].to_numpy()
+        self.assertTrue((fractions >= 0.05).all())
+        for idx in range(len(tiles)):
+            label = tiles.read_tile(idx, "label")
+            self.assertGreaterEqual(np.count_nonzero(label) / 256, 0.05)
+        self.assertLess(len(tiles), 18)
+
+        padded = TileDataset(self.reader, tile_size=(40, 40))
+        image, label = padded[0]
+        self.assertEqual(tuple(image.shape), (1, 40, 40))
+        self.assertFalse(label[32:].any())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import io
+import os
+import tempfile
+import unittest
+import zipfile
+from unittest import mock
+
+import numpy as np
+import tifffile
+
+from bbbc_datasets.datasets.bbbc004 import BBBC004
+from bbbc_datasets.datasets.bbbc024 import BBBC024
+from bbbc_datasets.datasets.bbbc046 import BBBC046
+from bbbc_datasets.utils.variants import VariantGrid
+
+
+def fake_get(url, stream=True):
+    """Serves a small zip archive (or CSV) named after the requested file."""
+    buffer = io.BytesIO()
+    if url.endswith(".zip"):
+        with zipfile.ZipFile(buffer, "w") as zf:
+            zf.writestr(os.path.basename(url) + ".txt", "data")
+    else:
+        buffer.write(b"a,b\n")
+    response = mock.Mock(status_code=200, headers={})
+    response.iter_content.return_value = [buffer.getvalue()]
+    return response
+
+
+class TestVariantGrid(unittest.TestCase):
+    """Test case to check the variant grid handle, batch download and combined index."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_grid(self):
+        """Fixed arguments narrow the grid, lists select values."""
+        self.assertEqual(len(VariantGrid(BBBC024)), 8)
+        self.assertEqual(len(VariantGrid(BBBC024, snr="low")), 4)
+        self.assertEqual(len(VariantGrid(BBBC046, anisotropy_ratio=[1, 2])), 90)
+        with self.assertRaises(ValueError):
+            VariantGrid(BBBC024, noise="low")
+
+    def test_batch_download(self):
+        """Shared archives are fetched once and all archives of a folder are extracted."""
+        with mock.patch(
+            "bbbc_datasets.datasets.base_dataset.requests.get", side_effect=fake_get
+        ) as get, mock.patch("builtins.print"), mock.patch(
+            "bbbc_datasets.datasets.base_dataset.tqdm"
+        ):
+            grid = VariantGrid(
+                BBBC046, download_dir=self.tmp_dir.name, phenotype="WT-ID550"
+            )
+            self.assertEqual(grid.download(), 1)
+            self.assertEqual(get.call_count, 1)
+
+            grid = VariantGrid(
+                BBBC024, download_dir=self.tmp_dir.name, clustering_probability=0
+            )
+            grid.download(workers=2)
+            self.assertEqual(get.call_count, 1 + 2 * 3)
+            image_dir = os.path.join(self.tmp_dir.name, "BBBC024_c00_lowSNR", "images")
+            self.assertEqual(
+                sorted(f for f in os.listdir(image_dir) if f.endswith(".txt")),
+                [
+                    "BBBC024_v1_c00_lowSNR_images.zip.txt",
+                    "BBBC024_v1_c00_lowSNR_images_TIFF.zip.txt",
+                ],
+            )
+
+            grid.download()
+            self.assertEqual(get.call_count, 1 + 2 * 3)
+
+    def test_combined_index(self):
+        """The combined index has a column per variant argument and resolves labels."""
+        for prob_str, count in (("000", 2), ("030", 3)):
+            root = os.path.join(self.tmp_dir.name, f"BBBC004_{prob_str}")
+            for subdir in ("images", "labels"):
+                os.makedirs(os.path.join(root, subdir))
+            for i in range(count):
+                label = np.zeros((8, 8), dtype=np.uint8)
+                label[1:3, 1 + 2 * i : 3 + 2 * i] = 255
+                for subdir, array in (
+                    ("images", label.astype(np.uint16)),
+                    ("labels", label),
+                ):
+                    tifffile.imwrite(os.path.join(root, subdir, f"{i}.tif"), array)
+
+        grid = VariantGrid(
+            BBBC004, download_dir=self.tmp_dir.name, overlap_probability=[0.0, 0.3]
+        )
+        index = grid.get_index()
+        self.assertEqual(len(index), 5)
+        self.assertEqual(sorted(set(index.table["overlap_probability"])), [0.0, 0.3])
+        self.assertTrue(all(os.path.exists(p) for p in index.image_paths))
+
+        subset = grid.select(overlap_probability=0.3)
+        self.assertEqual(len(subset), 3)
+        row = subset.table.iloc[2]
+        self.assertEqual(grid.get_label(row, kind="instance").max(), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()